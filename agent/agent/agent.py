@@ -5,6 +5,8 @@ This is the refactored main agent module that uses modular components
 for better organization and maintainability.
 """
 
+import threading
+
 from dotenv import load_dotenv
 from llama_index.llms.openai import OpenAI
 from llama_index.protocols.ag_ui.router import get_ag_ui_workflow_router
@@ -16,26 +18,63 @@ load_dotenv()
 from .config import SYSTEM_PROMPT, INITIAL_STATE, get_openai_model
 from .frontend_tools import FRONTEND_TOOLS
 from .backend_tools import create_backend_tools
+from .prompt_cache import install_prompt_usage_handler, prompt_cache_key
+from .workflow import CanvasChatWorkflow
+
 
+def create_agent(llm=None):
+    """Create and configure the LlamaIndex agent.
 
-def create_agent():
-    """Create and configure the LlamaIndex agent."""
+    ``llm`` replaces the OpenAI model, e.g. with an offline stand-in for benchmarks.
+    """
     
     # Load backend tools
     backend_tools = create_backend_tools()
     print(f"Backend tools loaded: {len(backend_tools)} tools")
     
+    # Same prefix, same key: lets the provider route turns and sessions to a warm prompt cache.
+    # Usage chunks at the end of each stream report how many prompt tokens were cached.
+    cache_key = prompt_cache_key(SYSTEM_PROMPT, [*FRONTEND_TOOLS, *backend_tools])
+    install_prompt_usage_handler()
+    if llm is None:
+        llm = OpenAI(
+            model=get_openai_model(),
+            additional_kwargs={"prompt_cache_key": cache_key, "stream_options": {"include_usage": True}},
+        )
+    
+    async def workflow_factory():
+        # The default AG-UI workflow plus compact state context and JSON Patch state deltas
+        return CanvasChatWorkflow(
+            llm=llm,
+            frontend_tools=FRONTEND_TOOLS,
+            backend_tools=backend_tools,
+            system_prompt=SYSTEM_PROMPT,
+            initial_state=INITIAL_STATE,
+            timeout=120,
+        )
+    
     # Create the agent router
-    agent_router = get_ag_ui_workflow_router(
-        llm=OpenAI(model=get_openai_model()),
-        frontend_tools=FRONTEND_TOOLS,
-        backend_tools=backend_tools,
-        system_prompt=SYSTEM_PROMPT,
-        initial_state=INITIAL_STATE,
-    )
+    agent_router = get_ag_ui_workflow_router(workflow_factory=workflow_factory)
     
     return agent_router
 
 
-# Create the main agent instance
-agentic_chat_router = create_agent()
\ No newline at end of file
+_agentic_chat_router = None
+_router_lock = threading.Lock()
+
+
+def get_agentic_chat_router():
+    """Return the shared agent router, creating it on first use."""
+    global _agentic_chat_router
+    if _agentic_chat_router is None:
+        with _router_lock:
+            if _agentic_chat_router is None:
+                _agentic_chat_router = create_agent()
+    return _agentic_chat_router
+
+
+def __getattr__(name):
+    # Keep `from .agent import agentic_chat_router` working without building at import time
+    if name == "agentic_chat_router":
+        return get_agentic_chat_router()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
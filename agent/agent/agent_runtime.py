@@ -0,0 +1,104 @@
+"""
+Agent Runtime
+
+This module builds the AG-UI agent router outside of server import, so
+sheet endpoints and health checks answer immediately while LlamaIndex,
+OpenAI and the Composio tool registry initialize in the background or on
+first use. Readiness is reported separately from liveness.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .config import get_agent_startup_mode, get_agent_ready_timeout
+
+
+class AgentNotReadyError(RuntimeError):
+    """Raised when the agent router failed to build or did not finish in time."""
+
+
+class AgentRuntime:
+    """Builds the agent router once and hands out its ``/run`` endpoint."""
+
+    def __init__(self, mode: Optional[str] = None, router_factory: Optional[Callable[[], Any]] = None):
+        self.mode = mode or get_agent_startup_mode()
+        # Builds the agent router; defaults to the shared router from agent.py
+        self.router_factory = router_factory
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.build_seconds: Optional[float] = None
+        self._run_endpoint: Optional[Callable[..., Any]] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start initialization according to the configured startup mode."""
+        if self.mode == "eager":
+            self._build()
+        elif self.mode == "background":
+            self.start_background()
+
+    def start_background(self) -> None:
+        """Build the router on a daemon thread if it is not already building."""
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            self._thread = threading.Thread(target=self._build, name="agent-init", daemon=True)
+            self._thread.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> Callable[..., Any]:
+        """
+        Return the agent ``/run`` endpoint, building or waiting for it as needed.
+
+        Raises:
+            AgentNotReadyError: If initialization failed or timed out
+        """
+        self.start_background()
+        if not self._done.wait(get_agent_ready_timeout() if timeout is None else timeout):
+            raise AgentNotReadyError("Agent is still initializing")
+        if self._run_endpoint is None:
+            raise AgentNotReadyError(f"Agent failed to initialize: {self.error}")
+        return self._run_endpoint
+
+    async def get_run_endpoint(self) -> Callable[..., Any]:
+        """Async variant of ``wait_ready`` that does not block the event loop."""
+        if self._run_endpoint is not None:
+            return self._run_endpoint
+        return await asyncio.to_thread(self.wait_ready)
+
+    def readiness(self) -> Dict[str, Any]:
+        """Return the agent initialization status for the readiness endpoint."""
+        return {
+            "mode": self.mode,
+            "status": self.status,
+            "error": self.error,
+            "build_seconds": self.build_seconds,
+        }
+
+    def _build(self) -> None:
+        self.status = "loading"
+        start = time.perf_counter()
+        try:
+            # Heavy imports (LlamaIndex, OpenAI, Composio tools) happen here
+            if self.router_factory is not None:
+                router = self.router_factory()
+            else:
+                from .agent import get_agentic_chat_router
+                router = get_agentic_chat_router()
+            self._run_endpoint = next(
+                route.endpoint for route in router.routes if getattr(route, "path", None) == "/run"
+            )
+            self.status = "ready"
+        except Exception as e:
+            print(f"Failed to initialize agent: {e}")
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.build_seconds = round(time.perf_counter() - start, 3)
+            self._done.set()
+
+
+agent_runtime = AgentRuntime()
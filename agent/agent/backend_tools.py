@@ -5,9 +5,13 @@ This module contains backend tools that execute on the server side,
 including Composio integration and Google Sheets functionality.
 """
 
+import json
 import os
-from typing import List, Any, Annotated
+from typing import List, Any, Annotated, Dict, Optional
 from llama_index.core.tools import FunctionTool
+from llama_index.core.workflow import Context
+
+from .tool_registry import get_tool_registry
 
 
 def load_composio_tools() -> List[Any]:
@@ -17,8 +21,11 @@ def load_composio_tools() -> List[Any]:
     - COMPOSIO_TOOL_IDS: comma-separated list of tool identifiers to enable
     - COMPOSIO_USER_ID: user/entity id to scope tools (defaults to "default")
     - COMPOSIO_API_KEY: required by Composio client; read implicitly by SDK
+    - COMPOSIO_TOOL_CACHE: on-disk schema cache path ("" disables it)
 
-    Returns an empty list if not configured or if dependencies are missing.
+    Tool schemas come from the on-disk registry when cached, so startup does
+    not wait on Composio. Returns an empty list if not configured or if
+    dependencies are missing.
     """
     tool_ids_str = os.getenv("COMPOSIO_TOOL_IDS", "").strip()
     if not tool_ids_str:
@@ -26,8 +33,8 @@ def load_composio_tools() -> List[Any]:
 
     # Import lazily to avoid hard runtime dependency if not used
     try:
-        from composio import Composio  # type: ignore
-        from composio_llamaindex import LlamaIndexProvider  # type: ignore
+        import composio  # type: ignore  # noqa: F401
+        import composio_llamaindex  # type: ignore  # noqa: F401
     except Exception as e:
         print(f"Failed to import Composio: {e}")
         return []
@@ -39,11 +46,10 @@ def load_composio_tools() -> List[Any]:
     
     try:
         print(f"Loading Composio tools: {tool_ids} for user: {user_id}")
-        composio = Composio(provider=LlamaIndexProvider())
-        tools = composio.tools.get(user_id=user_id, tools=tool_ids)
-        print(f"Successfully loaded {len(tools) if tools else 0} tools")
-        # "tools" should be a list of LlamaIndex-compatible Tool objects
-        return list(tools) if tools is not None else []
+        tools = get_tool_registry().load_tools(tool_ids, user_id)
+        print(f"Successfully loaded {len(tools)} tools (source: {get_tool_registry().source})")
+        # "tools" is a list of LlamaIndex-compatible Tool objects
+        return tools
     except Exception as e:
         # Fail closed; backend tools remain empty if configuration is invalid
         print(f"Failed to load Composio tools: {e}")
@@ -67,6 +73,94 @@ def list_sheet_names(
         return f"Error listing sheets from {sheet_id}: {str(e)}"
 
 
+async def import_sheet_to_canvas(
+    ctx: Context,
+    sheet_id: Annotated[str, "Google Sheets ID or URL to import from."],
+    sheet_name: Annotated[Optional[str], "Optional sheet (tab) name; defaults to the first sheet."] = None,
+) -> str:
+    """Import a Google Sheet into the canvas in one step and enable auto-sync.
+
+    Converts every row on the server and replaces the canvas items with the
+    result; the new state reaches the frontend as a single AG-UI state
+    update, so no per-item createItem/field tool calls are needed.
+    """
+    try:
+        from .sheets_executor import run_sheets_call
+        from .sheets_integration import extract_sheet_id, get_sheet_data, convert_sheet_data_cached
+        
+        sheet_id = extract_sheet_id(sheet_id)
+        sheet_data = await run_sheets_call("sync", get_sheet_data, sheet_id, sheet_name, spreadsheet_id=sheet_id)
+        if not sheet_data:
+            return f"Failed to fetch data from {sheet_id}. Please check the ID and ensure the sheet is accessible."
+        
+        canvas_data, _ = await run_sheets_call("sync", convert_sheet_data_cached, sheet_data, sheet_id)
+        items = canvas_data["items"]
+        
+        # The workflow emits the updated state to the frontend after this tool returns
+        state = await ctx.store.get("state", default={})
+        await ctx.store.set("state", {
+            **(state or {}),
+            **canvas_data,
+            "itemsCreated": len(items),
+            "lastAction": f"imported:{sheet_id}",
+        })
+        
+        counts: Dict[str, int] = {}
+        for item in items:
+            counts[item["type"]] = counts.get(item["type"], 0) + 1
+        breakdown = ", ".join(f"{n} {t}" for t, n in sorted(counts.items())) or "no items"
+        return (
+            f"Imported {len(items)} items ({breakdown}) from '{canvas_data['globalTitle']}' "
+            f"(sheet: {canvas_data['syncSheetName']}). The canvas now mirrors the sheet and "
+            f"auto-sync is enabled for {canvas_data['syncSheetId']}."
+        )
+        
+    except Exception as e:
+        return f"Error importing sheet {sheet_id}: {str(e)}"
+
+
+async def apply_canvas_operations(
+    ctx: Context,
+    operations: Annotated[
+        List[Dict[str, Any]],
+        "Ordered canvas operations. Each is an object with 'op' plus its arguments: "
+        "create{type, name?, subtitle?, data?}, delete{itemId}, set{itemId, field, value}, "
+        "append{itemId, field, value, withNewline?}, clear{itemId, field}, addTag{itemId, tag}, "
+        "removeTag{itemId, tag}, addChecklistItem{itemId, text?}, "
+        "setChecklistItem{itemId, checklistItemId, text?, done?}, removeChecklistItem{itemId, checklistItemId}, "
+        "addMetric{itemId, label?, value?}, setMetric{itemId, index, label?, value?}, removeMetric{itemId, index}, "
+        "setGlobal{field: 'title'|'description', value}. 'field' is 'name', 'subtitle' or a data field from the "
+        "FIELD SCHEMA. itemId may be '$N' to refer to the item created by operation N.",
+    ],
+) -> str:
+    """Apply a whole canvas edit plan in one call and report the result of each operation."""
+    from .canvas_ops import apply_canvas_operations as apply_operations
+    
+    state = await ctx.store.get("state", default={})
+    outcome = apply_operations(state, operations)
+    if outcome["applied"]:
+        # The workflow emits the updated state to the frontend after this tool returns
+        await ctx.store.set("state", outcome["state"])
+    
+    return json.dumps({
+        "applied": outcome["applied"],
+        "failed": outcome["failed"],
+        "results": outcome["results"],
+    })
+
+
+async def get_canvas_items(
+    ctx: Context,
+    item_ids: Annotated[List[str], "Ids of the canvas items to return in full."],
+) -> str:
+    """Return the full JSON of canvas items, including ones summarized or elided in the context."""
+    state = await ctx.store.get("state", default={})
+    wanted = {str(item_id) for item_id in item_ids}
+    items = [item for item in (state or {}).get("items", []) if str(item.get("id")) in wanted]
+    missing = sorted(wanted - {str(item.get("id")) for item in items})
+    return json.dumps({"items": items, "missing": missing}, ensure_ascii=False)
+
+
 def create_backend_tools() -> List[Any]:
     """Create and return all backend tools."""
     tools = []
@@ -83,4 +177,32 @@ def create_backend_tools() -> List[Any]:
     )
     tools.append(sheet_list_tool)
     
+    sheet_import_tool = FunctionTool.from_defaults(
+        async_fn=import_sheet_to_canvas,
+        name="import_sheet_to_canvas",
+        description=(
+            "Import a Google Sheet into the canvas in one step: converts all rows to canvas items, "
+            "replaces the canvas state and sets syncSheetId/syncSheetName for auto-sync."
+        ),
+    )
+    tools.append(sheet_import_tool)
+    
+    canvas_operations_tool = FunctionTool.from_defaults(
+        async_fn=apply_canvas_operations,
+        name="apply_canvas_operations",
+        description=(
+            "Apply an ordered list of canvas mutations (create/delete items, set/append/clear fields, "
+            "tags, checklist items, chart metrics, global title/description) in a single call. "
+            "Each operation is validated against the field schema; returns per-operation results."
+        ),
+    )
+    tools.append(canvas_operations_tool)
+    
+    canvas_items_tool = FunctionTool.from_defaults(
+        async_fn=get_canvas_items,
+        name="get_canvas_items",
+        description="Return the full data of canvas items by id, including items shown only by name or count in the state.",
+    )
+    tools.append(canvas_items_tool)
+    
     return tools
\ No newline at end of file
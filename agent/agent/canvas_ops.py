@@ -0,0 +1,325 @@
+"""
+Canvas Operations
+
+This module applies an ordered batch of canvas mutations (create, delete,
+set, append, clear, tag, checklist and metric operations) to the agent
+state in one pass. Every operation is validated against the field spec in
+``config.py`` and reported individually, so a whole edit plan costs a
+single tool call instead of one LLM step per field.
+"""
+
+import copy
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import CANVAS_FIELD_SPEC, DEFAULT_ITEM_DATA, INITIAL_STATE
+
+
+class CanvasOperationError(ValueError):
+    """Raised when a single canvas operation is invalid."""
+
+
+def _next_item_id(state: Dict[str, Any]) -> str:
+    # Same scheme as the frontend: max(itemsCreated, highest numeric id) + 1, zero-padded
+    highest = 0
+    for item in state["items"]:
+        try:
+            highest = max(highest, int(str(item.get("id", "0"))))
+        except ValueError:
+            continue
+    next_number = max(int(state.get("itemsCreated") or 0), highest) + 1
+    state["itemsCreated"] = next_number
+    return str(next_number).zfill(4)
+
+
+def _find_item(state: Dict[str, Any], item_id: Any) -> Dict[str, Any]:
+    for item in state["items"]:
+        if item.get("id") == str(item_id):
+            return item
+    raise CanvasOperationError(f"Item '{item_id}' not found")
+
+
+def _field_spec(item: Dict[str, Any], field: str, kinds: Optional[tuple] = None) -> Dict[str, Any]:
+    spec = CANVAS_FIELD_SPEC.get(item["type"], {}).get(field)
+    if spec is None:
+        allowed = ", ".join(CANVAS_FIELD_SPEC.get(item["type"], {}))
+        raise CanvasOperationError(f"{item['type']} has no field '{field}' (fields: {allowed})")
+    if kinds is not None and spec["kind"] not in kinds:
+        raise CanvasOperationError(f"{item['type']}.{field} is a {spec['kind']} field")
+    return spec
+
+
+def _require(op: Dict[str, Any], key: str) -> Any:
+    if op.get(key) is None:
+        raise CanvasOperationError(f"'{key}' is required")
+    return op[key]
+
+
+def _require_str(op: Dict[str, Any], key: str) -> str:
+    value = _require(op, key)
+    if not isinstance(value, str):
+        raise CanvasOperationError(f"'{key}' must be a string")
+    return value
+
+
+def _validate_value(item: Dict[str, Any], field: str, spec: Dict[str, Any], value: Any) -> Any:
+    kind = spec["kind"]
+    if kind == "text":
+        return "" if value is None else str(value)
+    if kind == "select":
+        value = "" if value is None else str(value)
+        if value and value not in spec["options"]:
+            raise CanvasOperationError(f"{item['type']}.{field} must be one of {spec['options']}")
+        return value
+    if kind == "date":
+        value = "" if value is None else str(value)
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise CanvasOperationError(f"{item['type']}.{field} must be a date in YYYY-MM-DD format")
+        return value
+    if kind in ("tags", "string_list"):
+        if not isinstance(value, list):
+            raise CanvasOperationError(f"{item['type']}.{field} must be a list of strings")
+        return [str(v) for v in value]
+    raise CanvasOperationError(f"{item['type']}.{field} ({kind}) has dedicated operations")
+
+
+def _metric_value(value: Any) -> Any:
+    if value is None or value == "":
+        return ""
+    try:
+        number = max(0.0, min(100.0, float(value)))
+    except (TypeError, ValueError):
+        raise CanvasOperationError("Metric value must be a number in [0..100] or ''")
+    return int(number) if number.is_integer() else number
+
+
+def _metric_index(data: Dict[str, Any], op: Dict[str, Any]) -> int:
+    index = _require(op, "index")
+    if not isinstance(index, int) or isinstance(index, bool):
+        raise CanvasOperationError("Metric index must be an integer")
+    if not 0 <= index < len(data.get("field1", [])):
+        raise CanvasOperationError(f"Metric index {index} is out of range")
+    return index
+
+
+def _checklist_entry(data: Dict[str, Any], checklist_item_id: Any) -> Dict[str, Any]:
+    for entry in data.get("field4", []):
+        if entry.get("id") == str(checklist_item_id):
+            return entry
+    raise CanvasOperationError(f"Checklist item '{checklist_item_id}' not found")
+
+
+# --- Operations ---
+
+def _op_create(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item_type = _require_str(op, "type")
+    if item_type not in DEFAULT_ITEM_DATA:
+        raise CanvasOperationError(f"Unknown item type '{item_type}'")
+    item = {
+        "id": "",
+        "type": item_type,
+        "name": str(op.get("name") or "").strip(),
+        "subtitle": str(op.get("subtitle") or ""),
+        "data": copy.deepcopy(DEFAULT_ITEM_DATA[item_type]),
+    }
+    # Optional initial data fields, validated like "set"
+    initial_data = op.get("data") or {}
+    if not isinstance(initial_data, dict):
+        raise CanvasOperationError("'data' must be an object of field values")
+    for field, value in initial_data.items():
+        item["data"][field] = _validate_value(item, field, _field_spec(item, field), value)
+    item["id"] = _next_item_id(state)
+    state["items"].append(item)
+    state["lastAction"] = f"created:{item['id']}"
+    return {"itemId": item["id"]}
+
+
+def _op_delete(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    state["items"].remove(item)
+    state["lastAction"] = f"deleted:{item['id']}"
+    return {"itemId": item["id"]}
+
+
+def _op_set(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    field = _require_str(op, "field")
+    if field in ("name", "subtitle"):
+        item[field] = str(op.get("value") or "")
+        return {"itemId": item["id"]}
+    spec = _field_spec(item, field)
+    value = _validate_value(item, field, spec, op.get("value"))
+    if spec["kind"] == "tags":
+        # Selected tags must stay a subset of the available options
+        options = item["data"].setdefault(spec["options_field"], [])
+        options.extend(tag for tag in value if tag not in options)
+    item["data"][field] = value
+    return {"itemId": item["id"]}
+
+
+def _op_append(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    field = _require_str(op, "field")
+    _field_spec(item, field, kinds=("text",))
+    separator = "\n" if op.get("withNewline") else ""
+    item["data"][field] = f"{item['data'].get(field) or ''}{separator}{_require(op, 'value')}"
+    return {"itemId": item["id"]}
+
+
+def _op_clear(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    field = _require_str(op, "field")
+    spec = _field_spec(item, field, kinds=("text", "select", "date", "tags"))
+    item["data"][field] = [] if spec["kind"] == "tags" else ""
+    return {"itemId": item["id"]}
+
+
+def _op_add_tag(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    spec = _field_spec(item, "field3", kinds=("tags",))
+    tag = str(_require(op, "tag"))
+    tags = item["data"].setdefault("field3", [])
+    options = item["data"].setdefault(spec["options_field"], [])
+    if tag not in tags:
+        tags.append(tag)
+    if tag not in options:
+        options.append(tag)
+    return {"itemId": item["id"]}
+
+
+def _op_remove_tag(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    _field_spec(item, "field3", kinds=("tags",))
+    tag = str(_require(op, "tag"))
+    item["data"]["field3"] = [t for t in item["data"].get("field3", []) if t != tag]
+    return {"itemId": item["id"]}
+
+
+def _op_add_checklist_item(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    _field_spec(item, "field4", kinds=("checklist",))
+    data = item["data"]
+    next_count = int(data.get("field4_id") or 0) + 1
+    entry = {"id": str(next_count).zfill(3), "text": str(op.get("text") or ""), "done": False, "proposed": False}
+    data.setdefault("field4", []).append(entry)
+    data["field4_id"] = next_count
+    return {"itemId": item["id"], "checklistItemId": entry["id"]}
+
+
+def _op_set_checklist_item(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    _field_spec(item, "field4", kinds=("checklist",))
+    entry = _checklist_entry(item["data"], _require(op, "checklistItemId"))
+    if op.get("text") is not None:
+        entry["text"] = str(op["text"])
+    if op.get("done") is not None:
+        entry["done"] = bool(op["done"])
+    return {"itemId": item["id"], "checklistItemId": entry["id"]}
+
+
+def _op_remove_checklist_item(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    _field_spec(item, "field4", kinds=("checklist",))
+    entry = _checklist_entry(item["data"], _require(op, "checklistItemId"))
+    item["data"]["field4"].remove(entry)
+    return {"itemId": item["id"], "checklistItemId": entry["id"]}
+
+
+def _op_add_metric(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    _field_spec(item, "field1", kinds=("metrics",))
+    data = item["data"]
+    next_count = int(data.get("field1_id") or 0) + 1
+    metric = {"id": str(next_count).zfill(3), "label": str(op.get("label") or ""), "value": _metric_value(op.get("value"))}
+    data.setdefault("field1", []).append(metric)
+    data["field1_id"] = next_count
+    return {"itemId": item["id"], "metricId": metric["id"]}
+
+
+def _op_set_metric(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    _field_spec(item, "field1", kinds=("metrics",))
+    metric = item["data"]["field1"][_metric_index(item["data"], op)]
+    if op.get("label") is not None:
+        metric["label"] = str(op["label"])
+    if "value" in op:
+        metric["value"] = _metric_value(op["value"])
+    return {"itemId": item["id"], "metricId": metric["id"]}
+
+
+def _op_remove_metric(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    item = _find_item(state, _require(op, "itemId"))
+    _field_spec(item, "field1", kinds=("metrics",))
+    metric = item["data"]["field1"].pop(_metric_index(item["data"], op))
+    return {"itemId": item["id"], "metricId": metric["id"]}
+
+
+def _op_set_global(state: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    field = _require_str(op, "field")
+    if field not in ("title", "description"):
+        raise CanvasOperationError("Global field must be 'title' or 'description'")
+    state["globalTitle" if field == "title" else "globalDescription"] = str(op.get("value") or "")
+    return {}
+
+
+CANVAS_OPERATIONS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = {
+    "create": _op_create,
+    "delete": _op_delete,
+    "set": _op_set,
+    "append": _op_append,
+    "clear": _op_clear,
+    "addTag": _op_add_tag,
+    "removeTag": _op_remove_tag,
+    "addChecklistItem": _op_add_checklist_item,
+    "setChecklistItem": _op_set_checklist_item,
+    "removeChecklistItem": _op_remove_checklist_item,
+    "addMetric": _op_add_metric,
+    "setMetric": _op_set_metric,
+    "removeMetric": _op_remove_metric,
+    "setGlobal": _op_set_global,
+}
+
+
+def apply_canvas_operations(state: Optional[Dict[str, Any]], operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply an ordered list of canvas operations to a copy of ``state``.
+
+    Invalid operations are skipped and reported; the rest still apply.
+    ``itemId`` may be ``"$N"`` to refer to the item created by operation N.
+
+    Returns:
+        Dict with the new ``state``, per-operation ``results`` and counts
+    """
+    new_state = copy.deepcopy(state) if state else copy.deepcopy(INITIAL_STATE)
+    new_state.setdefault("items", [])
+    created: Dict[int, str] = {}
+    results: List[Dict[str, Any]] = []
+
+    for index, op in enumerate(operations):
+        result: Dict[str, Any] = {"index": index, "op": op.get("op") if isinstance(op, dict) else None}
+        try:
+            if not isinstance(op, dict):
+                raise CanvasOperationError("Operation must be an object")
+            handler = CANVAS_OPERATIONS.get(op.get("op")) if isinstance(op.get("op"), str) else None
+            if handler is None:
+                raise CanvasOperationError(f"Unknown op '{op.get('op')}' (ops: {', '.join(CANVAS_OPERATIONS)})")
+            item_ref = op.get("itemId")
+            if isinstance(item_ref, str) and item_ref.startswith("$"):
+                try:
+                    op = {**op, "itemId": created[int(item_ref[1:])]}
+                except (ValueError, KeyError):
+                    raise CanvasOperationError(f"'{item_ref}' does not refer to an earlier create operation")
+            result.update(handler(new_state, op))
+            result["ok"] = True
+            if op["op"] == "create":
+                created[index] = result["itemId"]
+        except CanvasOperationError as e:
+            result["ok"] = False
+            result["error"] = str(e)
+        results.append(result)
+
+    applied = sum(1 for r in results if r["ok"])
+    return {"state": new_state, "results": results, "applied": applied, "failed": len(results) - applied}
@@ -0,0 +1,201 @@
+"""
+Composio Client Pool
+
+This module keeps a small, process-wide pool of Composio clients so that
+sheet endpoints reuse warm HTTP sessions instead of building a new client
+(and TLS/auth handshake) on every call.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .config import (
+    get_composio_pool_size,
+    get_composio_pool_max_idle_seconds,
+    get_composio_pool_acquire_timeout,
+)
+
+
+class ComposioUnavailableError(RuntimeError):
+    """Raised when no Composio client can be created or acquired."""
+
+
+def _default_factory() -> Any:
+    """Create a Composio client for direct API calls."""
+    # Import lazily to avoid hard runtime dependency if not used
+    from composio import Composio  # type: ignore
+    return Composio()
+
+
+class _PooledClient:
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class ComposioClientPool:
+    """Bounded pool of reusable Composio clients.
+
+    Clients are created on demand up to ``size``. Idle clients are health
+    checked on checkout and recycled when their HTTP session was closed or
+    they sat idle longer than ``max_idle_seconds``.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_idle_seconds: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+        factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.size = size or get_composio_pool_size()
+        self.max_idle_seconds = max_idle_seconds if max_idle_seconds is not None else get_composio_pool_max_idle_seconds()
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else get_composio_pool_acquire_timeout()
+        self._factory = factory or _default_factory
+        self._idle: "queue.LifoQueue[_PooledClient]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._recycled = 0
+        self._closed = False
+
+    def start(self, warm: int = 1) -> None:
+        """Pre-create up to ``warm`` clients so the first request is not cold."""
+        self._closed = False
+        for _ in range(min(warm, self.size)):
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                self._idle.put(_PooledClient(self._factory()))
+            except Exception as e:
+                with self._lock:
+                    self._created -= 1
+                print(f"Failed to pre-warm Composio client: {e}")
+                return
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Check a client out of the pool for the duration of the block."""
+        pooled = self._checkout(self.acquire_timeout if timeout is None else timeout)
+        try:
+            yield pooled.client
+        finally:
+            self._checkin(pooled)
+
+    def close(self) -> None:
+        """Close all idle clients; clients still in use are closed on check-in."""
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage counters."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": self._idle.qsize(),
+                "in_use": self._in_use,
+                "recycled": self._recycled,
+                "closed": self._closed,
+            }
+
+    def _checkout(self, timeout: float) -> _PooledClient:
+        if self._closed:
+            raise ComposioUnavailableError("Composio client pool is closed")
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = self._create_if_room()
+                if pooled is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ComposioUnavailableError("Timed out waiting for a Composio client")
+                    try:
+                        pooled = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        raise ComposioUnavailableError("Timed out waiting for a Composio client")
+
+            if self._is_healthy(pooled):
+                with self._lock:
+                    self._in_use += 1
+                return pooled
+
+            self._discard(pooled)
+            with self._lock:
+                self._recycled += 1
+
+    def _checkin(self, pooled: _PooledClient) -> None:
+        with self._lock:
+            self._in_use -= 1
+        if self._closed:
+            self._discard(pooled)
+            return
+        pooled.last_used = time.monotonic()
+        self._idle.put(pooled)
+
+    def _create_if_room(self) -> Optional[_PooledClient]:
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return _PooledClient(self._factory())
+        except Exception as e:
+            with self._lock:
+                self._created -= 1
+            raise ComposioUnavailableError(f"Failed to initialize Composio client: {e}") from e
+
+    def _is_healthy(self, pooled: _PooledClient) -> bool:
+        if time.monotonic() - pooled.last_used > self.max_idle_seconds:
+            return False
+        http_client = getattr(pooled.client, "client", None)
+        is_closed = getattr(http_client, "is_closed", None)
+        return not (callable(is_closed) and is_closed())
+
+    def _discard(self, pooled: _PooledClient) -> None:
+        with self._lock:
+            self._created -= 1
+        http_client = getattr(pooled.client, "client", None)
+        try:
+            if http_client is not None and hasattr(http_client, "close"):
+                http_client.close()
+        except Exception as e:
+            print(f"Error closing Composio client: {e}")
+
+
+_pool: Optional[ComposioClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ComposioClientPool:
+    """Return the process-wide Composio client pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ComposioClientPool()
+    return _pool
+
+
+def shutdown_client_pool() -> None:
+    """Close the process-wide pool; a later ``get_client_pool`` starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -6,7 +6,7 @@ for the LlamaIndex agent.
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 # Field schema definition
 FIELD_SCHEMA = (
@@ -27,6 +27,38 @@ FIELD_SCHEMA = (
     "  - field1: Array<{id: string, label: string, value: number | ''}> with value in [0..100] or ''\n"
 )
 
+# Structured form of FIELD_SCHEMA, used to validate batched canvas operations
+SELECT_OPTIONS = ["Option A", "Option B", "Option C"]
+
+CANVAS_FIELD_SPEC: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "project": {
+        "field1": {"kind": "text"},
+        "field2": {"kind": "select", "options": SELECT_OPTIONS},
+        "field3": {"kind": "date"},
+        "field4": {"kind": "checklist"},
+    },
+    "entity": {
+        "field1": {"kind": "text"},
+        "field2": {"kind": "select", "options": SELECT_OPTIONS},
+        "field3": {"kind": "tags", "options_field": "field3_options"},
+        "field3_options": {"kind": "string_list"},
+    },
+    "note": {
+        "field1": {"kind": "text"},
+    },
+    "chart": {
+        "field1": {"kind": "metrics"},
+    },
+}
+
+# Default item data per card type (matches the frontend's defaultDataFor)
+DEFAULT_ITEM_DATA: Dict[str, Dict[str, Any]] = {
+    "project": {"field1": "", "field2": "", "field3": "", "field4": [], "field4_id": 0},
+    "entity": {"field1": "", "field2": "", "field3": [], "field3_options": ["Tag 1", "Tag 2", "Tag 3"]},
+    "note": {"field1": ""},
+    "chart": {"field1": [], "field1_id": 0},
+}
+
 # System prompt for the agent
 SYSTEM_PROMPT = (
     "You are a helpful AG-UI assistant.\n\n"
@@ -35,7 +67,9 @@ SYSTEM_PROMPT = (
     "- When you claim to create/update/delete, you MUST call the corresponding tool(s) (frontend or backend).\n"
     "- To create new cards, call the frontend tool `createItem` with `type` in {project, entity, note, chart} and optional `name`.\n"
     "- After tools run, rely on the latest shared state (ground truth) when replying.\n"
-    "- To set a card's subtitle (never the data fields): use setItemSubtitleOrDescription.\n\n"
+    "- The <state> block is a compact table per card type ('|'-separated, empty fields omitted). On large boards some items appear only as id:name or as counts; call get_canvas_items(item_ids) before editing or describing those.\n"
+    "- To set a card's subtitle (never the data fields): use setItemSubtitleOrDescription.\n"
+    "- For edits that touch several fields or items, call the backend tool `apply_canvas_operations` ONCE with the whole ordered plan instead of many single-field tool calls.\n\n"
     "DESCRIPTION MAPPING:\n"
     "- For project/entity/chart: treat 'description', 'overview', 'summary', 'caption', 'blurb' as the card subtitle; use setItemSubtitleOrDescription.\n"
     "- For notes: 'content', 'description', 'text', or 'note' refers to note content; use setNoteField1 / appendNoteField1 / clearNoteField1.\n\n"
@@ -48,28 +82,21 @@ SYSTEM_PROMPT = (
     "- Wait for the user to respond with 'connected' before using any Google Sheets actions (GOOGLESHEETS_*).\n"
     "- If the connection is already active, you can proceed directly with Google Sheets operations.\n\n"
     "AUTOMATIC SYNCING RULES:\n"
-    "1) When importing from Google Sheets: \n"
-    "   a) Use 'convert_sheet_to_canvas_items' tool to get the data\n"
-    "   b) ALWAYS call setSyncSheetId(sheetId) with the sheet ID to enable auto-sync\n"
-    "   c) Use frontend actions (createItem, setItemName, etc.) to create ALL items in canvas\n"
-    "   d) This ensures auto-sync triggers and maintains sheets as source of truth\n"
+    "1) When importing from Google Sheets: call the backend tool 'import_sheet_to_canvas' ONCE.\n"
+    "   It converts every row, replaces the canvas items and sets syncSheetId/syncSheetName, which enables auto-sync.\n"
     "2) When user makes changes in canvas: The frontend automatically syncs to Google Sheets if syncSheetId is set.\n"
     "3) If you detect inconsistencies: Automatically pull from Google Sheets (source of truth) and update canvas.\n"
     "4) Never ask permission to sync - just do it automatically and inform the user afterward.\n"
     "5) CRITICAL: Always set syncSheetId when working with any Google Sheet to enable bidirectional sync.\n\n"
     "IMPORT WORKFLOW (MANDATORY STEPS):\n"
-    "1. Call convert_sheet_to_canvas_items(sheet_id) to get conversion instructions\n"
-    "2. Execute ALL the instructions it returns, including:\n"
-    "   - setGlobalTitle() and setGlobalDescription() if provided\n"
-    "   - setSyncSheetId() - THIS IS CRITICAL for enabling auto-sync\n"
-    "   - createItem() for each item\n"
-    "   - All field setting actions (setProjectField1, etc.)\n"
-    "3. Confirm the import completed and auto-sync is now enabled\n\n"
+    "1. Call import_sheet_to_canvas(sheet_id, sheet_name) - one call imports the whole sheet\n"
+    "2. Do NOT recreate the imported items with createItem or field setters; they are already in the shared state\n"
+    "3. Confirm the import completed (use the item counts it returns) and that auto-sync is now enabled\n\n"
     "STRICT GROUNDING RULES:\n"
     "1) GOOGLE SHEETS is the ultimate source of truth when syncing.\n"
     "2) Canvas state is secondary - update it to match Google Sheets when needed.\n"
     "3) ALWAYS set syncSheetId when importing to enable bidirectional sync.\n"
-    "4) Use frontend actions, not direct state manipulation, to trigger auto-sync.\n"
+    "4) Use frontend actions, not direct state manipulation, for individual edits; use import_sheet_to_canvas for imports.\n"
     "5) Always inform user AFTER syncing is complete with a summary of changes."
 )
 
@@ -95,4 +122,193 @@ def get_log_level() -> str:
 
 def is_debug_mode() -> bool:
     """Check if debug mode is enabled."""
-    return get_log_level() == "DEBUG"
\ No newline at end of file
+    return get_log_level() == "DEBUG"
+
+def get_composio_user_id() -> str:
+    """Get the Composio user/entity id used for direct API calls."""
+    return os.getenv("COMPOSIO_USER_ID", "default")
+
+def get_composio_pool_size() -> int:
+    """Get the maximum number of pooled Composio clients."""
+    return max(1, int(os.getenv("COMPOSIO_POOL_SIZE", "4")))
+
+def get_composio_pool_max_idle_seconds() -> float:
+    """Get how long a pooled Composio client may sit idle before it is recycled."""
+    return float(os.getenv("COMPOSIO_POOL_MAX_IDLE_SECONDS", "300"))
+
+def get_composio_pool_acquire_timeout() -> float:
+    """Get how long to wait for a free pooled Composio client, in seconds."""
+    return float(os.getenv("COMPOSIO_POOL_ACQUIRE_TIMEOUT", "30"))
+
+def get_sheets_backend_name() -> str:
+    """Get the sheets backend: 'composio' (Google Sheets) or 'local' (in-process SQLite stand-in)."""
+    return os.getenv("SHEETS_BACKEND", "composio").lower()
+
+def get_local_sheets_db_path() -> str:
+    """Get the SQLite path of the local sheets backend (':memory:' keeps it in process)."""
+    return os.getenv("SHEETS_LOCAL_DB", ":memory:")
+
+def get_local_sheets_latency() -> float:
+    """Get the simulated latency of each local sheets backend call, in seconds."""
+    return max(0.0, float(os.getenv("SHEETS_LOCAL_LATENCY_MS", "0")) / 1000)
+
+def get_local_sheets_rate_limit() -> int:
+    """Get the local sheets backend request quota per minute (0 disables rate limiting)."""
+    return max(0, int(os.getenv("SHEETS_LOCAL_RATE_LIMIT", "0")))
+
+def get_sheets_rate_limit() -> int:
+    """Get the Google Sheets requests per minute allowed per user and spreadsheet (0 disables throttling)."""
+    return max(0, int(os.getenv("SHEETS_RATE_LIMIT", "60")))
+
+def get_sheets_rate_burst() -> int:
+    """Get how many Google Sheets requests per user and spreadsheet may be sent back to back."""
+    return max(1, int(os.getenv("SHEETS_RATE_BURST", "20")))
+
+def get_sheets_background_routes() -> List[str]:
+    """Get the sheets routes scheduled in the background lane, behind interactive calls."""
+    return [r.strip() for r in os.getenv("SHEETS_BACKGROUND_ROUTES", "sync_to_sheets,watch").split(",") if r.strip()]
+
+def get_sheets_retry_attempts() -> int:
+    """Get how many times a rate-limited or failed (5xx) Google Sheets call is retried."""
+    return max(0, int(os.getenv("SHEETS_RETRY_ATTEMPTS", "4")))
+
+def get_sheets_retry_base_delay() -> float:
+    """Get the initial retry backoff for Google Sheets calls, in seconds (doubles per attempt)."""
+    return float(os.getenv("SHEETS_RETRY_BASE_DELAY", "0.5"))
+
+def get_sheets_retry_max_delay() -> float:
+    """Get the maximum retry backoff for Google Sheets calls, in seconds."""
+    return float(os.getenv("SHEETS_RETRY_MAX_DELAY", "16"))
+
+def get_sheets_executor_workers() -> int:
+    """Get the number of worker threads used for blocking sheet calls."""
+    return max(1, int(os.getenv("SHEETS_EXECUTOR_WORKERS", "8")))
+
+def get_sheets_route_concurrency(route: str) -> int:
+    """Get the concurrency limit for a sheets route (e.g. SHEETS_CONCURRENCY_SYNC)."""
+    default = os.getenv("SHEETS_CONCURRENCY", "4")
+    return max(1, int(os.getenv(f"SHEETS_CONCURRENCY_{route.upper()}", default)))
+
+def get_sheets_call_timeout() -> float:
+    """Get the timeout in seconds for a single sheets route call."""
+    return float(os.getenv("SHEETS_CALL_TIMEOUT", "60"))
+
+def get_metadata_cache_ttl() -> float:
+    """Get how long spreadsheet metadata stays cached, in seconds."""
+    return float(os.getenv("SHEETS_METADATA_CACHE_TTL", "60"))
+
+def get_metadata_cache_size() -> int:
+    """Get the maximum number of spreadsheets whose metadata is cached."""
+    return max(1, int(os.getenv("SHEETS_METADATA_CACHE_SIZE", "256")))
+
+def get_sheets_sync_mode() -> str:
+    """Get the default canvas-to-sheet sync mode ('incremental' or 'full')."""
+    return os.getenv("SHEETS_SYNC_MODE", "incremental").lower()
+
+def get_sync_snapshot_ttl() -> float:
+    """Get how long a last-synced snapshot is trusted for incremental sync, in seconds."""
+    return float(os.getenv("SHEETS_SYNC_SNAPSHOT_TTL", "300"))
+
+def get_sync_max_update_ranges() -> int:
+    """Get the number of changed row ranges above which they are written as one span."""
+    return max(1, int(os.getenv("SHEETS_SYNC_MAX_UPDATE_RANGES", "10")))
+
+def get_sync_coalesce_window() -> float:
+    """Get the window in seconds during which canvas-to-sheet syncs are coalesced."""
+    return max(0.0, float(os.getenv("SHEETS_SYNC_COALESCE_WINDOW", "0.5")))
+
+def get_import_chunk_rows() -> int:
+    """Get the number of rows fetched per window when reading a sheet."""
+    return max(1, int(os.getenv("SHEETS_IMPORT_CHUNK_ROWS", "1000")))
+
+def get_snapshot_db_path() -> str:
+    """Get the SQLite path of the local canvas snapshot store ('' disables it)."""
+    default = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "canvas_snapshots.sqlite3")
+    return os.getenv("CANVAS_SNAPSHOT_DB", default)
+
+def get_sync_jobs_db_path() -> str:
+    """Get the SQLite path of the background sync job store ('' keeps jobs in memory only)."""
+    default = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "sync_jobs.sqlite3")
+    return os.getenv("SYNC_JOBS_DB", default)
+
+def get_sync_job_workers() -> int:
+    """Get the number of background sync jobs run at the same time."""
+    return max(1, int(os.getenv("SYNC_JOB_WORKERS", "2")))
+
+def get_sync_job_max_queued() -> int:
+    """Get the maximum number of queued background sync jobs before new ones are rejected."""
+    return max(1, int(os.getenv("SYNC_JOB_MAX_QUEUED", "1000")))
+
+def get_sync_job_max_attempts() -> int:
+    """Get how many times a job interrupted by a restart is started before it is failed."""
+    return max(1, int(os.getenv("SYNC_JOB_MAX_ATTEMPTS", "3")))
+
+def get_sync_job_retention() -> float:
+    """Get how long finished background sync jobs are kept, in seconds."""
+    return float(os.getenv("SYNC_JOB_RETENTION", "86400"))
+
+def is_sheets_write_behind() -> bool:
+    """Check whether canvas-to-sheet syncs are acknowledged from the local outbox by default."""
+    return os.getenv("SHEETS_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+
+def get_outbox_db_path() -> str:
+    """Get the SQLite path of the write-behind sync outbox ('' keeps it in memory only)."""
+    default = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "sheets_outbox.sqlite3")
+    return os.getenv("SHEETS_OUTBOX_DB", default)
+
+def get_outbox_retry_delay() -> float:
+    """Get the initial delay before a failed outbox flush is retried, in seconds (doubles per failure)."""
+    return float(os.getenv("SHEETS_OUTBOX_RETRY_DELAY", "2"))
+
+def get_outbox_retry_max_delay() -> float:
+    """Get the maximum delay between retries of a failed outbox flush, in seconds."""
+    return float(os.getenv("SHEETS_OUTBOX_RETRY_MAX_DELAY", "300"))
+
+def get_outbox_retention() -> float:
+    """Get how long flushed outbox entries are kept, in seconds."""
+    return float(os.getenv("SHEETS_OUTBOX_RETENTION", "86400"))
+
+def get_sheets_watch_min_interval() -> float:
+    """Get how often a recently changed or active watched sheet is polled, in seconds."""
+    return max(0.1, float(os.getenv("SHEETS_WATCH_MIN_INTERVAL", "5")))
+
+def get_sheets_watch_max_interval() -> float:
+    """Get how often an idle watched sheet is polled at most, in seconds."""
+    return max(0.1, float(os.getenv("SHEETS_WATCH_MAX_INTERVAL", "300")))
+
+def get_sheets_watch_backoff() -> float:
+    """Get the factor by which a watched sheet's poll interval grows after each unchanged poll."""
+    return max(1.0, float(os.getenv("SHEETS_WATCH_BACKOFF", "2")))
+
+def get_agent_startup_mode() -> str:
+    """Get when the agent router is built: 'eager', 'background' or 'on_demand'."""
+    return os.getenv("AGENT_STARTUP_MODE", "background").lower()
+
+def get_agent_ready_timeout() -> float:
+    """Get how long an agent run waits for the agent to finish initializing, in seconds."""
+    return float(os.getenv("AGENT_READY_TIMEOUT", "60"))
+
+def get_tool_cache_path() -> str:
+    """Get the JSON path of the on-disk Composio tool schema cache ('' disables it)."""
+    default = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "composio_tools.json")
+    return os.getenv("COMPOSIO_TOOL_CACHE", default)
+
+def get_tool_cache_ttl() -> float:
+    """Get the age in seconds after which cached tool schemas are refreshed in the background."""
+    return float(os.getenv("COMPOSIO_TOOL_CACHE_TTL", "86400"))
+
+def get_context_format() -> str:
+    """Get how canvas state is rendered into the LLM context: 'compact' or 'json'."""
+    return os.getenv("AGENT_CONTEXT_FORMAT", "compact").lower()
+
+def get_context_budget_chars() -> int:
+    """Get the approximate character budget for the canvas state in the LLM context."""
+    return int(os.getenv("AGENT_CONTEXT_BUDGET_CHARS", "12000"))
+
+def get_context_cell_chars() -> int:
+    """Get the maximum characters per field in the compact canvas context."""
+    return int(os.getenv("AGENT_CONTEXT_CELL_CHARS", "120"))
+
+def get_prompt_cache_key() -> str:
+    """Get the OpenAI prompt cache key ('' derives one from the system prompt and tool schemas)."""
+    return os.getenv("OPENAI_PROMPT_CACHE_KEY", "")
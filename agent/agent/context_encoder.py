@@ -0,0 +1,170 @@
+"""
+Context Encoder
+
+This module renders the canvas state for the LLM context as compact
+per-type tables instead of nested JSON: one row per item keyed by its
+stable id, empty fields and columns omitted, shared tag options listed
+once. Under a character budget, items the user is not talking about are
+reduced to ``id:name`` entries and finally to counts, so the per-turn
+prompt cost stays bounded as boards grow.
+"""
+
+import json
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+from .config import CANVAS_FIELD_SPEC, get_context_budget_chars, get_context_cell_chars
+
+HEADER_KEYS = [
+    ("globalTitle", "title"),
+    ("globalDescription", "description"),
+    ("syncSheetId", "syncSheetId"),
+    ("syncSheetName", "syncSheetName"),
+    ("lastAction", "lastAction"),
+]
+
+# Share of the budget for full rows; the rest is for id:name entries of elided items
+FULL_ROW_SHARE = 0.8
+
+
+def _cell(value: Any, limit: int) -> str:
+    text = str(value).replace("\\", "\\\\").replace("|", "\\|").replace("\n", "\\n")
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _render_value(kind: str, value: Any) -> str:
+    if value in (None, "", []):
+        return ""
+    if kind == "checklist":
+        return ";".join(f"{c.get('id')}[{'x' if c.get('done') else ' '}]{c.get('text', '')}" for c in value)
+    if kind == "metrics":
+        return ";".join(f"{i}:{m.get('label', '')}={m.get('value', '')}" for i, m in enumerate(value))
+    if isinstance(value, list):
+        return ",".join(str(v) for v in value)
+    return str(value)
+
+
+def _shared_options(items: List[Dict[str, Any]], item_type: str) -> Optional[List[str]]:
+    """Return the most common option list (e.g. entity field3_options) among items of a type."""
+    option_field = next((f for f, spec in CANVAS_FIELD_SPEC[item_type].items() if spec["kind"] == "string_list"), None)
+    if option_field is None:
+        return None
+    counts = Counter(tuple((i.get("data") or {}).get(option_field) or ()) for i in items if i.get("type") == item_type)
+    common = counts.most_common(1)[0][0] if counts else ()
+    return list(common) or None
+
+
+def _row_cells(item: Dict[str, Any], shared_options: Optional[List[str]]) -> Dict[str, str]:
+    data = item.get("data") or {}
+    cells = {"id": str(item.get("id", "")), "name": item.get("name") or "", "subtitle": item.get("subtitle") or ""}
+    for field, spec in CANVAS_FIELD_SPEC.get(item.get("type"), {}).items():
+        if spec["kind"] == "string_list":
+            # Only rows whose options differ from the shared set carry their own
+            if data.get(field) and data.get(field) != shared_options:
+                cells[field] = _render_value(spec["kind"], data.get(field))
+            continue
+        cells[field] = _render_value(spec["kind"], data.get(field))
+    return cells
+
+
+def _focus_ids(items: List[Dict[str, Any]], state: Dict[str, Any], focus_text: str) -> Set[str]:
+    focus: Set[str] = set()
+    last_action = str(state.get("lastAction") or "")
+    if ":" in last_action:
+        focus.add(last_action.split(":", 1)[1])
+    if focus_text:
+        text = focus_text.lower()
+        mentioned = set(re.findall(r"\b\d{1,6}\b", text))
+        for item in items:
+            item_id = str(item.get("id", ""))
+            name = (item.get("name") or "").strip().lower()
+            if item_id in mentioned or item_id.lstrip("0") in mentioned or (len(name) >= 3 and name in text):
+                focus.add(item_id)
+    return focus
+
+
+def _priority(item: Dict[str, Any]) -> int:
+    try:
+        return int(str(item.get("id", "0")))
+    except ValueError:
+        return 0
+
+
+def encode_canvas_state(
+    state: Dict[str, Any],
+    budget_chars: Optional[int] = None,
+    cell_chars: Optional[int] = None,
+    focus_text: str = "",
+) -> str:
+    """
+    Render canvas state as compact text for the LLM context.
+
+    Args:
+        state: Canvas state (items, globalTitle, ...)
+        budget_chars: Approximate size limit of the rendering
+        cell_chars: Maximum characters per table cell
+        focus_text: Text (e.g. the latest user message) whose mentioned items are always shown in full
+    """
+    budget = budget_chars if budget_chars is not None else get_context_budget_chars()
+    cell_limit = cell_chars if cell_chars is not None else get_context_cell_chars()
+    items: List[Dict[str, Any]] = [i for i in state.get("items") or [] if isinstance(i, dict)]
+
+    header = [f"{label}={json.dumps(state[key], ensure_ascii=False)}" for key, label in HEADER_KEYS if state.get(key)]
+    header.append(f"items={len(items)}")
+    lines = ["canvas: " + " | ".join(header)]
+
+    # Most common tag options per type, listed once in the table header
+    shared = {item_type: _shared_options(items, item_type) for item_type in CANVAS_FIELD_SPEC}
+
+    rows: Dict[str, Dict[str, str]] = {}
+    sizes: Dict[str, int] = {}
+    for item in items:
+        cells = _row_cells(item, shared.get(item.get("type")))
+        rows[cells["id"]] = cells
+        sizes[cells["id"]] = sum(min(len(v), cell_limit) + 1 for v in cells.values())
+
+    # Full rows: focused items first (up to the whole budget), then the newest
+    focus = _focus_ids(items, state, focus_text)
+    ranked = sorted(items, key=lambda i: (str(i.get("id")) not in focus, -_priority(i)))
+    full: Set[str] = set()
+    used = len(lines[0])
+    for item in ranked:
+        item_id = str(item.get("id", ""))
+        limit = budget if item_id in focus else budget * FULL_ROW_SHARE
+        if used + sizes[item_id] <= limit:
+            full.add(item_id)
+            used += sizes[item_id]
+
+    for item_type in CANVAS_FIELD_SPEC:
+        typed = [rows[str(i.get("id", ""))] for i in items if i.get("type") == item_type and str(i.get("id", "")) in full]
+        if not typed:
+            continue
+        # Drop columns that are empty in every shown row
+        columns = ["id"] + [c for c in ["name", "subtitle", *CANVAS_FIELD_SPEC[item_type]] if any(r.get(c) for r in typed)]
+        title = f"{item_type} ({len(typed)}): " + "|".join(columns)
+        if shared.get(item_type):
+            title += " ; shared field3_options=" + ",".join(shared[item_type])
+        lines.append(title)
+        for r in typed:
+            lines.append("|".join(_cell(r.get(c, ""), cell_limit) for c in columns))
+
+    elided = [i for i in items if str(i.get("id", "")) not in full]
+    if elided:
+        used = sum(len(line) + 1 for line in lines)
+        names: List[str] = []
+        for item in elided:
+            entry = f"{item.get('id')}:{_cell(item.get('name') or '', 40)}"
+            if used + len(entry) + 2 > budget:
+                break
+            names.append(entry)
+            used += len(entry) + 2
+        if names:
+            lines.append(f"name only ({len(names)}): " + ", ".join(names))
+        hidden = elided[len(names):]
+        if hidden:
+            by_type = Counter(i.get("type") for i in hidden)
+            summary = ", ".join(f"{t} {n}" for t, n in sorted(by_type.items(), key=lambda kv: str(kv[0])))
+            lines.append(f"not shown: {len(hidden)} items ({summary})")
+        lines.append("use get_canvas_items(item_ids) for full details of items not shown in full")
+    return "\n".join(lines)
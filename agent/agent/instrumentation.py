@@ -0,0 +1,213 @@
+"""
+Request Instrumentation
+
+This module provides lightweight tracing and metrics for the agent server:
+``span()`` timings for Composio calls, conversions and other steps, a
+per-request trace collected via context variables, and a metrics registry
+rendered in the Prometheus text format for the ``/metrics`` endpoint.
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import is_debug_mode
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("agent_trace", default=None)
+
+
+def _labels(values: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in values.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with labels."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            # Per-bucket counts, then +Inf count, then sum
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {cumulative:g}")
+                cumulative += series[len(self.buckets)]
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {cumulative:g}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]:g}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds counters, histograms and stats collectors for ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Expose the numeric fields of a ``stats()``-style dict as gauges named ``<prefix>_<field>``.
+
+        Nested dicts become one gauge with the inner keys as a ``key`` label.
+        """
+        with self._lock:
+            self._collectors[prefix] = collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        for metric in metrics:
+            lines.extend(metric.render())
+        for prefix, collect in collectors:
+            try:
+                stats = collect()
+            except Exception as e:
+                print(f"Metrics collector {prefix} failed: {e}")
+                continue
+            for field, value in stats.items():
+                name = f"{prefix}_{field}"
+                if isinstance(value, dict):
+                    lines.append(f"# TYPE {name} gauge")
+                    for key, inner in sorted(value.items()):
+                        if isinstance(inner, (int, float)):
+                            lines.append(f"{name}{_format_labels((('key', str(key)),))} {float(inner):g}")
+                elif isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {name} gauge")
+                    lines.append(f"{name} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+SPAN_DURATION = METRICS.histogram("agent_span_duration_seconds", "Duration of traced operations.")
+SPAN_ERRORS = METRICS.counter("agent_span_errors_total", "Traced operations that raised.")
+SPAN_ROWS = METRICS.counter("agent_span_rows_total", "Sheet rows read, written or converted by traced operations.")
+REQUEST_DURATION = METRICS.histogram("agent_http_request_duration_seconds", "HTTP request latency until response headers.")
+RESPONSE_BYTES = METRICS.counter("agent_http_response_bytes_total", "HTTP response body bytes with a known length.")
+
+
+@contextmanager
+def span(name: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block of work.
+
+    ``labels`` must be low-cardinality (e.g. a Composio slug); they label the
+    duration histogram. The yielded record may be annotated with ``rows`` or
+    other details, which are kept on the request trace only.
+    """
+    record: Dict[str, Any] = {"span": name, **labels}
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["error"] = True
+        SPAN_ERRORS.inc(span=name, **labels)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        record["duration_ms"] = round(duration * 1000, 3)
+        SPAN_DURATION.observe(duration, span=name, **labels)
+        rows = record.get("rows")
+        if isinstance(rows, int) and rows:
+            SPAN_ROWS.inc(rows, span=name, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append(record)
+
+
+@contextmanager
+def request_trace() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the spans recorded while handling one request."""
+    trace: List[Dict[str, Any]] = []
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def server_timing(trace: List[Dict[str, Any]]) -> str:
+    """Summarize a trace as a ``Server-Timing`` header value (total per span name)."""
+    totals: Dict[str, float] = {}
+    for record in trace:
+        totals[record["span"]] = totals.get(record["span"], 0.0) + record["duration_ms"]
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in totals.items())
+
+
+def log_trace(method: str, path: str, status: int, duration: float, trace: List[Dict[str, Any]]) -> None:
+    """Print a request trace as one JSON line when debug mode is enabled."""
+    if is_debug_mode():
+        print(json.dumps({
+            "event": "request",
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "spans": trace,
+        }, default=str))
@@ -0,0 +1,194 @@
+"""
+Prompt Cache
+
+This module keeps the agent's requests friendly to provider-side prompt
+caching. Everything static (tool schemas, then the system prompt) forms a
+byte-identical prefix across turns and sessions; the canvas state and the
+conversation follow it. A cache key derived from that prefix routes
+requests with the same prefix together, and an LLM event handler reports
+cached vs. uncached prompt tokens and time to first token per LLM call.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.event_handlers import BaseEventHandler
+from llama_index.core.instrumentation.events.llm import (
+    LLMChatEndEvent,
+    LLMChatInProgressEvent,
+    LLMChatStartEvent,
+)
+from llama_index.core.tools import BaseTool
+from llama_index.protocols.ag_ui.utils import validate_tool
+
+from .config import get_prompt_cache_key, is_debug_mode
+from .instrumentation import METRICS
+
+SYSTEM_MESSAGE_ID = "canvas-system-prompt"
+
+# How long an LLM call may go without ending before its timing entries are dropped
+STALE_CALL_SECONDS = 600.0
+
+PROMPT_TOKENS = METRICS.counter("agent_llm_prompt_tokens_total", "Prompt tokens sent to the LLM, by provider cache status.")
+COMPLETION_TOKENS = METRICS.counter("agent_llm_completion_tokens_total", "Completion tokens generated by the LLM.")
+FIRST_TOKEN = METRICS.histogram("agent_llm_time_to_first_token_seconds", "Time from an LLM request to its first streamed chunk.")
+
+
+def tool_schemas(tools: List[Union[BaseTool, Callable]]) -> List[Dict[str, Any]]:
+    """Return the OpenAI function schemas of tools, in the order they are sent."""
+    return [validate_tool(tool).metadata.to_openai_tool(skip_length_check=True) for tool in tools]
+
+
+def prefix_fingerprint(system_prompt: str, tools: List[Union[BaseTool, Callable]]) -> str:
+    """Hash the static request prefix; it changes only when the prompt or a tool schema does."""
+    payload = json.dumps(
+        {"tools": tool_schemas(tools), "system": system_prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def prompt_cache_key(system_prompt: str, tools: List[Union[BaseTool, Callable]]) -> str:
+    """Return the configured prompt cache key, or one derived from the static prefix."""
+    return get_prompt_cache_key() or f"canvas-agent-{prefix_fingerprint(system_prompt, tools)[:16]}"
+
+
+def _usage(raw: Any) -> Optional[Dict[str, int]]:
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or 0),
+    }
+
+
+class PromptCacheStats:
+    """Running totals of prompt cache usage for ``/metrics``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turns = 0
+        self._prompt_tokens = 0
+        self._cached_tokens = 0
+        self._last: Dict[str, Any] = {}
+
+    def record(self, turn: Dict[str, Any]) -> None:
+        with self._lock:
+            self._turns += 1
+            self._prompt_tokens += turn["prompt_tokens"]
+            self._cached_tokens += turn["cached_tokens"]
+            self._last = turn
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "turns": self._turns,
+                "prompt_tokens": self._prompt_tokens,
+                "cached_tokens": self._cached_tokens,
+                "hit_ratio": self._cached_tokens / self._prompt_tokens if self._prompt_tokens else 0.0,
+                "last_turn": {k: v for k, v in self._last.items() if isinstance(v, (int, float))},
+            }
+
+
+class PromptUsageHandler(BaseEventHandler):
+    """Records token usage and time to first token of each streamed LLM call."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PromptUsageHandler"
+
+    def handle(self, event: Any, **kwargs: Any) -> None:
+        if isinstance(event, LLMChatStartEvent):
+            now = time.perf_counter()
+            key = _call_key(event)
+            with _calls_lock:
+                # Calls that never ended (failed or abandoned streams) are dropped after a while
+                for stale in [k for k, started in _started.items() if now - started > STALE_CALL_SECONDS]:
+                    _started.pop(stale, None)
+                    _first_token.pop(stale, None)
+                _started[key] = now
+                _first_token.pop(key, None)
+        elif isinstance(event, LLMChatInProgressEvent):
+            key = _call_key(event)
+            with _calls_lock:
+                started = _started.get(key)
+                if started is not None and key not in _first_token:
+                    _first_token[key] = time.perf_counter() - started
+        elif isinstance(event, LLMChatEndEvent):
+            key = _call_key(event)
+            with _calls_lock:
+                _started.pop(key, None)
+                ttft = _first_token.pop(key, None)
+            if ttft is not None:
+                FIRST_TOKEN.observe(ttft)
+            usage = _usage(getattr(event.response, "raw", None)) if event.response is not None else None
+            if usage is not None:
+                record_usage(usage, ttft)
+
+
+def _call_key(event: Any) -> Hashable:
+    """
+    Identify the LLM call an event belongs to: its span, or, when it was
+    dispatched outside any span, the task (else thread) making the call; a
+    streamed call starts and is consumed in the same workflow step task.
+    """
+    if event.span_id is not None:
+        return event.span_id
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return ("task", id(task)) if task is not None else ("thread", threading.get_ident())
+
+# Start and first-chunk times by LLM call; entries are removed when the call ends or goes stale
+_started: Dict[Hashable, float] = {}
+_first_token: Dict[Hashable, float] = {}
+_calls_lock = threading.Lock()
+
+_stats = PromptCacheStats()
+_install_lock = threading.Lock()
+_installed = False
+
+
+def record_usage(usage: Dict[str, int], ttft: Optional[float] = None) -> Dict[str, Any]:
+    """Count one LLM call's prompt tokens as cached or uncached and log the turn in debug mode."""
+    turn: Dict[str, Any] = {
+        **usage,
+        "uncached_tokens": max(0, usage["prompt_tokens"] - usage["cached_tokens"]),
+    }
+    if ttft is not None:
+        turn["ttft_ms"] = round(ttft * 1000, 3)
+    PROMPT_TOKENS.inc(turn["cached_tokens"], cache="cached")
+    PROMPT_TOKENS.inc(turn["uncached_tokens"], cache="uncached")
+    COMPLETION_TOKENS.inc(turn["completion_tokens"])
+    _stats.record(turn)
+    if is_debug_mode():
+        print(json.dumps({"event": "llm_usage", **turn}))
+    return turn
+
+
+def get_prompt_cache_stats() -> Dict[str, Any]:
+    """Return the prompt cache totals and the last turn's usage."""
+    return _stats.stats()
+
+
+def install_prompt_usage_handler() -> None:
+    """Attach the usage handler to the root LlamaIndex dispatcher once."""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            get_dispatcher().add_event_handler(PromptUsageHandler())
+            METRICS.register_collector("agent_llm_prompt_cache", get_prompt_cache_stats)
+            _installed = True
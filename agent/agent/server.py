@@ -1,9 +1,13 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Literal, Optional, Union
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import os
+import time
 
 # Load environment variables from .env/.env.local (repo root or agent dir) if present
 try:
@@ -27,31 +31,289 @@ def _load_env_files() -> None:
 
 _load_env_files()
 
-from .agent import agentic_chat_router
-from .sheets_integration import get_sheet_data, convert_sheet_to_canvas_items, sync_canvas_to_sheet, get_sheet_names, create_new_sheet
+from .sheets_integration import (
+    extract_sheet_id,
+    get_sheet_data,
+    convert_sheet_data_cached,
+    convert_sheet_data_versioned,
+    iter_sheet_import_events,
+    get_sheets_data_batch,
+    merge_canvas_tabs,
+    sync_canvas_to_sheet,
+    get_sheet_names,
+    create_new_sheet,
+)
+from .composio_pool import get_client_pool, shutdown_client_pool
+from .sheets_executor import get_sheets_executor, run_sheets_call, shutdown_sheets_executor
+from .sync_coalescer import SyncCoalescer
+from .sync_jobs import JobQueueFullError, SyncJobQueue
+from .sync_outbox import SheetsOutbox
+from .sheets_watcher import SheetWatcher
+from .config import is_sheets_write_behind
+from .snapshot_store import get_snapshot_store
+from .sheets_cache import get_metadata_cache
+from .sheets_backend import get_sheets_backend
+from .sheets_scheduler import get_sheets_scheduler
+from .sheets_singleflight import get_sheets_singleflight
+from .agent_runtime import agent_runtime, AgentNotReadyError
+from .tool_registry import get_tool_registry
+from .instrumentation import METRICS, REQUEST_DURATION, RESPONSE_BYTES, request_trace, server_timing, log_trace
 
-app = FastAPI()
-app.include_router(agentic_chat_router)
+async def _flush_canvas_sync(sheet_id: str, canvas_state: dict, sheet_name: Optional[str], incremental: Optional[bool]) -> dict:
+    # The watcher must not read the tab halfway through our own write
+    with sheet_watcher.writing(sheet_id, sheet_name):
+        return await run_sheets_call(
+            "sync_to_sheets", sync_canvas_to_sheet, sheet_id, canvas_state, sheet_name,
+            incremental=incremental, spreadsheet_id=sheet_id,
+        )
+
+sync_coalescer = SyncCoalescer(_flush_canvas_sync)
+sheet_watcher = SheetWatcher()
+WATCH_KEEPALIVE_SECONDS = 15
+# Write-behind syncs are replayed through the coalescer, so they never overlap direct syncs of a sheet
+sync_outbox = SheetsOutbox(sync_coalescer.submit)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the shared Composio client pool and start the agent build and the background sync tasks; close them on shutdown."""
+    if get_sheets_backend().name == "composio":
+        await asyncio.to_thread(get_client_pool().start)
+    # "eager" blocks here until the agent is built; "background" returns at once
+    await asyncio.to_thread(agent_runtime.start)
+    await sync_jobs.start()
+    await sync_outbox.start()
+    await sheet_watcher.start()
+    try:
+        yield
+    finally:
+        await sheet_watcher.aclose()
+        await sync_jobs.aclose()
+        await sync_outbox.aclose()
+        await sync_coalescer.aclose()
+        shutdown_sheets_executor()
+        await asyncio.to_thread(shutdown_client_pool)
+        get_snapshot_store().close()
+
+app = FastAPI(lifespan=lifespan)
+
+METRICS.register_collector("composio_pool", lambda: get_client_pool().stats())
+METRICS.register_collector("sheets_executor", lambda: get_sheets_executor().stats())
+METRICS.register_collector("sheets_metadata_cache", lambda: get_metadata_cache().stats())
+METRICS.register_collector("canvas_snapshot_store", lambda: get_snapshot_store().stats())
+METRICS.register_collector("sheets_sync_coalescer", sync_coalescer.stats)
+METRICS.register_collector("sync_jobs", lambda: sync_jobs.stats())
+METRICS.register_collector("sheets_outbox", sync_outbox.stats)
+METRICS.register_collector("sheets_watcher", sheet_watcher.stats)
+METRICS.register_collector("composio_tool_registry", lambda: get_tool_registry().stats())
+METRICS.register_collector("sheets_backend", lambda: get_sheets_backend().stats())
+METRICS.register_collector("sheets_scheduler", lambda: get_sheets_scheduler().stats())
+METRICS.register_collector("sheets_singleflight", lambda: get_sheets_singleflight().stats())
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Time each request, record its spans and expose them as Server-Timing."""
+    start = time.perf_counter()
+    with request_trace() as trace:
+        response = await call_next(request)
+    duration = time.perf_counter() - start
+    
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    REQUEST_DURATION.observe(duration, method=request.method, path=path, status=response.status_code)
+    content_length = response.headers.get("content-length")
+    if content_length:
+        RESPONSE_BYTES.inc(int(content_length), path=path)
+    
+    if trace:
+        response.headers["Server-Timing"] = server_timing(trace)
+    log_trace(request.method, path, response.status_code, duration, trace)
+    return response
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus-format latency histograms, counters and component stats."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+async def health():
+    """Liveness check; answers as soon as the server is up."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness check; 503 until the agent router has been built."""
+    readiness = agent_runtime.readiness()
+    return JSONResponse(status_code=200 if readiness["status"] == "ready" else 503, content=readiness)
+
+@app.post("/run")
+async def run_agent(request: Request):
+    """
+    AG-UI agent endpoint.
+    
+    The agent router is built lazily (see ``AGENT_STARTUP_MODE``); this
+    waits for it and then hands the run to the AG-UI workflow router.
+    """
+    try:
+        run_endpoint = await agent_runtime.get_run_endpoint()
+    except AgentNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    from ag_ui.core import RunAgentInput
+    try:
+        run_input = RunAgentInput.model_validate(await request.json())
+    except ValueError as e:  # invalid JSON or pydantic ValidationError
+        raise HTTPException(status_code=422, detail=str(e))
+    return await run_endpoint(run_input)
 
 # Request models
 class SheetSyncRequest(BaseModel):
     sheet_id: str
     sheet_name: Optional[str] = None
+    stream: bool = False
+    base_version: Optional[str] = None
+    background: bool = False
+
+class BatchSheetSyncRequest(BaseModel):
+    sheet_id: str
+    sheet_names: Union[List[str], Literal["all"]] = "all"
 
 class CanvasToSheetSyncRequest(BaseModel):
     canvas_state: dict
     sheet_id: str
     sheet_name: Optional[str] = None
+    incremental: Optional[bool] = None
+    background: bool = False
+    write_behind: Optional[bool] = None
+    idempotency_key: Optional[str] = None
 
 class CreateSheetRequest(BaseModel):
     title: str
 
+def _sheets_timeout(operation: str) -> HTTPException:
+    return HTTPException(
+        status_code=504,
+        detail=f"Timed out while {operation}. Google Sheets may be slow; please retry."
+    )
+
+async def _stream_sheet_import(sheet_id: str, sheet_name: Optional[str]):
+    """Yield NDJSON import events, pulling each row window on the sheets executor."""
+    events = iter_sheet_import_events(sheet_id, sheet_name)
+    try:
+        while True:
+            event = await run_sheets_call("sync", next, events, None)
+            if event is None:
+                break
+            yield json.dumps(event) + "\n"
+    except asyncio.TimeoutError:
+        yield json.dumps({"type": "error", "error": "Timed out while importing the sheet"}) + "\n"
+    except Exception as e:
+        print(f"Error in streamed sheets sync: {e}")
+        yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+async def _import_sheet(
+    sheet_id: str,
+    sheet_name: Optional[str],
+    base_version: Optional[str] = None,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """Fetch and convert a tab; return the /sheets/sync response body."""
+    if progress:
+        progress({"stage": "fetching"})
+    sheet_watcher.touch(sheet_id, sheet_name)
+    # Fetch sheet data using Composio
+    sheet_data = await run_sheets_call("sync", get_sheet_data, sheet_id, sheet_name, spreadsheet_id=sheet_id)
+    if not sheet_data:
+        raise HTTPException(
+            status_code=400, 
+            detail="Failed to fetch sheet data. Please check the sheet ID and ensure it's accessible."
+        )
+    
+    if progress:
+        progress({"stage": "converting", "rows": len(sheet_data["rows"])})
+    # Convert to canvas items, reusing the stored conversion if the rows are unchanged
+    result = await run_sheets_call(
+        "sync", convert_sheet_data_versioned, sheet_data, sheet_id, base_version
+    )
+    canvas_data = result["state"]
+    
+    content = {
+        "success": True,
+        "version": result["version"],
+        "cached": result["cached"],
+        "message": f"Successfully imported {len(canvas_data['items'])} items from sheet '{canvas_data['globalTitle']}'"
+    }
+    if result["patch"] is not None:
+        content["patch"] = result["patch"]
+    else:
+        content["data"] = canvas_data
+    return content
+
+async def _export_canvas(
+    sheet_id: str,
+    canvas_state: dict,
+    sheet_name: Optional[str] = None,
+    incremental: Optional[bool] = None,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """Write the canvas to a tab; return the /sync-to-sheets response body."""
+    if progress:
+        progress({"stage": "writing", "items": len(canvas_state.get("items", []))})
+    # Write-behind entries recorded before this request hold older states
+    recorded_seq = sync_outbox.last_seq
+    # Coalesce with other syncs to the same sheet; the latest canvas state wins
+    result = await sync_coalescer.submit(sheet_id, canvas_state, sheet_name, incremental=incremental)
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=400,
+            detail=result.get("error", "Failed to sync canvas to sheets")
+        )
+    # Never replay those older states over this one
+    await sync_outbox.supersede(sheet_id, sheet_name, recorded_seq)
+    return {
+        "success": True,
+        "message": result.get("message"),
+        "items_synced": result.get("items_synced", 0),
+        "coalesced_requests": result.get("coalesced_requests", 1)
+    }
+
+async def _run_import_job(job: dict, progress: Callable[[dict], None]) -> dict:
+    payload = job["payload"]
+    return await _import_sheet(payload["sheet_id"], payload.get("sheet_name"), payload.get("base_version"), progress)
+
+async def _run_export_job(job: dict, progress: Callable[[dict], None]) -> dict:
+    payload = job["payload"]
+    return await _export_canvas(
+        payload["sheet_id"], payload["canvas_state"], payload.get("sheet_name"), payload.get("incremental"), progress
+    )
+
+sync_jobs = SyncJobQueue({"import": _run_import_job, "export": _run_export_job})
+
+async def _submit_job(kind: str, payload: dict) -> JSONResponse:
+    """Enqueue a background sync job and answer 202 with its ID."""
+    try:
+        job = await sync_jobs.submit(kind, payload)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"{e}; please retry later.")
+    return JSONResponse(status_code=202, content={"success": True, **job})
+
 # Sheets sync endpoint
 @app.post("/sheets/sync")
 async def sync_sheets(request: SheetSyncRequest):
     """
     Sync data from Google Sheets to canvas format.
     
+    With ``stream`` set, the response is NDJSON: a ``meta`` event, an
+    ``items`` event per converted row window and a final ``done`` event.
+    
+    Every response carries a ``version``. Sending it back as ``base_version``
+    on a later import returns a JSON Patch (RFC 6902) ``patch`` against that
+    import instead of the full ``data``, when the server still has it.
+    
+    With ``background`` set, the import runs as a sync job: the response
+    (202) carries a ``job_id`` to poll at ``/jobs/{job_id}``, and the job's
+    ``result`` is the body this endpoint would have returned.
+    
     Args:
         request: Contains sheet_id to import from
         
@@ -60,16 +322,7 @@ async def sync_sheets(request: SheetSyncRequest):
     """
     try:
         # Extract sheet ID from URL if full URL is provided
-        sheet_id = request.sheet_id
-        if "/spreadsheets/d/" in sheet_id:
-            # Extract ID from Google Sheets URL
-            start = sheet_id.find("/spreadsheets/d/") + len("/spreadsheets/d/")
-            end = sheet_id.find("/", start)
-            if end == -1:
-                end = sheet_id.find("#", start)
-            if end == -1:
-                end = len(sheet_id)
-            sheet_id = sheet_id[start:end]
+        sheet_id = extract_sheet_id(request.sheet_id)
         
         sheet_name = request.sheet_name
         if sheet_name:
@@ -77,27 +330,86 @@ async def sync_sheets(request: SheetSyncRequest):
         else:
             print(f"Syncing sheet: {sheet_id} (default sheet)")
         
-        # Fetch sheet data using Composio
-        sheet_data = get_sheet_data(sheet_id, sheet_name)
-        if not sheet_data:
+        if request.background:
+            return await _submit_job("import", {
+                "sheet_id": sheet_id, "sheet_name": sheet_name, "base_version": request.base_version,
+            })
+        
+        if request.stream:
+            return StreamingResponse(
+                _stream_sheet_import(sheet_id, sheet_name),
+                media_type="application/x-ndjson"
+            )
+        
+        return JSONResponse(content=await _import_sheet(sheet_id, sheet_name, request.base_version))
+        
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise _sheets_timeout("importing the sheet")
+    except Exception as e:
+        print(f"Error in sheets sync: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+@app.post("/sheets/sync-batch")
+async def sync_sheets_batch(request: BatchSheetSyncRequest):
+    """
+    Import several tabs of a spreadsheet into one canvas.
+    
+    All tabs are read with a single multi-range BATCH_GET and converted
+    concurrently on the sheets executor.
+    
+    Args:
+        request: Contains sheet_id and a list of tab names, or "all"
+        
+    Returns:
+        Merged canvas state plus per-tab provenance
+    """
+    try:
+        sheet_id = extract_sheet_id(request.sheet_id)
+        sheet_names = None if request.sheet_names == "all" else request.sheet_names
+        print(f"Batch syncing sheet: {sheet_id} (tabs: {request.sheet_names})")
+        
+        batch_data = await run_sheets_call("sync", get_sheets_data_batch, sheet_id, sheet_names, spreadsheet_id=sheet_id)
+        if not batch_data:
             raise HTTPException(
-                status_code=400, 
-                detail="Failed to fetch sheet data. Please check the sheet ID and ensure it's accessible."
+                status_code=400,
+                detail="Failed to fetch sheet data. Please check the sheet ID, tab names and ensure it's accessible."
             )
         
-        # Convert to canvas items
-        canvas_data = convert_sheet_to_canvas_items(sheet_data, sheet_id)
+        converted = await asyncio.gather(*(
+            run_sheets_call(
+                "sync",
+                convert_sheet_data_cached,
+                {
+                    "rows": tab["rows"],
+                    "sheet_name": tab["sheet_name"],
+                    "title": batch_data["title"],
+                    "spreadsheet_info": batch_data["spreadsheet_info"],
+                },
+                sheet_id,
+            )
+            for tab in batch_data["tabs"]
+        ))
+        tab_states = [canvas_data for canvas_data, _ in converted]
+        merged = merge_canvas_tabs(batch_data["title"], sheet_id, tab_states)
         
         return JSONResponse(content={
             "success": True,
-            "data": canvas_data,
-            "message": f"Successfully imported {len(canvas_data['items'])} items from sheet '{canvas_data['globalTitle']}'"
+            "data": merged["state"],
+            "provenance": merged["provenance"],
+            "message": f"Successfully imported {len(merged['state']['items'])} items from {len(tab_states)} tabs of '{batch_data['title']}'"
         })
         
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        raise _sheets_timeout("importing the sheet tabs")
     except Exception as e:
-        print(f"Error in sheets sync: {e}")
+        print(f"Error in batch sheets sync: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
@@ -108,6 +420,16 @@ async def sync_canvas_to_sheets(request: CanvasToSheetSyncRequest):
     """
     Sync canvas state to Google Sheets.
     
+    Requests for the same sheet that arrive within the coalescing window
+    are collapsed into one write of the latest canvas state. With
+    ``background`` set, the sync runs as a job (see ``/sheets/sync``).
+    
+    With ``write_behind`` (default ``SHEETS_WRITE_BEHIND``) the canvas is
+    recorded in the local outbox and acknowledged (202) once stored there;
+    it is written to the sheet in the background, in order. Resending with
+    the same ``idempotency_key`` does not record it twice, and
+    ``/outbox/{idempotency_key}`` reports whether it has been written.
+    
     Args:
         request: Contains canvas_state and sheet_id
         
@@ -118,23 +440,33 @@ async def sync_canvas_to_sheets(request: CanvasToSheetSyncRequest):
         sheet_name_info = f" (sheet: {request.sheet_name})" if request.sheet_name else ""
         print(f"[SYNC] Syncing canvas to sheet: {request.sheet_id}{sheet_name_info}")
         
-        # Call the sync function with sheet name
-        result = sync_canvas_to_sheet(request.sheet_id, request.canvas_state, request.sheet_name)
+        if request.background:
+            return await _submit_job("export", {
+                "sheet_id": request.sheet_id, "canvas_state": request.canvas_state,
+                "sheet_name": request.sheet_name, "incremental": request.incremental,
+            })
         
-        if result.get("success"):
-            return JSONResponse(content={
+        write_behind = is_sheets_write_behind() if request.write_behind is None else request.write_behind
+        if write_behind:
+            entry = await sync_outbox.enqueue(
+                request.sheet_id, request.canvas_state, request.sheet_name,
+                incremental=request.incremental, idempotency_key=request.idempotency_key,
+            )
+            return JSONResponse(status_code=202, content={
                 "success": True,
-                "message": result.get("message"),
-                "items_synced": result.get("items_synced", 0)
+                "queued": True,
+                "message": f"Recorded {len(request.canvas_state.get('items', []))} items; they will be written to the sheet shortly",
+                **entry,
             })
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=result.get("error", "Failed to sync canvas to sheets")
-            )
+        
+        return JSONResponse(content=await _export_canvas(
+            request.sheet_id, request.canvas_state, request.sheet_name, request.incremental
+        ))
             
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        raise _sheets_timeout("syncing the canvas to the sheet")
     except Exception as e:
         print(f"Error in canvas-to-sheets sync: {e}")
         raise HTTPException(
@@ -142,6 +474,73 @@ async def sync_canvas_to_sheets(request: CanvasToSheetSyncRequest):
             detail=f"Internal server error: {str(e)}"
         )
 
+async def _job_events(job_id: str):
+    """Yield a job's state as server-sent events until it finishes."""
+    async for job in sync_jobs.subscribe(job_id):
+        yield f"data: {json.dumps(job)}\n\n"
+
+@app.get("/jobs/{job_id}")
+async def get_sync_job(job_id: str):
+    """Poll a background sync job: status, progress and, once finished, its result or error."""
+    job = await sync_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sync job '{job_id}'")
+    return JSONResponse(content=job)
+
+@app.get("/jobs/{job_id}/events")
+async def subscribe_sync_job(job_id: str):
+    """Subscribe to a background sync job as server-sent events, one per change, ending when it finishes."""
+    if await sync_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sync job '{job_id}'")
+    return StreamingResponse(_job_events(job_id), media_type="text/event-stream")
+
+@app.delete("/jobs/{job_id}")
+async def cancel_sync_job(job_id: str):
+    """Cancel a queued or running sync job; finished jobs are returned unchanged."""
+    job = await sync_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sync job '{job_id}'")
+    return JSONResponse(content=job)
+
+@app.get("/outbox/{idempotency_key}")
+async def get_outbox_entry(idempotency_key: str):
+    """Report whether a write-behind sync is still pending, was written, or was superseded by a newer one."""
+    entry = await asyncio.to_thread(sync_outbox.get, idempotency_key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown outbox entry '{idempotency_key}'")
+    return JSONResponse(content=entry)
+
+async def _watch_events(sheet_id: str, sheet_name: Optional[str]):
+    """Yield server-sent events for a watched tab, with keep-alive comments while it is quiet."""
+    updates = sheet_watcher.watch(sheet_id, sheet_name)
+    try:
+        yield f"data: {json.dumps({'type': 'watching', 'sheet_id': sheet_id, 'sheet_name': sheet_name})}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(updates.get(), timeout=WATCH_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield f"data: {json.dumps(event)}\n\n"
+    finally:
+        sheet_watcher.unwatch(sheet_id, sheet_name, updates)
+
+@app.get("/sheets/watch")
+async def watch_sheet(sheet_id: str, sheet_name: Optional[str] = None):
+    """
+    Subscribe to changes made to a tab outside the canvas, as server-sent events.
+    
+    The tab is polled while at least one client is subscribed. Each
+    ``sheet_changed`` event lists the changed row ``ranges``; re-import
+    with ``base_version`` to receive just the resulting patch.
+    """
+    return StreamingResponse(
+        _watch_events(extract_sheet_id(sheet_id), sheet_name),
+        media_type="text/event-stream",
+    )
+
 @app.post("/sheets/list")
 async def list_sheet_names(request: SheetSyncRequest):
     """
@@ -157,7 +556,7 @@ async def list_sheet_names(request: SheetSyncRequest):
         print(f"Listing sheets in: {request.sheet_id}")
         
         # Get sheet names using Composio
-        sheet_names = get_sheet_names(request.sheet_id)
+        sheet_names = await run_sheets_call("list", get_sheet_names, request.sheet_id, spreadsheet_id=request.sheet_id)
         if not sheet_names:
             raise HTTPException(
                 status_code=400, 
@@ -172,6 +571,8 @@ async def list_sheet_names(request: SheetSyncRequest):
         
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        raise _sheets_timeout("listing sheets")
     except Exception as e:
         print(f"Error in sheet listing: {e}")
         raise HTTPException(
@@ -194,7 +595,7 @@ async def create_sheet(request: CreateSheetRequest):
         print(f"Creating new sheet with title: {request.title}")
         
         # Create new sheet using Composio
-        result = create_new_sheet(request.title)
+        result = await run_sheets_call("create", create_new_sheet, request.title)
         if not result.get("success"):
             raise HTTPException(
                 status_code=400, 
@@ -211,6 +612,8 @@ async def create_sheet(request: CreateSheetRequest):
         
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        raise _sheets_timeout("creating the sheet")
     except Exception as e:
         print(f"Error creating sheet: {e}")
         raise HTTPException(
@@ -0,0 +1,425 @@
+"""
+Sheets Backends
+
+This module puts the Google Sheets tool calls made by
+``sheets_integration`` behind a small interface. ``ComposioSheetsBackend``
+executes them with a pooled Composio client; ``LocalSheetsBackend`` serves
+the same slugs and response shapes from SQLite, with injectable latency
+and a per-minute request quota, so imports and syncs can be developed and
+benchmarked without a Google account.
+"""
+
+import abc
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from .composio_pool import get_client_pool
+from .config import (
+    get_composio_user_id,
+    get_local_sheets_db_path,
+    get_local_sheets_latency,
+    get_local_sheets_rate_limit,
+    get_sheets_backend_name,
+)
+
+MIN_GRID_ROWS = 1000
+MIN_GRID_COLUMNS = 26
+
+# Slugs that change an existing spreadsheet, and so its revision
+_WRITE_SLUGS = ("GOOGLESHEETS_BATCH_UPDATE", "GOOGLESHEETS_DELETE_DIMENSION")
+
+_A1_CELLS = re.compile(r"^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$")
+
+_NUMBER = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)$")
+
+
+class SheetsBackend(abc.ABC):
+    """Executes Google Sheets tool slugs and returns Composio-style results."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def execute(self, slug: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run one tool slug; return its result dict, or None if the call could not be made."""
+
+    def revision(self, spreadsheet_id: str) -> Optional[str]:
+        """Return a token that changes whenever the spreadsheet does, or None if the backend has none."""
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class ComposioSheetsBackend(SheetsBackend):
+    """Google Sheets through Composio, with clients checked out of the shared pool.
+
+    The Sheets API exposes no revision (only the Drive API's file version
+    would), so ``revision`` is unsupported and watchers compare content.
+    """
+
+    name = "composio"
+
+    def execute(self, slug: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with get_client_pool().acquire() as composio:
+            return composio.tools.execute(
+                user_id=get_composio_user_id(),
+                slug=slug,
+                arguments=arguments
+            )
+
+
+def _column_index(letters: str) -> int:
+    """Return the 1-based index of a column name (A=1, AA=27)."""
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _parse_range(a1_range: str) -> Tuple[str, int, Optional[int], int, Optional[int]]:
+    """Split ``Tab!A1:C10`` into (tab, first_row, last_row, first_col, last_col), 1-based and inclusive."""
+    tab, sep, cells = a1_range.rpartition("!")
+    if not sep:
+        return a1_range.strip("'"), 1, None, 1, None
+    match = _A1_CELLS.match(cells)
+    if match is None:
+        raise ValueError(f"Unable to parse range: {a1_range}")
+    start_col, start_row, end_col, end_row = match.groups()
+    single = end_col is None and end_row is None
+    first_row = int(start_row) if start_row else 1
+    first_col = _column_index(start_col) if start_col else 1
+    last_row = first_row if single and start_row else (int(end_row) if end_row else None)
+    last_col = first_col if single and start_col else (_column_index(end_col) if end_col else None)
+    return tab.strip("'"), first_row, last_row, first_col, last_col
+
+
+def user_entered_value(value: Any) -> str:
+    """
+    Return how Google shows a value written with ``USER_ENTERED`` when read back.
+
+    Numbers lose leading and trailing zeros (``"0001"`` reads back as ``"1"``),
+    booleans are upper-cased and a leading apostrophe is dropped; anything
+    else stays text. Dates and formulas are not emulated.
+    """
+    text = "" if value is None else str(value)
+    if text.startswith("'"):
+        return text[1:]
+    stripped = text.strip()
+    if _NUMBER.match(stripped):
+        number = Decimal(stripped)
+        return str(int(number)) if number == number.to_integral_value() else format(number.normalize(), "f")
+    if stripped.upper() in ("TRUE", "FALSE"):
+        return stripped.upper()
+    return text
+
+
+def _trim(row: List[Any]) -> List[Any]:
+    end = len(row)
+    while end and row[end - 1] in ("", None):
+        end -= 1
+    return row[:end]
+
+
+class LocalSheetsBackend(SheetsBackend):
+    """
+    In-process stand-in for Google Sheets stored in SQLite.
+
+    Rows are stored as JSON arrays ordered by a position key, so a row's
+    index is its rank and deleting rows shifts the rows below them up
+    without renumbering. The supported slugs follow Google's semantics
+    closely enough for the sync code: trailing empty rows and cells are
+    trimmed on read, writes overwrite only the cells they cover and
+    ``USER_ENTERED`` writes convert numbers and booleans. Every
+    call sleeps ``latency_seconds``; calls over ``rate_limit`` per minute
+    fail with a 429-style error.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        latency_seconds: Optional[float] = None,
+        rate_limit: Optional[int] = None,
+    ):
+        self.path = path or get_local_sheets_db_path()
+        self.latency_seconds = latency_seconds if latency_seconds is not None else get_local_sheets_latency()
+        self.rate_limit = rate_limit if rate_limit is not None else get_local_sheets_rate_limit()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS spreadsheets (
+                spreadsheet_id TEXT PRIMARY KEY,
+                title TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tabs (
+                spreadsheet_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                sheet_id INTEGER NOT NULL,
+                PRIMARY KEY (spreadsheet_id, title)
+            );
+            CREATE TABLE IF NOT EXISTS cells (
+                spreadsheet_id TEXT NOT NULL,
+                sheet_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                row_values TEXT NOT NULL,
+                PRIMARY KEY (spreadsheet_id, sheet_id, position)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._lock = threading.Lock()
+        self._tokens = float(self.rate_limit)
+        self._refilled_at = time.monotonic()
+        self.calls: Dict[str, int] = {}
+        self.rate_limited = 0
+        self._revisions: Dict[str, int] = {}
+
+    # Seeding and inspection
+
+    def put_sheet(self, spreadsheet_id: str, sheet_name: str, rows: List[List[Any]], title: Optional[str] = None) -> None:
+        """Create the spreadsheet and tab if needed and replace the tab's rows."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO spreadsheets (spreadsheet_id, title) VALUES (?, ?)",
+                (spreadsheet_id, title or spreadsheet_id),
+            )
+            if title:
+                self._conn.execute("UPDATE spreadsheets SET title = ? WHERE spreadsheet_id = ?", (title, spreadsheet_id))
+            sheet_id = self._tab_id(spreadsheet_id, sheet_name, create=True)
+            self._conn.execute("DELETE FROM cells WHERE spreadsheet_id = ? AND sheet_id = ?", (spreadsheet_id, sheet_id))
+            self._store_rows(spreadsheet_id, sheet_id, 0, [[str(v) for v in row] for row in rows])
+            self._conn.commit()
+            self._revisions[spreadsheet_id] = self._revisions.get(spreadsheet_id, 0) + 1
+
+    def read_sheet(self, spreadsheet_id: str, sheet_name: str) -> List[List[str]]:
+        """Return all rows of a tab as Google would (trailing empties trimmed)."""
+        with self._lock:
+            sheet_id = self._tab_id(spreadsheet_id, sheet_name)
+            if sheet_id is None:
+                return []
+            return self._read_rows(spreadsheet_id, sheet_id, 1, None, 1, None)
+
+    def revision(self, spreadsheet_id: str) -> Optional[str]:
+        """Return the spreadsheet's change counter (kept in memory, so it restarts with the process)."""
+        with self._lock:
+            return str(self._revisions.get(spreadsheet_id, 0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": dict(self.calls), "rate_limited": self.rate_limited}
+
+    # Slug dispatch
+
+    def execute(self, slug: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        handler = getattr(self, "_" + slug.lower(), None)
+        with self._lock:
+            self.calls[slug] = self.calls.get(slug, 0) + 1
+            if not self._take_token():
+                self.rate_limited += 1
+                return {"successful": False, "data": {}, "error": "429 RESOURCE_EXHAUSTED: Quota exceeded for requests per minute"}
+            if handler is None:
+                return {"successful": False, "data": {}, "error": f"Unsupported tool {slug}"}
+            try:
+                data = handler(arguments)
+                self._conn.commit()
+                if slug in _WRITE_SLUGS:
+                    spreadsheet_id = arguments["spreadsheet_id"]
+                    self._revisions[spreadsheet_id] = self._revisions.get(spreadsheet_id, 0) + 1
+            except (KeyError, ValueError) as e:
+                self._conn.rollback()
+                return {"successful": False, "data": {}, "error": str(e.args[0] if e.args else e)}
+        return {"successful": True, "data": data, "error": None}
+
+    def _take_token(self) -> bool:
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self._tokens = min(float(self.rate_limit), self._tokens + (now - self._refilled_at) * self.rate_limit / 60)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    # Storage helpers; callers hold the lock
+
+    def _title(self, spreadsheet_id: str) -> str:
+        row = self._conn.execute("SELECT title FROM spreadsheets WHERE spreadsheet_id = ?", (spreadsheet_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Requested entity was not found: {spreadsheet_id}")
+        return row[0]
+
+    def _tab_id(self, spreadsheet_id: str, sheet_name: str, create: bool = False) -> Optional[int]:
+        row = self._conn.execute(
+            "SELECT sheet_id FROM tabs WHERE spreadsheet_id = ? AND title = ?", (spreadsheet_id, sheet_name)
+        ).fetchone()
+        if row is not None or not create:
+            return row[0] if row else None
+        next_id = self._conn.execute(
+            "SELECT COALESCE(MAX(sheet_id) + 1, 0) FROM tabs WHERE spreadsheet_id = ?", (spreadsheet_id,)
+        ).fetchone()[0]
+        self._conn.execute(
+            "INSERT INTO tabs (spreadsheet_id, title, sheet_id) VALUES (?, ?, ?)", (spreadsheet_id, sheet_name, next_id)
+        )
+        return next_id
+
+    def _require_tab(self, spreadsheet_id: str, sheet_name: str) -> int:
+        self._title(spreadsheet_id)
+        sheet_id = self._tab_id(spreadsheet_id, sheet_name)
+        if sheet_id is None:
+            raise ValueError(f"Unable to parse range: {sheet_name}")
+        return sheet_id
+
+    def _positions(self, spreadsheet_id: str, sheet_id: int, first_index: int, count: int = -1) -> List[int]:
+        """Return the position keys of rows ``first_index`` onwards (0-based), ``count`` of them."""
+        return [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT position FROM cells WHERE spreadsheet_id = ? AND sheet_id = ? ORDER BY position LIMIT ? OFFSET ?",
+                (spreadsheet_id, sheet_id, count, first_index),
+            ).fetchall()
+        ]
+
+    def _store_rows(self, spreadsheet_id: str, sheet_id: int, first_index: int, rows: List[List[Any]]) -> None:
+        """Write ``rows`` at 0-based row ``first_index``, padding the tab with empty rows as needed."""
+        positions = self._positions(spreadsheet_id, sheet_id, first_index, len(rows))
+        row_count, last_position = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(position), -1) FROM cells WHERE spreadsheet_id = ? AND sheet_id = ?",
+            (spreadsheet_id, sheet_id),
+        ).fetchone()
+        padding = max(0, first_index - row_count)
+        new_positions = range(last_position + 1, last_position + 1 + padding + len(rows) - len(positions))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO cells (spreadsheet_id, sheet_id, position, width, row_values) VALUES (?, ?, ?, ?, ?)",
+            [(spreadsheet_id, sheet_id, p, 0, "[]") for p in new_positions[:padding]]
+            + [
+                (spreadsheet_id, sheet_id, p, len(row), json.dumps(row))
+                for p, row in zip([*positions, *new_positions[padding:]], rows)
+            ],
+        )
+
+    def _read_rows(
+        self, spreadsheet_id: str, sheet_id: int, first_row: int, last_row: Optional[int], first_col: int, last_col: Optional[int]
+    ) -> List[List[str]]:
+        stored = self._conn.execute(
+            "SELECT row_values FROM cells WHERE spreadsheet_id = ? AND sheet_id = ? ORDER BY position LIMIT ? OFFSET ?",
+            (spreadsheet_id, sheet_id, -1 if last_row is None else last_row - first_row + 1, first_row - 1),
+        ).fetchall()
+        rows = [_trim(json.loads(row_values)[first_col - 1 : last_col]) for (row_values,) in stored]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    # Slug handlers; callers hold the lock
+
+    def _googlesheets_get_spreadsheet_info(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        spreadsheet_id = arguments["spreadsheet_id"]
+        title = self._title(spreadsheet_id)
+        sheets = []
+        for tab_title, sheet_id in self._conn.execute(
+            "SELECT title, sheet_id FROM tabs WHERE spreadsheet_id = ? ORDER BY sheet_id", (spreadsheet_id,)
+        ).fetchall():
+            row_count, width = self._conn.execute(
+                "SELECT COUNT(*), MAX(width) FROM cells WHERE spreadsheet_id = ? AND sheet_id = ?",
+                (spreadsheet_id, sheet_id),
+            ).fetchone()
+            sheets.append({
+                "properties": {
+                    "sheetId": sheet_id,
+                    "title": tab_title,
+                    "index": len(sheets),
+                    "gridProperties": {
+                        "rowCount": max(MIN_GRID_ROWS, row_count),
+                        "columnCount": max(MIN_GRID_COLUMNS, width or 0),
+                    },
+                }
+            })
+        return {"response_data": {"spreadsheetId": spreadsheet_id, "properties": {"title": title}, "sheets": sheets}}
+
+    def _googlesheets_batch_get(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        spreadsheet_id = arguments["spreadsheet_id"]
+        value_ranges = []
+        for a1_range in arguments.get("ranges") or []:
+            tab, first_row, last_row, first_col, last_col = _parse_range(a1_range)
+            sheet_id = self._require_tab(spreadsheet_id, tab)
+            value_ranges.append({
+                "range": a1_range,
+                "majorDimension": "ROWS",
+                "values": self._read_rows(spreadsheet_id, sheet_id, first_row, last_row, first_col, last_col),
+            })
+        return {"spreadsheetId": spreadsheet_id, "valueRanges": value_ranges}
+
+    def _googlesheets_batch_update(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        spreadsheet_id = arguments["spreadsheet_id"]
+        sheet_id = self._require_tab(spreadsheet_id, arguments["sheet_name"])
+        _, first_row, _, first_col, _ = _parse_range(f"x!{arguments.get('first_cell_location') or 'A1'}")
+        values = arguments.get("values") or []
+        if not values:
+            return {"updatedRows": 0}
+        existing = self._read_rows(spreadsheet_id, sheet_id, first_row, first_row + len(values) - 1, 1, None)
+        updated: List[List[Any]] = []
+        for offset, new_cells in enumerate(values):
+            row = existing[offset] if offset < len(existing) else []
+            row = row + [""] * (first_col - 1 - len(row))
+            # Only the written cells change; cells to their right are kept
+            if arguments.get("valueInputOption") == "USER_ENTERED":
+                cells = [user_entered_value(v) for v in new_cells]
+            else:
+                cells = ["" if v is None else str(v) for v in new_cells]
+            updated.append(_trim(row[: first_col - 1] + cells + row[first_col - 1 + len(cells):]))
+        self._store_rows(spreadsheet_id, sheet_id, first_row - 1, updated)
+        return {"updatedRows": len(updated), "updatedCells": sum(len(v) for v in values)}
+
+    def _googlesheets_delete_dimension(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        spreadsheet_id = arguments["spreadsheet_id"]
+        request = arguments["delete_dimension_request"]["range"]
+        if request.get("dimension", "ROWS") != "ROWS":
+            raise ValueError("Only row deletion is supported")
+        self._title(spreadsheet_id)
+        sheet_id, start, end = request.get("sheet_id", 0), request["start_index"], request["end_index"]
+        # Rows are ranked by position, so the rows below move up without being rewritten
+        self._conn.executemany(
+            "DELETE FROM cells WHERE spreadsheet_id = ? AND sheet_id = ? AND position = ?",
+            [(spreadsheet_id, sheet_id, p) for p in self._positions(spreadsheet_id, sheet_id, start, end - start)],
+        )
+        return {"replies": [{}]}
+
+    def _googlesheets_create_google_sheet1(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        spreadsheet_id = uuid.uuid4().hex
+        self._conn.execute(
+            "INSERT INTO spreadsheets (spreadsheet_id, title) VALUES (?, ?)",
+            (spreadsheet_id, arguments.get("title") or "Untitled spreadsheet"),
+        )
+        self._tab_id(spreadsheet_id, "Sheet1", create=True)
+        return {"response_data": {"spreadsheet_id": spreadsheet_id, "title": arguments.get("title")}}
+
+
+_backend: Optional[SheetsBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_sheets_backend() -> SheetsBackend:
+    """Return the process-wide sheets backend selected by SHEETS_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = LocalSheetsBackend() if get_sheets_backend_name() == "local" else ComposioSheetsBackend()
+    return _backend
+
+
+def set_sheets_backend(backend: Optional[SheetsBackend]) -> None:
+    """Replace the process-wide sheets backend; None restores the configured one on next use."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,103 @@
+"""
+Spreadsheet Metadata Cache
+
+This module caches GOOGLESHEETS_GET_SPREADSHEET_INFO responses per
+spreadsheet ID, so tab lists and internal sheet IDs are served locally
+instead of being re-fetched several times per user action. Every
+invalidation moves the spreadsheet to a new generation, and a fetch that
+started in an older generation cannot store its (possibly stale) result.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import get_metadata_cache_ttl, get_metadata_cache_size
+
+
+class SpreadsheetInfoCache:
+    """Thread-safe TTL cache with size-bounded LRU eviction."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else get_metadata_cache_ttl()
+        self.max_entries = max_entries or get_metadata_cache_size()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate(): per spreadsheet, and for all of them at once
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, sheet_id: str) -> Optional[Dict[str, Any]]:
+        """Return cached metadata for ``sheet_id``, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(sheet_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, info = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[sheet_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(sheet_id)
+            self.hits += 1
+            return info
+
+    def generation(self, sheet_id: str) -> Tuple[int, int]:
+        """Return the current generation of ``sheet_id``; take it before fetching and pass it to ``set``."""
+        with self._lock:
+            return self._epoch, self._generations.get(sheet_id, 0)
+
+    def set(self, sheet_id: str, info: Dict[str, Any], generation: Optional[Tuple[int, int]] = None) -> bool:
+        """
+        Store metadata for ``sheet_id``, evicting the least recently used entry if full.
+
+        With ``generation``, nothing is stored (and False is returned) if the
+        spreadsheet was invalidated since that generation was taken.
+        """
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(sheet_id, 0)):
+                return False
+            self._entries[sheet_id] = (time.monotonic(), info)
+            self._entries.move_to_end(sheet_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, sheet_id: Optional[str] = None) -> None:
+        """Drop cached metadata for one spreadsheet, or for all when ``sheet_id`` is None."""
+        with self._lock:
+            if sheet_id is None:
+                self._epoch += 1
+                self._generations.clear()
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                return
+            self._generations[sheet_id] = self._generations.get(sheet_id, 0) + 1
+            if self._entries.pop(sheet_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_metadata_cache = SpreadsheetInfoCache()
+
+
+def get_metadata_cache() -> SpreadsheetInfoCache:
+    """Return the process-wide spreadsheet metadata cache."""
+    return _metadata_cache
@@ -0,0 +1,144 @@
+"""
+Sheets Executor
+
+This module runs the blocking Google Sheets/Composio functions off the
+event loop, in a bounded thread pool with per-route concurrency limits
+and timeouts, so slow sheet round-trips never stall the agent stream.
+Rate-limit waits for a call's first request happen on the event loop,
+before a thread is taken.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from .config import (
+    get_sheets_executor_workers,
+    get_sheets_route_concurrency,
+    get_sheets_call_timeout,
+)
+from .sheets_scheduler import SheetsDeadlineExceeded, get_sheets_scheduler, lane_for_route, sheets_deadline, sheets_lane
+
+T = TypeVar("T")
+
+
+class SheetsExecutor:
+    """Bounded executor for blocking sheet operations.
+
+    Each route (``sync``, ``list``, ...) gets its own semaphore so one busy
+    endpoint cannot take every worker thread from the others.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_workers = max_workers or get_sheets_executor_workers()
+        self.timeout = timeout if timeout is not None else get_sheets_call_timeout()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sheets")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._active: Dict[str, int] = {}
+        self._timeouts = 0
+
+    async def run(
+        self,
+        route: str,
+        fn: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = None,
+        spreadsheet_id: Optional[str] = None,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Run ``fn(*args, **kwargs)`` in the worker pool under the route's limit.
+
+        When ``spreadsheet_id`` is given, the rate-limit token for ``fn``'s
+        first Google Sheets call to it is awaited on the event loop before a
+        worker thread is taken, so throttled (e.g. background) calls do not
+        hold threads other routes need. The timeout covers that wait and the
+        call; once it passes, the call stops before its next Sheets request
+        or retry rather than writing on after the caller has given up.
+
+        Raises:
+            asyncio.TimeoutError: If the call does not finish within the timeout
+        """
+        semaphore = self._semaphore(route)
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout if timeout is None else timeout
+        async with semaphore:
+            self._active[route] = self._active.get(route, 0) + 1
+            try:
+                deadline = time.monotonic() + timeout
+                lane = lane_for_route(route)
+                # Carry context variables (e.g. the request trace) into the worker thread,
+                # and schedule the route's Google Sheets calls in its lane and by its deadline
+                context = contextvars.copy_context()
+                context.run(sheets_lane.set, lane)
+                context.run(sheets_deadline.set, deadline)
+                if spreadsheet_id is None:
+                    call = functools.partial(context.run, fn, *args, **kwargs)
+                else:
+                    scheduler = get_sheets_scheduler()
+                    await asyncio.wait_for(scheduler.acquire_async(spreadsheet_id, lane), timeout=timeout)
+                    call = functools.partial(context.run, scheduler.call_with_token, spreadsheet_id, fn, *args, **kwargs)
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, call),
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                self._timeouts += 1
+                raise
+            except SheetsDeadlineExceeded as e:
+                # The call hit the deadline in its thread just before the wait above did
+                self._timeouts += 1
+                raise asyncio.TimeoutError(str(e)) from e
+            finally:
+                self._active[route] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return active call counts per route and the number of timeouts."""
+        return {
+            "max_workers": self.max_workers,
+            "active": dict(self._active),
+            "timeouts": self._timeouts,
+        }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running calls are left to finish."""
+        self._executor.shutdown(wait=False)
+
+    def _semaphore(self, route: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(route)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(get_sheets_route_concurrency(route))
+            self._semaphores[route] = semaphore
+        return semaphore
+
+
+_executor: Optional[SheetsExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_sheets_executor() -> SheetsExecutor:
+    """Return the process-wide sheets executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = SheetsExecutor()
+    return _executor
+
+
+def shutdown_sheets_executor() -> None:
+    """Shut down the process-wide executor; a later call creates a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+async def run_sheets_call(route: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking sheets function on the shared executor."""
+    return await get_sheets_executor().run(route, fn, *args, **kwargs)
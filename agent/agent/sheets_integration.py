@@ -3,30 +3,115 @@ Google Sheets integration using Composio APIs.
 Handles bidirectional sync between Google Sheets and canvas items.
 """
 
-from typing import Dict, Any, List, Optional
-import os
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
 import json
+import re
 from dotenv import load_dotenv
 
+from .composio_pool import ComposioUnavailableError
+from .config import (
+    get_sheets_sync_mode,
+    get_sync_max_update_ranges,
+    get_import_chunk_rows,
+    is_debug_mode,
+)
+from .instrumentation import span
+from .sheets_backend import get_sheets_backend, user_entered_value
+from .sheets_cache import get_metadata_cache
+from .sheets_scheduler import get_sheets_scheduler
+from .sheets_singleflight import get_sheets_singleflight
+from .snapshot_store import get_snapshot_store, hash_sheet_rows
+from .state_delta import make_state_delta
+from .sync_diff import (
+    canvas_export_version,
+    canvas_to_rows,
+    compute_row_diff,
+    decode_canvas_rows,
+    group_runs,
+    get_sync_snapshot_store,
+)
+
 load_dotenv()
 
-def get_sheet_names(sheet_id: str) -> Optional[List[str]]:
-    """Get list of available sheet names in a spreadsheet."""
-    composio, user_id = get_composio_client()
-    if not composio or not user_id:
-        return None
+def execute_sheets_tool(slug: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Execute a Google Sheets tool slug on the configured sheets backend.
     
-    try:
-        result = composio.tools.execute(
-            user_id=user_id,
+    Calls are paced by the sheets scheduler's per-spreadsheet token bucket,
+    and 429s (plus 5xx failures of calls safe to repeat) are retried with
+    backoff before being returned.
+    
+    Raises:
+        ComposioUnavailableError: If no Composio client could be acquired
+    """
+    def attempt() -> Optional[Dict[str, Any]]:
+        with span("composio", slug=slug) as record:
+            result = get_sheets_backend().execute(slug, arguments)
+            if slug == "GOOGLESHEETS_BATCH_GET" and result:
+                value_ranges = result.get("data", {}).get("valueRanges", [])
+                record["rows"] = sum(len(r.get("values", [])) for r in value_ranges)
+            elif slug == "GOOGLESHEETS_BATCH_UPDATE":
+                record["rows"] = len(arguments.get("values", []))
+            return result
+    
+    return get_sheets_scheduler().run(arguments.get("spreadsheet_id", ""), attempt, slug=slug)
+
+def extract_sheet_id(sheet_id: str) -> str:
+    """Extract the spreadsheet ID if a full Google Sheets URL was provided."""
+    if "/spreadsheets/d/" in sheet_id:
+        start = sheet_id.find("/spreadsheets/d/") + len("/spreadsheets/d/")
+        end = sheet_id.find("/", start)
+        if end == -1:
+            end = sheet_id.find("#", start)
+        if end == -1:
+            end = len(sheet_id)
+        sheet_id = sheet_id[start:end]
+    return sheet_id
+
+def get_spreadsheet_info(sheet_id: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Get spreadsheet metadata (title, tabs, internal sheet IDs).
+    
+    Responses are served from the metadata cache when fresh; failed
+    lookups are never cached. Concurrent lookups of the same spreadsheet
+    share one remote call.
+    
+    Raises:
+        ComposioUnavailableError: If no Composio client could be acquired
+    """
+    cache = get_metadata_cache()
+    if use_cache:
+        cached = cache.get(sheet_id)
+        if cached is not None:
+            return cached
+    
+    # A fetch begun before an invalidation is neither cached nor shared with later callers
+    generation = cache.generation(sheet_id)
+    
+    def fetch() -> Optional[Dict[str, Any]]:
+        result = execute_sheets_tool(
             slug="GOOGLESHEETS_GET_SPREADSHEET_INFO",
             arguments={"spreadsheet_id": sheet_id}
         )
         
         if not result or not result.get("successful"):
+            print(f"Failed to get spreadsheet info: {result}")
             return None
-            
+        
         sheet_info = result.get("data", {}).get("response_data", {})
+        cache.set(sheet_id, sheet_info, generation)
+        return sheet_info
+    
+    return get_sheets_singleflight().do("info", (sheet_id, generation), fetch)
+
+def get_sheet_names(sheet_id: str) -> Optional[List[str]]:
+    """Get list of available sheet names in a spreadsheet."""
+    try:
+        sheet_info = get_spreadsheet_info(sheet_id)
+        if sheet_info is None:
+            return None
+            
         sheets = sheet_info.get("sheets", [])
         
         return [s.get("properties", {}).get("title", "Untitled") for s in sheets]
@@ -35,102 +120,312 @@ def get_sheet_names(sheet_id: str) -> Optional[List[str]]:
         print(f"Error getting sheet names: {e}")
         return None
 
-def get_composio_client():
-    """Initialize Composio client for direct API calls."""
-    try:
-        from composio import Composio
-        user_id = os.getenv("COMPOSIO_USER_ID", "default")
-        return Composio(), user_id
-    except Exception as e:
-        print(f"Failed to initialize Composio client: {e}")
-        return None, None
+class SheetReadError(Exception):
+    """Raised when a window of sheet values cannot be read."""
 
-def get_sheet_data(sheet_id: str, sheet_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+def column_letter(index: int) -> str:
+    """Convert a 1-based column index to its A1 letter (1 -> A, 27 -> AA)."""
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def get_sheet_metadata(
+    sheet_id: str, sheet_name: Optional[str] = None, use_cache: bool = True
+) -> Optional[Dict[str, Any]]:
     """
-    Fetch sheet data using Composio's GOOGLESHEETS tools.
+    Resolve the tab to import and its grid extent, without reading values.
     
     Args:
         sheet_id: Google Sheets ID
         sheet_name: Optional specific sheet name to import from
+        use_cache: Whether cached spreadsheet info may be used
         
     Returns:
-        Dictionary containing sheet data or None if failed
+        Dictionary with spreadsheet info, the resolved sheet name and its
+        row/column counts, or None if failed
     """
-    composio, user_id = get_composio_client()
-    if not composio or not user_id:
+    # First, get spreadsheet info
+    sheet_info = get_spreadsheet_info(sheet_id, use_cache=use_cache)
+    if sheet_info is None:
         return None
-    
-    try:
-        # First, get spreadsheet info
-        result = composio.tools.execute(
-            user_id=user_id,
-            slug="GOOGLESHEETS_GET_SPREADSHEET_INFO",
-            arguments={"spreadsheet_id": sheet_id}
-        )
         
-        if not result or not result.get("successful"):
-            print(f"Failed to get spreadsheet info: {result}")
-            return None
-            
-        sheet_info = result.get("data", {}).get("response_data", {})
-        print(f"Got sheet info: {sheet_info.get('properties', {}).get('title', 'Unknown')}")
+    print(f"Got sheet info: {sheet_info.get('properties', {}).get('title', 'Unknown')}")
+    if is_debug_mode():
         print(f"Sheet info keys: {list(sheet_info.keys())}")  # Debug what fields are available
-        
-        # Get available sheets
-        sheets = sheet_info.get("sheets", [])
-        if not sheets:
-            print("No sheets found in spreadsheet")
+    
+    # Get available sheets
+    sheets = sheet_info.get("sheets", [])
+    if not sheets:
+        print("No sheets found in spreadsheet")
+        return None
+    
+    # Select sheet to import from
+    if sheet_name:
+        # Use specified sheet name
+        selected_sheet = next((s for s in sheets if s.get("properties", {}).get("title") == sheet_name), None)
+        if not selected_sheet:
+            available_names = [s.get("properties", {}).get("title", "Untitled") for s in sheets]
+            print(f"Sheet '{sheet_name}' not found. Available sheets: {available_names}")
             return None
-        
-        # Select sheet to import from
-        if sheet_name:
-            # Use specified sheet name
-            selected_sheet = next((s for s in sheets if s.get("properties", {}).get("title") == sheet_name), None)
-            if not selected_sheet:
-                available_names = [s.get("properties", {}).get("title", "Untitled") for s in sheets]
-                print(f"Sheet '{sheet_name}' not found. Available sheets: {available_names}")
-                return None
-            target_sheet_name = sheet_name
-        else:
-            # Default to first sheet if no specific sheet requested
-            selected_sheet = sheets[0]
-            target_sheet_name = selected_sheet.get("properties", {}).get("title", "Sheet1")
-        
-        # Get all data from selected sheet
-        values_result = composio.tools.execute(
-            user_id=user_id,
+        target_sheet_name = sheet_name
+    else:
+        # Default to first sheet if no specific sheet requested
+        selected_sheet = sheets[0]
+        target_sheet_name = selected_sheet.get("properties", {}).get("title", "Sheet1")
+    
+    grid = selected_sheet.get("properties", {}).get("gridProperties", {})
+    
+    return {
+        "spreadsheet_info": sheet_info,
+        "sheet_name": target_sheet_name,
+        "title": sheet_info.get("properties", {}).get("title", "Untitled"),
+        "available_sheets": [s.get("properties", {}).get("title", "Untitled") for s in sheets],
+        "row_count": grid.get("rowCount"),
+        "column_count": grid.get("columnCount"),
+    }
+
+def _fetch_values(sheet_id: str, a1_range: str) -> List[List[str]]:
+    """Read one range of values; raises SheetReadError on failure.
+    
+    Concurrent reads of the same range share one remote call, so the
+    returned rows must not be modified.
+    """
+    def fetch() -> List[List[str]]:
+        values_result = execute_sheets_tool(
             slug="GOOGLESHEETS_BATCH_GET",
             arguments={
                 "spreadsheet_id": sheet_id,
-                "ranges": [f"{target_sheet_name}!A:Z"]  # Get all columns A to Z
+                "ranges": [a1_range]
             }
         )
         
         if not values_result or not values_result.get("successful"):
-            print(f"Failed to get sheet values: {values_result}")
-            return None
-        
-        values_data = values_result.get("data", {})
-        sheet_ranges = values_data.get("valueRanges", [])
+            raise SheetReadError(f"Failed to get sheet values: {values_result}")
         
+        sheet_ranges = values_result.get("data", {}).get("valueRanges", [])
         if not sheet_ranges:
-            print("No data found in sheet")
+            raise SheetReadError("No data found in sheet")
+        
+        return sheet_ranges[0].get("values", [])
+    
+    return get_sheets_singleflight().do("values", (sheet_id, a1_range), fetch)
+
+def iter_sheet_rows(
+    sheet_id: str,
+    sheet_name: str,
+    row_count: Optional[int] = None,
+    column_count: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
+) -> Iterator[List[List[str]]]:
+    """
+    Read a tab in row windows, yielding each non-empty chunk of rows.
+    
+    Windows span every column of the grid, so no columns are dropped. When
+    the grid size is unknown the whole tab is read in one request. Reading
+    continues past ``row_count`` while windows come back full, in case the
+    grid grew since the metadata was fetched.
+    
+    Raises:
+        SheetReadError: If a window cannot be read
+    """
+    if not row_count or not column_count:
+        rows = _fetch_values(sheet_id, sheet_name)
+        if rows:
+            yield rows
+        return
+    
+    chunk_rows = chunk_rows or get_import_chunk_rows()
+    last_column = column_letter(column_count)
+    start = 1
+    while True:
+        end = start + chunk_rows - 1
+        rows = _fetch_values(sheet_id, f"{sheet_name}!A{start}:{last_column}{end}")
+        if rows:
+            yield rows
+        if end >= row_count and len(rows) < chunk_rows:
+            break
+        start = end + 1
+
+# A fingerprint window such as ``Sheet1!A201:F400``
+_WINDOW_RANGE = re.compile(r"!A(\d+):[A-Z]+(\d+)$")
+
+def _window_digest(rows: List[List[Any]]) -> str:
+    """
+    Hash a row window as Google returns it: values as read back after a
+    ``USER_ENTERED`` write (``"0001"`` as ``"1"``), without trailing empty
+    cells and rows. Rows we wrote and rows read back hash alike.
+    """
+    trimmed = [[user_entered_value(cell) for cell in row] for row in rows]
+    for row in trimmed:
+        while row and row[-1] == "":
+            row.pop()
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return hash_sheet_rows(trimmed)
+
+def _window_bounds(a1_range: str) -> Optional[Tuple[int, int]]:
+    """Return the 1-based first and last row of a fingerprint window, or None for a whole tab."""
+    match = _WINDOW_RANGE.search(a1_range)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+def get_sheet_fingerprint(sheet_id: str, sheet_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fingerprint a tab for change detection: its grid size and a content
+    hash per row window.
+    
+    Spreadsheet info is fetched fresh, which also refreshes the metadata
+    cache. Every window is read, so this reads the whole tab, but in one
+    batch request: two calls however large the tab is.
+    
+    Returns:
+        Dictionary with the resolved ``sheet_name``, ``grid`` and
+        ``windows`` (A1 range to hash), or None if the tab cannot be resolved
+    
+    Raises:
+        SheetReadError: If the windows cannot be read
+    """
+    sheet_data = get_sheet_metadata(sheet_id, sheet_name, use_cache=False)
+    if sheet_data is None:
+        return None
+    
+    name, row_count, column_count = sheet_data["sheet_name"], sheet_data["row_count"], sheet_data["column_count"]
+    if not row_count or not column_count:
+        ranges = [name]
+    else:
+        chunk_rows = get_import_chunk_rows()
+        last_column = column_letter(column_count)
+        ranges = [
+            f"{name}!A{start}:{last_column}{start + chunk_rows - 1}"
+            for start in range(1, row_count + 1, chunk_rows)
+        ]
+    
+    values_result = execute_sheets_tool(
+        slug="GOOGLESHEETS_BATCH_GET",
+        arguments={"spreadsheet_id": sheet_id, "ranges": ranges}
+    )
+    if not values_result or not values_result.get("successful"):
+        raise SheetReadError(f"Failed to get sheet values: {values_result}")
+    value_ranges = values_result.get("data", {}).get("valueRanges", [])
+    if len(value_ranges) != len(ranges):
+        raise SheetReadError(f"Expected {len(ranges)} ranges, got {len(value_ranges)}")
+    
+    return {
+        "sheet_name": name,
+        "grid": [row_count, column_count],
+        "windows": {
+            a1_range: _window_digest(value_range.get("values", []))
+            for a1_range, value_range in zip(ranges, value_ranges)
+        },
+    }
+
+def fingerprint_matches_rows(fingerprint: Dict[str, Any], rows: List[List[Any]]) -> bool:
+    """Return whether a tab fingerprint shows exactly ``rows`` (e.g. the rows last synced to it)."""
+    row_count = fingerprint["grid"][0]
+    if row_count and len(rows) > row_count:
+        return False
+    for a1_range, digest in fingerprint["windows"].items():
+        bounds = _window_bounds(a1_range)
+        window = rows if bounds is None else rows[bounds[0] - 1:bounds[1]]
+        if _window_digest(window) != digest:
+            return False
+    return True
+
+def get_sheet_data(sheet_id: str, sheet_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch sheet data using Composio's GOOGLESHEETS tools.
+    
+    Args:
+        sheet_id: Google Sheets ID
+        sheet_name: Optional specific sheet name to import from
+        
+    Returns:
+        Dictionary containing sheet data or None if failed
+    """
+    try:
+        sheet_data = get_sheet_metadata(sheet_id, sheet_name)
+        if sheet_data is None:
             return None
         
-        rows = sheet_ranges[0].get("values", [])
+        # Get all data from selected sheet
+        rows: List[List[str]] = []
+        for chunk in iter_sheet_rows(
+            sheet_id, sheet_data["sheet_name"], sheet_data["row_count"], sheet_data["column_count"]
+        ):
+            rows.extend(chunk)
         
-        return {
-            "spreadsheet_info": sheet_info,
-            "sheet_name": target_sheet_name,
-            "rows": rows,
-            "title": sheet_info.get("properties", {}).get("title", "Untitled"),
-            "available_sheets": [s.get("properties", {}).get("title", "Untitled") for s in sheets],
-        }
+        sheet_data["rows"] = rows
+        return sheet_data
         
     except Exception as e:
         print(f"Error fetching sheet data: {e}")
         return None
 
+def _is_header_row(row: List[str]) -> bool:
+    """Whether the first non-empty row looks like column headers."""
+    return len(row) > 1 and all(
+        isinstance(cell, str) and not cell.strip().replace('.', '').replace('-', '').isdigit() 
+        for cell in row[:3] if cell
+    )
+
+def iter_canvas_items(row_chunks: Iterable[List[List[str]]]) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Convert row chunks to canvas items as they arrive.
+    
+    The first non-empty row decides whether the sheet has headers and fixes
+    the sheet's column profile; item ids keep counting across chunks. Yields one list of items per chunk that
+    produced any.
+    
+    Sheets written by sync_canvas_to_sheet are recognized by their export
+    header and decoded directly into the original items, without type
+    inference.
+    """
+    profile: Optional[SheetProfile] = None
+    has_headers = False
+    export_layout: Optional[bool] = None
+    idx = 0
+    
+    for chunk in row_chunks:
+        if export_layout is None:
+            first = next((i for i, row in enumerate(chunk) if row and any(cell.strip() for cell in row if cell)), None)
+            if first is None:
+                continue
+            export_layout = canvas_export_version(chunk[first]) is not None
+            if export_layout:
+                chunk = chunk[first + 1:]
+        
+        if export_layout:
+            items, _ = decode_canvas_rows(chunk, idx)
+            idx += len(items)
+            if items:
+                yield items
+            continue
+        
+        rows = []
+        for row in chunk:
+            # Skip empty rows
+            if not row or not any(cell.strip() for cell in row if cell):
+                continue
+            
+            if profile is None:
+                has_headers = _is_header_row(row)
+                if has_headers:
+                    profile = SheetProfile([str(cell).strip() for cell in row])
+                    continue
+                profile = SheetProfile([])
+            
+            if not has_headers:
+                # Create generic headers
+                profile.extend(len(row))
+            
+            rows.append(row)
+        
+        if rows:
+            items = profile.to_canvas_items(idx, rows)
+            idx += len(items)
+            yield items
+
 def convert_sheet_to_canvas_items(sheet_data: Dict[str, Any], original_sheet_id: str = "") -> Dict[str, Any]:
     """
     Convert sheet data to canvas format.
@@ -152,12 +447,8 @@ def convert_sheet_to_canvas_items(sheet_data: Dict[str, Any], original_sheet_id:
         }
     
     rows = sheet_data["rows"]
-    items = []
     
-    # Skip empty rows
-    valid_rows = [row for row in rows if row and any(cell.strip() for cell in row if cell)]
-    
-    if not valid_rows:
+    if not any(row and any(cell.strip() for cell in row if cell) for row in rows):
         return {
             "items": [],
             "globalTitle": sheet_data.get("title", "Empty Sheet"),
@@ -166,48 +457,10 @@ def convert_sheet_to_canvas_items(sheet_data: Dict[str, Any], original_sheet_id:
             "syncSheetName": sheet_data.get("sheet_name", ""),
         }
     
-    # Determine if first row is headers
-    first_row = valid_rows[0]
-    has_headers = len(first_row) > 1 and all(
-        isinstance(cell, str) and not cell.strip().replace('.', '').replace('-', '').isdigit() 
-        for cell in first_row[:3] if cell
-    )
-    
-    headers = []
-    data_rows = valid_rows
-    
-    if has_headers:
-        headers = [str(cell).strip() for cell in first_row]
-        data_rows = valid_rows[1:]
-    else:
-        # Create generic headers
-        max_cols = max(len(row) for row in valid_rows) if valid_rows else 0
-        headers = [f"Column {i+1}" for i in range(max_cols)]
-    
     # Convert each data row to a canvas item
-    for idx, row in enumerate(data_rows):
-        if not row or not any(cell.strip() for cell in row if cell):
-            continue
-            
-        # Pad row to match headers length
-        padded_row = [str(cell).strip() if cell else "" for cell in row]
-        while len(padded_row) < len(headers):
-            padded_row.append("")
-        
-        # Parse any spreadsheet format intelligently
-        item_type = determine_item_type(padded_row, headers)
-        name = next((cell for cell in padded_row if cell), f"Item {idx + 1}")
-        data = create_item_data(item_type, padded_row, headers)
-        
-        item = {
-            "id": str(idx + 1).zfill(4),
-            "type": item_type,
-            "name": name,
-            "subtitle": padded_row[1] if len(padded_row) > 1 and padded_row[1] else "",
-            "data": data
-        }
-        
-        items.append(item)
+    with span("convert") as record:
+        items = [item for chunk in iter_canvas_items([rows]) for item in chunk]
+        record["rows"] = len(rows)
     
     sync_sheet_id = original_sheet_id or sheet_data.get("spreadsheet_info", {}).get("spreadsheet_id", "")
     sync_sheet_name = sheet_data.get("sheet_name", "")
@@ -224,6 +477,207 @@ def convert_sheet_to_canvas_items(sheet_data: Dict[str, Any], original_sheet_id:
     
     return result
 
+def convert_sheet_data_cached(
+    sheet_data: Dict[str, Any],
+    original_sheet_id: str = "",
+    content_hash: Optional[str] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Convert sheet data, reusing the stored conversion when the rows are unchanged.
+    
+    Args:
+        sheet_data: Data returned from get_sheet_data()
+        original_sheet_id: The original sheet ID passed to get_sheet_data()
+        content_hash: hash_sheet_rows() of the data, if already computed
+        
+    Returns:
+        Tuple of (canvas state, whether it came from the snapshot store)
+    """
+    store = get_snapshot_store()
+    sheet_name = sheet_data.get("sheet_name", "")
+    if content_hash is None:
+        content_hash = hash_sheet_rows(sheet_data.get("rows", []), sheet_data.get("title", ""))
+    
+    try:
+        cached = store.lookup(original_sheet_id, sheet_name, content_hash)
+        if cached is not None:
+            return cached, True
+    except Exception as e:
+        print(f"Error reading canvas snapshot: {e}")
+    
+    canvas_data = convert_sheet_to_canvas_items(sheet_data, original_sheet_id)
+    
+    try:
+        store.put(original_sheet_id, sheet_name, content_hash, canvas_data)
+    except Exception as e:
+        print(f"Error writing canvas snapshot: {e}")
+    
+    return canvas_data, False
+
+def convert_sheet_data_versioned(
+    sheet_data: Dict[str, Any],
+    original_sheet_id: str = "",
+    base_version: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Convert sheet data and, when possible, diff it against a previous import.
+    
+    The version of an import is the content hash of its rows. If
+    ``base_version`` matches the stored conversion for this tab, ``patch``
+    holds the RFC 6902 operations that turn that earlier canvas state into
+    the new one; otherwise ``patch`` is None and the caller sends ``state``.
+    
+    Returns:
+        Dict with ``state``, ``version``, ``cached`` and ``patch``
+    """
+    content_hash = hash_sheet_rows(sheet_data.get("rows", []), sheet_data.get("title", ""))
+    
+    previous = None
+    if base_version:
+        try:
+            previous = get_snapshot_store().get(original_sheet_id, sheet_data.get("sheet_name", ""))
+        except Exception as e:
+            print(f"Error reading canvas snapshot: {e}")
+    
+    canvas_data, cached = convert_sheet_data_cached(sheet_data, original_sheet_id, content_hash)
+    
+    patch = None
+    if previous is not None and previous[0] == base_version:
+        patch = [] if base_version == content_hash else make_state_delta(previous[1], canvas_data)
+    
+    return {"state": canvas_data, "version": content_hash, "cached": cached, "patch": patch}
+
+def iter_sheet_import_events(sheet_id: str, sheet_name: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream a sheet import as events: one ``meta`` event, one ``items`` event
+    per converted row window, then a final ``done`` event.
+    
+    Raises:
+        SheetReadError: If the sheet cannot be resolved or a window cannot be read
+    """
+    sheet_data = get_sheet_metadata(sheet_id, sheet_name)
+    if sheet_data is None:
+        raise SheetReadError("Failed to fetch sheet data. Please check the sheet ID and ensure it's accessible.")
+    
+    yield {
+        "type": "meta",
+        "globalTitle": sheet_data["title"],
+        "syncSheetId": sheet_id,
+        "syncSheetName": sheet_data["sheet_name"],
+        "availableSheets": sheet_data["available_sheets"],
+    }
+    
+    count = 0
+    row_chunks = iter_sheet_rows(
+        sheet_id, sheet_data["sheet_name"], sheet_data["row_count"], sheet_data["column_count"]
+    )
+    for items in iter_canvas_items(row_chunks):
+        count += len(items)
+        yield {"type": "items", "items": items}
+    
+    yield {
+        "type": "done",
+        "count": count,
+        "globalDescription": f"Imported from Google Sheets • {count} items",
+    }
+
+def get_sheets_data_batch(sheet_id: str, sheet_names: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch several tabs of a spreadsheet with a single multi-range BATCH_GET.
+    
+    Args:
+        sheet_id: Google Sheets ID
+        sheet_names: Tabs to read, in order; None reads every tab
+        
+    Returns:
+        Dictionary with spreadsheet info and a ``tabs`` list of
+        ``{"sheet_name", "rows"}``, or None if failed
+    """
+    try:
+        sheet_info = get_spreadsheet_info(sheet_id)
+        if sheet_info is None:
+            return None
+        
+        sheets = sheet_info.get("sheets", [])
+        by_name = {s.get("properties", {}).get("title", "Untitled"): s for s in sheets}
+        available_names = list(by_name)
+        
+        selected_names = available_names if sheet_names is None else sheet_names
+        missing = [name for name in selected_names if name not in by_name]
+        if missing or not selected_names:
+            print(f"Sheets {missing} not found. Available sheets: {available_names}")
+            return None
+        
+        # Bare tab names read every row and column the tab has now, even if
+        # it grew since the (cached) grid sizes were fetched
+        values_result = execute_sheets_tool(
+            slug="GOOGLESHEETS_BATCH_GET",
+            arguments={
+                "spreadsheet_id": sheet_id,
+                "ranges": list(selected_names)
+            }
+        )
+        
+        if not values_result or not values_result.get("successful"):
+            print(f"Failed to get sheet values: {values_result}")
+            return None
+        
+        value_ranges = values_result.get("data", {}).get("valueRanges", [])
+        if len(value_ranges) != len(selected_names):
+            print(f"Expected {len(selected_names)} ranges, got {len(value_ranges)}")
+            return None
+        
+        return {
+            "spreadsheet_info": sheet_info,
+            "title": sheet_info.get("properties", {}).get("title", "Untitled"),
+            "available_sheets": available_names,
+            "tabs": [
+                {"sheet_name": name, "rows": value_range.get("values", [])}
+                for name, value_range in zip(selected_names, value_ranges)
+            ],
+        }
+        
+    except Exception as e:
+        print(f"Error fetching sheet data: {e}")
+        return None
+
+def merge_canvas_tabs(title: str, sheet_id: str, tab_states: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-tab canvas states into one canvas with per-tab provenance.
+    
+    Item ids are renumbered so they stay unique across tabs. Auto-sync is
+    left disabled (empty ``syncSheetId``) because a merged board cannot be
+    written back to a single tab.
+    
+    Returns:
+        Dictionary with the merged canvas ``state`` and its ``provenance``
+    """
+    items = []
+    tabs = []
+    for tab_state in tab_states:
+        item_ids = []
+        for item in tab_state.get("items", []):
+            item_id = str(len(items) + 1).zfill(4)
+            items.append({**item, "id": item_id})
+            item_ids.append(item_id)
+        tabs.append({
+            "sheetName": tab_state.get("syncSheetName", ""),
+            "itemIds": item_ids,
+            "count": len(item_ids),
+        })
+    
+    state = {
+        "items": items,
+        "globalTitle": title,
+        "globalDescription": f"Imported from Google Sheets • {len(items)} items from {len(tabs)} tabs",
+        "syncSheetId": "",
+        "syncSheetName": "",
+    }
+    return {
+        "state": state,
+        "provenance": {"spreadsheetId": sheet_id, "tabs": tabs},
+    }
+
 def create_default_data(item_type: str) -> Dict[str, Any]:
     """Create default empty data structure for a given item type."""
     if item_type == "project":
@@ -253,6 +707,219 @@ def create_default_data(item_type: str) -> Dict[str, Any]:
     else:
         return {"field1": ""}
 
+# Header keywords that mark a sheet as dated project rows
+DATE_HEADER_INDICATORS = ('date', 'due', 'deadline', 'start', 'end', 'created')
+DATE_PATTERN = re.compile(r'\b\d{4}[-/]\d{1,2}[-/]\d{1,2}\b|\b\d{1,2}[-/]\d{1,2}[-/]\d{4}\b')
+DATE_FORMATS = ('%Y-%m-%d', '%m-%d-%Y', '%d-%m-%Y')
+TAG_DELIMITERS = (',', ';', '|', '\n')
+DEFAULT_ENTITY_TAG_OPTIONS = ["Import", "Data", "Sheet", "Tag 1", "Tag 2"]
+
+# Value kinds SheetProfile records per column
+COLUMN_NUMERIC = 1
+COLUMN_PERCENTAGE = 2
+COLUMN_DATE = 4
+COLUMN_LONG_TEXT = 8
+COLUMN_TAG_LIKE = 16
+
+_NUMBER_START = frozenset('0123456789.-')
+
+def _is_number(cell: str) -> bool:
+    return cell.replace('.', '').replace('-', '').isdigit()
+
+class SheetProfile:
+    """
+    Per-sheet column profile used to convert rows in a single pass.
+    
+    Everything that depends only on the headers (date keywords, metric
+    labels, note prefixes) is computed once. Columns are profiled by the
+    kinds of values seen in them (numeric, percentage, date, long text,
+    tag-like); a kind is checked in a column only until it is first found,
+    and rows are then classified and built from the columns that can hold
+    the values each step looks for.
+    """
+    
+    def __init__(self, headers: List[str]):
+        self.headers: List[str] = []
+        self.metric_labels: List[str] = []
+        self.note_prefixes: List[str] = []
+        self.has_date_header = False
+        self.column_kinds: List[int] = []
+        self._numeric_columns: List[int] = []
+        self._metric_columns: List[int] = []
+        self._long_text_columns: List[int] = []
+        self._date_columns: List[int] = []
+        self._tag_columns: List[int] = []
+        self._add_headers(headers)
+    
+    def extend(self, width: int) -> None:
+        """Grow generic ``Column N`` headers to cover ``width`` columns."""
+        if width > len(self.headers):
+            self._add_headers([f"Column {i+1}" for i in range(len(self.headers), width)])
+    
+    def _add_headers(self, headers: List[str]) -> None:
+        offset = len(self.headers)
+        self.headers.extend(headers)
+        self.metric_labels.extend(h or f"Metric {offset + i + 1}" for i, h in enumerate(headers))
+        self.note_prefixes.extend(f"{h}: " if h else "" for h in headers)
+        joined = ' '.join(self.headers).lower()
+        self.has_date_header = any(indicator in joined for indicator in DATE_HEADER_INDICATORS)
+    
+    def observe(self, rows: List[List[str]]) -> None:
+        """
+        Record the value kinds found in each column of ``rows``.
+        
+        Rows must be observed before they are classified or built; only
+        the kinds the sheet's conversion uses are looked for (dates when a
+        date header makes every row a project, the rest otherwise).
+        """
+        if self.has_date_header:
+            wanted = COLUMN_DATE
+        else:
+            wanted = COLUMN_NUMERIC | COLUMN_PERCENTAGE | COLUMN_LONG_TEXT | COLUMN_TAG_LIKE
+        kinds = self.column_kinds
+        width = max(map(len, rows), default=0)
+        if width > len(kinds):
+            kinds.extend([0] * (width - len(kinds)))
+        
+        changed = False
+        for i in range(width):
+            missing = wanted & ~kinds[i]
+            if not missing:
+                continue
+            found = 0
+            for row in rows:
+                cell = row[i] if i < len(row) else ""
+                if not cell:
+                    continue
+                # Cheap character tests first; kinds are only confirmed by the full checks
+                if missing & COLUMN_DATE and ('-' in cell or '/' in cell) and DATE_PATTERN.search(cell):
+                    found |= COLUMN_DATE
+                if cell[0] in _NUMBER_START:
+                    if missing & COLUMN_NUMERIC and _is_number(cell):
+                        found |= COLUMN_NUMERIC
+                    if missing & COLUMN_PERCENTAGE and cell[-1] == '%' and is_percentage(cell):
+                        found |= COLUMN_PERCENTAGE
+                if missing & COLUMN_LONG_TEXT and len(cell) > 100:
+                    found |= COLUMN_LONG_TEXT
+                if missing & COLUMN_TAG_LIKE and (len(cell) <= 20 or any(d in cell for d in TAG_DELIMITERS)):
+                    found |= COLUMN_TAG_LIKE
+                if found == missing:
+                    break
+            if found:
+                kinds[i] |= found
+                changed = True
+        
+        if changed:
+            self._numeric_columns = [i for i, k in enumerate(kinds) if k & COLUMN_NUMERIC]
+            self._metric_columns = [i for i, k in enumerate(kinds) if k & (COLUMN_NUMERIC | COLUMN_PERCENTAGE)]
+            self._long_text_columns = [i for i, k in enumerate(kinds) if k & COLUMN_LONG_TEXT]
+            self._date_columns = [i for i, k in enumerate(kinds) if k & COLUMN_DATE]
+            self._tag_columns = [i for i, k in enumerate(kinds) if i >= 2 and k & COLUMN_TAG_LIKE]
+    
+    def item_type(self, row: List[str]) -> str:
+        """Classify an observed, padded row as 'project', 'entity', 'note' or 'chart'."""
+        # Look for date patterns - suggests project
+        if self.has_date_header:
+            return "project"
+        
+        # Look for numeric data - suggests chart
+        width = len(row)
+        numeric_count = 0
+        for i in self._numeric_columns:
+            if i < width and _is_number(row[i]):
+                numeric_count += 1
+                if numeric_count >= 2:
+                    return "chart"
+        
+        # Look for long text - suggests note
+        for i in self._long_text_columns:
+            if i < width and len(row[i]) > 100:
+                return "note"
+        
+        # Default to entity for structured data
+        return "entity"
+    
+    def item_data(self, item_type: str, row: List[str]) -> Dict[str, Any]:
+        """Build the ``data`` payload for an observed, padded row of the given type."""
+        if item_type == "project":
+            return {
+                "field1": row[2] if len(row) > 2 else "",  # Description/details
+                "field2": "",  # Select option (empty by default)
+                "field3": find_date_in_row(row, self._date_columns),  # Date field
+                "field4": [],  # Checklist (empty)
+                "field4_id": 0,
+            }
+        
+        elif item_type == "entity":
+            return {
+                "field1": row[2] if len(row) > 2 else "",  # Description
+                "field2": "",  # Select option (empty by default)
+                "field3": extract_tags_from_row(row, self._tag_columns),  # Tags
+                "field3_options": list(DEFAULT_ENTITY_TAG_OPTIONS),  # Default options
+            }
+        
+        elif item_type == "note":
+            # Combine all non-empty cells into a note; the first cell is already the name
+            prefixes = self.note_prefixes
+            content_parts = [
+                prefixes[i] + row[i]
+                for i in range(1, min(len(prefixes), len(row)))
+                if row[i]
+            ]
+            
+            return {
+                "field1": "\n".join(content_parts) if content_parts else row[1] if len(row) > 1 else "",
+            }
+        
+        elif item_type == "chart":
+            metrics = []
+            labels = self.metric_labels
+            width = min(len(labels), len(row))
+            
+            # Create metrics from numeric data
+            for i in self._metric_columns:
+                if i >= width:
+                    break
+                value = parse_numeric_value(row[i])
+                if value is not None:
+                    metrics.append({
+                        "id": str(len(metrics) + 1).zfill(3),
+                        "label": labels[i],
+                        "value": min(100, max(0, value))  # Clamp to 0-100
+                    })
+            
+            return {
+                "field1": metrics,
+                "field1_id": len(metrics),
+            }
+        
+        # Default fallback
+        return {"field1": ""}
+    
+    def to_canvas_items(self, first_index: int, rows: List[List[str]]) -> List[Dict[str, Any]]:
+        """Profile and convert non-empty data rows into canvas items numbered from ``first_index``."""
+        width = len(self.headers)
+        padded_rows = []
+        for row in rows:
+            padded_row = [str(cell).strip() if cell else "" for cell in row]
+            if len(padded_row) < width:
+                padded_row.extend([""] * (width - len(padded_row)))
+            padded_rows.append(padded_row)
+        self.observe(padded_rows)
+        
+        items = []
+        for idx, padded_row in enumerate(padded_rows, first_index):
+            item_type = self.item_type(padded_row)
+            name = next((cell for cell in padded_row if cell), f"Item {idx + 1}")
+            items.append({
+                "id": str(idx + 1).zfill(4),
+                "type": item_type,
+                "name": name,
+                "subtitle": padded_row[1] if len(padded_row) > 1 and padded_row[1] else "",
+                "data": self.item_data(item_type, padded_row)
+            })
+        return items
+
 def determine_item_type(row: List[str], headers: List[str]) -> str:
     """
     Determine the best canvas item type based on row content.
@@ -264,23 +931,9 @@ def determine_item_type(row: List[str], headers: List[str]) -> str:
     Returns:
         One of: 'project', 'entity', 'note', 'chart'
     """
-    # Look for date patterns - suggests project
-    date_indicators = ['date', 'due', 'deadline', 'start', 'end', 'created']
-    if any(indicator in ' '.join(headers).lower() for indicator in date_indicators):
-        return "project"
-    
-    # Look for numeric data - suggests chart
-    numeric_count = sum(1 for cell in row if cell and cell.replace('.', '').replace('-', '').isdigit())
-    if numeric_count >= 2:
-        return "chart"
-    
-    # Look for long text content - suggests note
-    long_text = any(len(cell) > 100 for cell in row if cell)
-    if long_text:
-        return "note"
-    
-    # Default to entity for structured data
-    return "entity"
+    profile = SheetProfile(headers)
+    profile.observe([row])
+    return profile.item_type(row)
 
 def create_item_data(item_type: str, row: List[str], headers: List[str]) -> Dict[str, Any]:
     """
@@ -294,117 +947,54 @@ def create_item_data(item_type: str, row: List[str], headers: List[str]) -> Dict
     Returns:
         Data structure appropriate for the item type
     """
-    if item_type == "project":
-        return {
-            "field1": row[2] if len(row) > 2 else "",  # Description/details
-            "field2": "",  # Select option (empty by default)
-            "field3": find_date_in_row(row),  # Date field
-            "field4": [],  # Checklist (empty)
-            "field4_id": 0,
-        }
-    
-    elif item_type == "entity":
-        return {
-            "field1": row[2] if len(row) > 2 else "",  # Description
-            "field2": "",  # Select option (empty by default)
-            "field3": extract_tags_from_row(row),  # Tags
-            "field3_options": ["Import", "Data", "Sheet", "Tag 1", "Tag 2"],  # Default options
-        }
-    
-    elif item_type == "note":
-        # Combine all non-empty cells into a note
-        content_parts = []
-        for i, (header, cell) in enumerate(zip(headers, row)):
-            if cell:
-                if i == 0:  # First cell is already the name
-                    continue
-                content_parts.append(f"{header}: {cell}" if header else cell)
-        
-        return {
-            "field1": "\n".join(content_parts) if content_parts else row[1] if len(row) > 1 else "",
-        }
-    
-    elif item_type == "chart":
-        metrics = []
-        metric_id = 1
-        
-        # Create metrics from numeric data
-        for i, (header, cell) in enumerate(zip(headers, row)):
-            if cell and (cell.replace('.', '').replace('-', '').isdigit() or is_percentage(cell)):
-                value = parse_numeric_value(cell)
-                if value is not None:
-                    metrics.append({
-                        "id": str(metric_id).zfill(3),
-                        "label": header or f"Metric {i+1}",
-                        "value": min(100, max(0, value))  # Clamp to 0-100
-                    })
-                    metric_id += 1
-        
-        return {
-            "field1": metrics,
-            "field1_id": metric_id - 1,
-        }
-    
-    # Default fallback
-    return {"field1": ""}
+    profile = SheetProfile(headers)
+    profile.observe([row])
+    return profile.item_data(item_type, row)
 
-def find_date_in_row(row: List[str]) -> str:
-    """Find and parse date from row cells."""
-    import re
-    from datetime import datetime
-    
-    date_pattern = r'\b\d{4}[-/]\d{1,2}[-/]\d{1,2}\b|\b\d{1,2}[-/]\d{1,2}[-/]\d{4}\b'
-    
-    for cell in row:
+def find_date_in_row(row: List[str], columns: Optional[List[int]] = None) -> str:
+    """Find and parse date from row cells (only ``columns``, in order, when given)."""
+    cells = row if columns is None else [row[i] for i in columns if i < len(row)]
+    for cell in cells:
         if not cell:
             continue
             
         # Look for date patterns
-        match = re.search(date_pattern, cell)
+        match = DATE_PATTERN.search(cell)
         if match:
-            try:
-                date_str = match.group()
-                # Try to parse and normalize
-                if '/' in date_str:
-                    date_str = date_str.replace('/', '-')
-                
-                # Parse different formats
-                for fmt in ['%Y-%m-%d', '%m-%d-%Y', '%d-%m-%Y']:
-                    try:
-                        dt = datetime.strptime(date_str, fmt)
-                        return dt.strftime('%Y-%m-%d')
-                    except ValueError:
-                        continue
-            except Exception:
-                continue
+            date_str = match.group().replace('/', '-')
+            
+            # Parse different formats
+            for fmt in DATE_FORMATS:
+                try:
+                    return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
+                except ValueError:
+                    continue
     
     return ""
 
-def extract_tags_from_row(row: List[str]) -> List[str]:
-    """Extract tags from row cells."""
+def extract_tags_from_row(row: List[str], columns: Optional[List[int]] = None) -> List[str]:
+    """Extract tags from row cells (only ``columns``, in order, when given)."""
     tags = []
     
-    for cell in row[2:]:  # Skip first two cells (name and subtitle)
+    # Skip first two cells (name and subtitle)
+    cells = row[2:] if columns is None else [row[i] for i in columns if 2 <= i < len(row)]
+    for cell in cells:
         if not cell:
             continue
             
-        # Split on common delimiters and clean
-        potential_tags = []
-        for delimiter in [',', ';', '|', '\n']:
-            if delimiter in cell:
-                potential_tags.extend(cell.split(delimiter))
-                break
-        else:
-            # Single tag
-            potential_tags = [cell]
+        # Split on the first common delimiter present
+        delimiter = next((d for d in TAG_DELIMITERS if d in cell), None)
+        potential_tags = cell.split(delimiter) if delimiter else [cell]
         
         # Clean and add tags
         for tag in potential_tags:
             cleaned = tag.strip()
             if cleaned and len(cleaned) <= 20:  # Reasonable tag length
                 tags.append(cleaned)
+                if len(tags) == 5:  # Limit to 5 tags
+                    return tags
     
-    return tags[:5]  # Limit to 5 tags
+    return tags
 
 def is_percentage(value: str) -> bool:
     """Check if value is a percentage."""
@@ -415,34 +1005,219 @@ def parse_numeric_value(value: str) -> Optional[float]:
     try:
         if is_percentage(value):
             return float(value[:-1])
-        elif value.replace('.', '').replace('-', '').isdigit():
+        elif _is_number(value):
             return float(value)
     except ValueError:
         pass
     return None
 
 
-def sync_canvas_to_sheet(sheet_id: str, canvas_state: Dict[str, Any], sheet_name: Optional[str] = None) -> Dict[str, Any]:
+def _get_internal_sheet_id(sheet_id: str, sheet_name: str) -> int:
+    """Resolve a tab's internal sheetId (needed for dimension edits) from cached metadata."""
+    sheet_info = get_spreadsheet_info(sheet_id)
+    if sheet_info:
+        for sheet in sheet_info.get("sheets", []):
+            if sheet.get("properties", {}).get("title") == sheet_name:
+                return sheet.get("properties", {}).get("sheetId", 0)
+    return 0  # Default fallback
+
+def _delete_rows(sheet_id: str, internal_sheet_id: int, start_index: int, end_index: int) -> Optional[Dict[str, Any]]:
+    """Delete rows [start_index, end_index) (0-based, header is row 0)."""
+    return execute_sheets_tool(
+        slug="GOOGLESHEETS_DELETE_DIMENSION",
+        arguments={
+            "spreadsheet_id": sheet_id,
+            "delete_dimension_request": {
+                "range": {
+                    "dimension": "ROWS",
+                    "end_index": end_index,
+                    "sheet_id": internal_sheet_id,
+                    "start_index": start_index
+                }
+            }
+        }
+    )
+
+def _write_rows(sheet_id: str, sheet_name: str, first_row: int, rows: List[List[str]]) -> Optional[Dict[str, Any]]:
+    """Write ``rows`` starting at column A of 1-based row ``first_row``."""
+    return execute_sheets_tool(
+        slug="GOOGLESHEETS_BATCH_UPDATE",
+        arguments={
+            "spreadsheet_id": sheet_id,
+            "sheet_name": sheet_name,
+            "first_cell_location": f"A{first_row}",
+            "values": rows,
+            "valueInputOption": "USER_ENTERED"
+        }
+    )
+
+def _rewrite_sheet(sheet_id: str, target_sheet_name: str, new_rows: List[List[str]], current_row_count: Optional[int] = None) -> Dict[str, Any]:
+    """Rewrite the whole tab from A1, deleting rows left over from a longer previous sync."""
+    if current_row_count is None:
+        # Get current sheet data to determine how many rows need to be deleted
+        current_sheet_data = get_sheet_data(sheet_id, target_sheet_name)
+        current_row_count = 0
+        if current_sheet_data and current_sheet_data.get("rows"):
+            current_row_count = len(current_sheet_data["rows"])
+    
+    items_count = len(new_rows) - 1
+    print(f"Current sheet has {current_row_count} rows")
+    print(f"Canvas has {items_count} items to sync")
+    
+    new_row_count = len(new_rows)  # Including header
+    
+    # Step 1: Delete extra rows if the new data has fewer rows than current
+    if current_row_count > new_row_count:
+        rows_to_delete = current_row_count - new_row_count
+        print(f"Deleting {rows_to_delete} rows from sheet (current: {current_row_count}, new: {new_row_count})")
+        
+        # Get the sheet's internal ID for deletion
+        internal_sheet_id = _get_internal_sheet_id(sheet_id, target_sheet_name)
+        print(f"Using internal sheet ID: {internal_sheet_id} for deletion")
+        
+        delete_result = _delete_rows(sheet_id, internal_sheet_id, new_row_count, current_row_count)
+        
+        # Grid dimensions changed; cached metadata is now stale
+        get_metadata_cache().invalidate(sheet_id)
+        
+        if not delete_result or not delete_result.get("successful"):
+            # The tab's row count is now unknown, so the caller must not record new_rows as synced
+            error_msg = delete_result.get("error", "Unknown error") if delete_result else "No response"
+            return {"success": False, "error": f"Failed to delete rows: {error_msg}"}
+    
+    # Step 2: Update the sheet with new data
+    print(f"Updating sheet with {len(new_rows)} rows (including header)")
+    if is_debug_mode():
+        print(f"First few rows: {new_rows[:3]}")
+    
+    result = _write_rows(sheet_id, target_sheet_name, 1, new_rows)
+    
+    if is_debug_mode():
+        print(f"Batch update result: {result}")
+    
+    if new_row_count > current_row_count:
+        # The grid may have been extended; cached dimensions are stale
+        get_metadata_cache().invalidate(sheet_id)
+    
+    if result and result.get("successful"):
+        return {
+            "success": True,
+            "message": f"Synced {items_count} items to Google Sheets (deleted {max(0, current_row_count - new_row_count)} rows)",
+            "items_synced": items_count,
+            "sheet_id": sheet_id,
+            "rows_deleted": max(0, current_row_count - new_row_count),
+            "mode": "full",
+        }
+    else:
+        error_msg = result.get("error", "Unknown error") if result else "No response"
+        return {
+            "success": False,
+            "error": f"Failed to sync to Google Sheets: {error_msg}"
+        }
+
+def _apply_row_diff(sheet_id: str, target_sheet_name: str, new_rows: List[List[str]], diff: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a row diff from compute_row_diff(): delete, then rewrite changed and appended ranges."""
+    items_count = len(new_rows) - 1
+    deleted = diff["deleted"]
+    appended = diff["appended"]
+    surviving_count = items_count - appended
+    
+    # Each separate run of deleted rows costs a request; past the cap one rewrite is cheaper
+    delete_runs = group_runs(deleted)
+    if len(delete_runs) > get_sync_max_update_ranges():
+        print(f"Incremental sync: {len(delete_runs)} deleted row ranges, rewriting the tab instead")
+        return _rewrite_sheet(sheet_id, target_sheet_name, new_rows, surviving_count + len(deleted) + 1)
+    
+    print(f"Incremental sync: {len(deleted)} deleted, {len(diff['updated'])} updated, {appended} appended")
+    
+    # Step 1: Delete removed rows, bottom-up so earlier indices stay valid
+    if deleted:
+        internal_sheet_id = _get_internal_sheet_id(sheet_id, target_sheet_name)
+        for start, end in reversed(delete_runs):
+            delete_result = _delete_rows(sheet_id, internal_sheet_id, start + 1, end + 1)
+            if not delete_result or not delete_result.get("successful"):
+                get_metadata_cache().invalidate(sheet_id)
+                error_msg = delete_result.get("error", "Unknown error") if delete_result else "No response"
+                return {"success": False, "error": f"Failed to delete rows: {error_msg}"}
+        get_metadata_cache().invalidate(sheet_id)
+    
+    # Step 2: Write changed and appended rows as contiguous ranges
+    changed = diff["updated"] + list(range(surviving_count, items_count))
+    runs = group_runs(changed)
+    if len(runs) > get_sync_max_update_ranges():
+        runs = [(runs[0][0], runs[-1][1])]
+    
+    for start, end in runs:
+        result = _write_rows(sheet_id, target_sheet_name, start + 2, new_rows[start + 1:end + 1])
+        if not result or not result.get("successful"):
+            error_msg = result.get("error", "Unknown error") if result else "No response"
+            return {"success": False, "error": f"Failed to sync to Google Sheets: {error_msg}"}
+    
+    if appended:
+        # The grid may have been extended; cached dimensions are stale
+        get_metadata_cache().invalidate(sheet_id)
+    
+    return {
+        "success": True,
+        "message": (
+            f"Synced {items_count} items to Google Sheets incrementally "
+            f"({len(diff['updated'])} updated, {appended} appended, {len(deleted)} deleted rows)"
+        ),
+        "items_synced": items_count,
+        "sheet_id": sheet_id,
+        "rows_deleted": len(deleted),
+        "rows_updated": len(diff["updated"]),
+        "rows_appended": appended,
+        "mode": "incremental",
+    }
+
+def _normalize_id(cell: Any) -> str:
+    # USER_ENTERED turns ids like "0001" into numbers, which Sheets reads back as "1"
+    text = str(cell).strip()
+    return str(int(text)) if text.isdigit() else text
+
+def _sheet_matches_snapshot(sheet_id: str, sheet_name: str, previous_rows: List[List[str]]) -> bool:
+    """Whether the tab's id column still matches the last-synced rows (one single-column read)."""
+    try:
+        current = _fetch_values(sheet_id, f"{sheet_name}!A:A")
+    except SheetReadError:
+        return False
+    current_ids = [_normalize_id(row[0]) if row else "" for row in current]
+    while current_ids and not current_ids[-1]:
+        current_ids.pop()
+    return current_ids == [_normalize_id(row[0]) if row else "" for row in previous_rows]
+
+def sync_canvas_to_sheet(
+    sheet_id: str,
+    canvas_state: Dict[str, Any],
+    sheet_name: Optional[str] = None,
+    incremental: Optional[bool] = None,
+) -> Dict[str, Any]:
     """
     Sync canvas state to Google Sheets with proper deletion of removed items.
     
+    In incremental mode the rows last written to the tab are diffed against
+    the new rows on the ``id`` column and only deleted, changed and appended
+    rows are written. The tab's id column is read first to check that the
+    snapshot still describes it. Without a usable snapshot (first sync,
+    expired snapshot, rows changed outside the canvas, reordered items) the
+    whole tab is rewritten.
+    
     Args:
         sheet_id: Google Sheets ID
         canvas_state: Canvas state with items, globalTitle, etc.
         sheet_name: Optional sheet name to sync to. If not provided, uses first sheet.
+        incremental: Whether to diff against the last sync. Defaults to SHEETS_SYNC_MODE.
         
     Returns:
         Dictionary with sync result status
     """
-    composio, user_id = get_composio_client()
-    if not composio or not user_id:
-        return {"success": False, "error": "Failed to initialize Composio client"}
-    
+    target_sheet_name = sheet_name
+    snapshots = get_sync_snapshot_store()
     try:
         items = canvas_state.get("items", [])
         
         # Determine which sheet to sync to
-        target_sheet_name = sheet_name
         if not target_sheet_name:
             # Get available sheets and use the first one
             sheet_names = get_sheet_names(sheet_id)
@@ -452,108 +1227,38 @@ def sync_canvas_to_sheet(sheet_id: str, canvas_state: Dict[str, Any], sheet_name
         
         print(f"Syncing to sheet: {target_sheet_name}")
         
-        # First, get current sheet data to determine how many rows need to be deleted
-        current_sheet_data = get_sheet_data(sheet_id, target_sheet_name)
-        current_row_count = 0
-        if current_sheet_data and current_sheet_data.get("rows"):
-            current_row_count = len(current_sheet_data["rows"])
-        
-        print(f"Current sheet has {current_row_count} rows")
-        print(f"Canvas has {len(items)} items to sync")
+        if incremental is None:
+            incremental = get_sheets_sync_mode() == "incremental"
         
         # Prepare new sheet data
-        headers = ["id", "type", "name", "subtitle", "data"]
-        new_rows = [headers]  # Start with headers
-        
-        for item in items:
-            item_data_json = json.dumps(item.get("data", {}))
-            row = [
-                str(item.get("id", "")),
-                str(item.get("type", "")),
-                str(item.get("name", "")),
-                str(item.get("subtitle", "")),
-                item_data_json
-            ]
-            new_rows.append(row)
-        
-        new_row_count = len(new_rows)  # Including header
-        
-        # Step 1: Delete extra rows if the new data has fewer rows than current
-        if current_row_count > new_row_count:
-            rows_to_delete = current_row_count - new_row_count
-            print(f"Deleting {rows_to_delete} rows from sheet (current: {current_row_count}, new: {new_row_count})")
-            
-            # Get the sheet's internal ID for deletion
-            sheet_info_result = composio.tools.execute(
-                user_id=user_id,
-                slug="GOOGLESHEETS_GET_SPREADSHEET_INFO",
-                arguments={"spreadsheet_id": sheet_id}
-            )
-            
-            internal_sheet_id = 0  # Default fallback
-            if sheet_info_result and sheet_info_result.get("successful"):
-                sheets = sheet_info_result.get("data", {}).get("response_data", {}).get("sheets", [])
-                for sheet in sheets:
-                    if sheet.get("properties", {}).get("title") == target_sheet_name:
-                        internal_sheet_id = sheet.get("properties", {}).get("sheetId", 0)
-                        break
-            
-            print(f"Using internal sheet ID: {internal_sheet_id} for deletion")
-            
-            delete_result = composio.tools.execute(
-                user_id=user_id,
-                slug="GOOGLESHEETS_DELETE_DIMENSION",
-                arguments={
-                    "spreadsheet_id": sheet_id,
-                    "delete_dimension_request": {
-                        "range": {
-                            "dimension": "ROWS",
-                            "end_index": current_row_count,
-                            "sheet_id": internal_sheet_id,
-                            "start_index": new_row_count
-                        }
-                    }
-                }
-            )
-            
-            if not delete_result or not delete_result.get("successful"):
-                print(f"Warning: Failed to delete rows: {delete_result}")
-                # Continue anyway - the batch update might still work
-        
-        # Step 2: Update the sheet with new data
-        print(f"Updating sheet with {len(new_rows)} rows (including header)")
-        print(f"First few rows: {new_rows[:3]}")
+        new_rows = canvas_to_rows(items)
         
-        result = composio.tools.execute(
-            user_id=user_id,
-            slug="GOOGLESHEETS_BATCH_UPDATE",
-            arguments={
-                "spreadsheet_id": sheet_id,
-                "sheet_name": target_sheet_name,
-                "first_cell_location": "A1",
-                "values": new_rows,
-                "valueInputOption": "USER_ENTERED"
-            }
-        )
+        previous_rows = snapshots.get(sheet_id, target_sheet_name) if incremental else None
+        if previous_rows and not _sheet_matches_snapshot(sheet_id, target_sheet_name, previous_rows):
+            # Rows were added, removed or moved outside the canvas; re-read the tab and rewrite it
+            print("Sheet changed since the last sync; rewriting it")
+            previous_rows = None
+        diff = compute_row_diff(previous_rows, new_rows) if previous_rows else None
         
-        print(f"Batch update result: {result}")
+        if diff is not None:
+            result = _apply_row_diff(sheet_id, target_sheet_name, new_rows, diff)
+        else:
+            known_row_count = len(previous_rows) if previous_rows else None
+            result = _rewrite_sheet(sheet_id, target_sheet_name, new_rows, known_row_count)
         
-        if result and result.get("successful"):
-            return {
-                "success": True,
-                "message": f"Synced {len(items)} items to Google Sheets (deleted {max(0, current_row_count - new_row_count)} rows)",
-                "items_synced": len(items),
-                "sheet_id": sheet_id,
-                "rows_deleted": max(0, current_row_count - new_row_count)
-            }
+        if result.get("success"):
+            snapshots.set(sheet_id, target_sheet_name, new_rows)
         else:
-            error_msg = result.get("error", "Unknown error") if result else "No response"
-            return {
-                "success": False,
-                "error": f"Failed to sync to Google Sheets: {error_msg}"
-            }
+            snapshots.invalidate(sheet_id, target_sheet_name)
+        return result
             
+    except ComposioUnavailableError as e:
+        if target_sheet_name:
+            snapshots.invalidate(sheet_id, target_sheet_name)
+        return {"success": False, "error": str(e)}
     except Exception as e:
+        if target_sheet_name:
+            snapshots.invalidate(sheet_id, target_sheet_name)
         return {
             "success": False,
             "error": f"Exception during sync: {str(e)}"
@@ -569,20 +1274,16 @@ def create_new_sheet(title: str = "Canvas Data") -> Dict[str, Any]:
     Returns:
         Dictionary with new sheet info
     """
-    composio, user_id = get_composio_client()
-    if not composio or not user_id:
-        return {"success": False, "error": "Failed to initialize Composio client"}
-    
     try:
-        result = composio.tools.execute(
-            user_id=user_id,
+        result = execute_sheets_tool(
             slug="GOOGLESHEETS_CREATE_GOOGLE_SHEET1",
             arguments={
                 "title": title
             }
         )
         
-        print(f"Composio API result for sheet creation: {result}")
+        if is_debug_mode():
+            print(f"Composio API result for sheet creation: {result}")
         
         if result and result.get("successful"):
             sheet_data = result.get("data", {}).get("response_data", {})
@@ -592,6 +1293,9 @@ def create_new_sheet(title: str = "Canvas Data") -> Dict[str, Any]:
             
             print(f"Successfully extracted sheet_id: {sheet_id}, sheet_url: {sheet_url}")
             
+            if sheet_id:
+                get_metadata_cache().invalidate(sheet_id)
+            
             return {
                 "success": True,
                 "sheet_id": sheet_id,
@@ -606,6 +1310,8 @@ def create_new_sheet(title: str = "Canvas Data") -> Dict[str, Any]:
                 "error": f"Failed to create sheet: {error_msg}"
             }
             
+    except ComposioUnavailableError as e:
+        return {"success": False, "error": str(e)}
     except Exception as e:
         return {
             "success": False,
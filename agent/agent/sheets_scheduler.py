@@ -0,0 +1,384 @@
+"""
+Sheets Scheduler
+
+This module paces every Google Sheets call against the per-user,
+per-minute quota. Each (user, spreadsheet) pair has a token bucket; calls
+wait for a token in priority order, so interactive imports go ahead of
+background canvas-to-sheet syncs. Tokens can be awaited on the event loop
+as well as in a worker thread, so a throttled call need not hold a thread.
+Calls rejected with 429 are retried with exponential backoff and full
+jitter, and the 429 also pauses the bucket so queued calls back off with
+it; calls that failed with a 5xx or timed out may have been applied, so
+only those safe to repeat are retried. A call's deadline stops its token
+wait, its retries and its backoff sleeps.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .composio_pool import ComposioUnavailableError
+from .config import (
+    get_composio_user_id,
+    get_sheets_background_routes,
+    get_sheets_rate_burst,
+    get_sheets_rate_limit,
+    get_sheets_retry_attempts,
+    get_sheets_retry_base_delay,
+    get_sheets_retry_max_delay,
+)
+from .instrumentation import METRICS
+
+T = TypeVar("T")
+
+LANES = {"interactive": 0, "background": 1}
+
+# Slugs safe to repeat after a 5xx or timeout: reads, and value writes to fixed ranges.
+# Deleting rows or creating a spreadsheet twice is not, so those only retry rejected (429) calls.
+IDEMPOTENT_SLUGS = frozenset({
+    "GOOGLESHEETS_GET_SPREADSHEET_INFO",
+    "GOOGLESHEETS_BATCH_GET",
+    "GOOGLESHEETS_BATCH_UPDATE",
+})
+
+# Buckets beyond this many are pruned once idle and full again
+MAX_BUCKETS = 1024
+
+_RATE_LIMITED = re.compile(r"\b429\b|RESOURCE_EXHAUSTED|rate ?limit|quota exceeded|too many requests", re.IGNORECASE)
+_SERVER_ERROR = re.compile(r"\b50[0234]\b|backend ?error|internal error|UNAVAILABLE|timed out|timeout", re.IGNORECASE)
+
+sheets_lane: ContextVar[str] = ContextVar("sheets_lane", default="interactive")
+# time.monotonic() by which the current sheets route call must be done
+sheets_deadline: ContextVar[Optional[float]] = ContextVar("sheets_deadline", default=None)
+# Spreadsheet whose token for the next call was already taken on the event loop
+_prepaid: ContextVar[Optional[str]] = ContextVar("sheets_prepaid_token", default=None)
+
+QUEUE_WAIT = METRICS.histogram("agent_sheets_queue_wait_seconds", "Time Google Sheets calls waited for a rate-limit token.")
+RETRIES = METRICS.counter("agent_sheets_retries_total", "Google Sheets calls retried after a 429 or 5xx.")
+
+
+def lane_for_route(route: str) -> str:
+    """Return the scheduling lane of a sheets executor route."""
+    return "background" if route in get_sheets_background_routes() else "interactive"
+
+
+class SheetsDeadlineExceeded(Exception):
+    """Raised when a call's deadline passes while it waits for a token or a retry."""
+
+
+def is_retryable(slug: Optional[str], reason: str) -> bool:
+    """Whether a call of ``slug`` that failed for ``reason`` may be repeated."""
+    return reason == "rate_limited" or slug in IDEMPOTENT_SLUGS
+
+
+def retry_reason(error: Any) -> Optional[str]:
+    """Classify a failed call's error as 'rate_limited', 'server_error' or not retryable (None)."""
+    if error is None:
+        return None
+    text = str(error)
+    if _RATE_LIMITED.search(text):
+        return "rate_limited"
+    if _SERVER_ERROR.search(text):
+        return "server_error"
+    return None
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "waiters")
+
+    def __init__(self, tokens: float):
+        self.tokens = tokens
+        self.updated = time.monotonic()
+        self.waiters: List[Tuple[int, int]] = []
+
+
+class SheetsScheduler:
+    """Token buckets per (user, spreadsheet) with priority lanes and retry/backoff."""
+
+    def __init__(
+        self,
+        rate_per_minute: Optional[int] = None,
+        burst: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ):
+        self.rate_per_minute = rate_per_minute if rate_per_minute is not None else get_sheets_rate_limit()
+        self.burst = burst or get_sheets_rate_burst()
+        self.max_retries = max_retries if max_retries is not None else get_sheets_retry_attempts()
+        self.base_delay = base_delay if base_delay is not None else get_sheets_retry_base_delay()
+        self.max_delay = max_delay if max_delay is not None else get_sheets_retry_max_delay()
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+        self._waiting = {lane: 0 for lane in LANES}
+        self._max_waiting = 0
+        self._throttled = 0
+        self._retries = {"rate_limited": 0, "server_error": 0}
+        self._exhausted = 0
+        self._deadline_exceeded = 0
+        # Event-loop waiters by queue entry, woken when they reach the head of their bucket
+        self._async_waiters: Dict[Tuple[int, int], Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+
+    def acquire(self, spreadsheet_id: str = "", lane: Optional[str] = None) -> float:
+        """
+        Block until the spreadsheet's bucket has a token for this caller; return the seconds waited.
+
+        Raises:
+            SheetsDeadlineExceeded: If the call's deadline passes first
+        """
+        if not self.rate_per_minute:
+            return 0.0
+        if _prepaid.get() == spreadsheet_id:
+            _prepaid.set(None)
+            return 0.0
+        lane = lane or sheets_lane.get()
+        rate = self.rate_per_minute / 60
+        deadline = sheets_deadline.get()
+        start = time.monotonic()
+        with self._cond:
+            bucket, entry = self._enqueue(spreadsheet_id, lane)
+            try:
+                while not self._take(bucket, entry, rate):
+                    timeout = self._wait_time(bucket, entry, rate)
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._deadline_exceeded += 1
+                            raise SheetsDeadlineExceeded(f"Deadline passed waiting for a token for {spreadsheet_id}")
+                        timeout = remaining if timeout is None else min(timeout, remaining)
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._dequeue(bucket, entry)
+                raise
+            finally:
+                self._waiting[lane] -= 1
+                self._wake(bucket)
+        return self._waited(start, lane)
+
+    async def acquire_async(self, spreadsheet_id: str = "", lane: Optional[str] = None) -> float:
+        """Like ``acquire``, but wait on the event loop instead of blocking a thread."""
+        if not self.rate_per_minute:
+            return 0.0
+        lane = lane or sheets_lane.get()
+        rate = self.rate_per_minute / 60
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        start = time.monotonic()
+        with self._cond:
+            bucket, entry = self._enqueue(spreadsheet_id, lane)
+            self._async_waiters[entry] = (loop, wakeup)
+        try:
+            while True:
+                with self._cond:
+                    if self._take(bucket, entry, rate):
+                        break
+                    timeout = self._wait_time(bucket, entry, rate)
+                    wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                self._dequeue(bucket, entry)
+            raise
+        finally:
+            with self._cond:
+                del self._async_waiters[entry]
+                self._waiting[lane] -= 1
+                self._wake(bucket)
+        return self._waited(start, lane)
+
+    def call_with_token(self, spreadsheet_id: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run ``fn`` holding a token for ``spreadsheet_id`` already taken with
+        ``acquire_async``; its first call to that spreadsheet uses it, and it
+        is given back if no call does.
+        """
+        reset = _prepaid.set(spreadsheet_id)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if _prepaid.get() is not None:
+                self.refund(spreadsheet_id)
+            _prepaid.reset(reset)
+
+    def refund(self, spreadsheet_id: str) -> None:
+        """Return an unused token to a spreadsheet's bucket."""
+        if not self.rate_per_minute:
+            return
+        with self._cond:
+            bucket = self._bucket((get_composio_user_id(), spreadsheet_id))
+            self._refill(bucket, self.rate_per_minute / 60)
+            bucket.tokens = min(float(self.burst), bucket.tokens + 1)
+            self._wake(bucket)
+
+    def pause(self, spreadsheet_id: str, seconds: float) -> None:
+        """Withhold tokens for a spreadsheet for ``seconds`` (after the API reported a 429)."""
+        if not self.rate_per_minute:
+            return
+        rate = self.rate_per_minute / 60
+        with self._cond:
+            bucket = self._bucket((get_composio_user_id(), spreadsheet_id))
+            self._refill(bucket, rate)
+            bucket.tokens = min(bucket.tokens, 1 - seconds * rate)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Return the full-jitter exponential backoff before retry number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def run(
+        self,
+        spreadsheet_id: str,
+        call: Callable[[], Optional[Dict[str, Any]]],
+        slug: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run a Composio-style call of ``slug`` under the rate limit, retrying where that is safe.
+
+        ``call`` returns a result dict (``successful``/``error``) or raises.
+        429s are always retried; 5xx errors and timeouts only for
+        ``IDEMPOTENT_SLUGS``. The last result is returned, or the last
+        exception re-raised, once retries are exhausted, the failure is not
+        retryable, or the backoff would outlast the call's deadline.
+
+        Raises:
+            ComposioUnavailableError: If no Composio client could be acquired (not retried)
+            SheetsDeadlineExceeded: If the deadline passed before an attempt could start
+        """
+        deadline = sheets_deadline.get()
+        attempt = 0
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                self._deadline_exceeded += 1
+                raise SheetsDeadlineExceeded(f"Deadline passed before {slug or 'a Google Sheets call'} could run")
+            self.acquire(spreadsheet_id)
+            error: Optional[Exception] = None
+            try:
+                result = call()
+                failed = not result or not result.get("successful")
+                reason = retry_reason(result.get("error") if result else None) if failed else None
+            except ComposioUnavailableError:
+                raise
+            except Exception as e:
+                error, result = e, None
+                reason = retry_reason(e)
+            if reason is None or not is_retryable(slug, reason):
+                if error is not None:
+                    raise error
+                return result
+            delay = self.backoff_delay(attempt)
+            if attempt >= self.max_retries:
+                self._exhausted += 1
+            elif deadline is not None and time.monotonic() + delay >= deadline:
+                # The caller will have given up before the retry could run
+                self._deadline_exceeded += 1
+            else:
+                if reason == "rate_limited":
+                    self.pause(spreadsheet_id, delay)
+                self._retries[reason] += 1
+                RETRIES.inc(reason=reason)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if error is not None:
+                raise error
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth per lane, throttling and retry counters."""
+        with self._cond:
+            return {
+                "rate_per_minute": self.rate_per_minute,
+                "buckets": len(self._buckets),
+                "waiting": dict(self._waiting),
+                "max_waiting": self._max_waiting,
+                "throttled": self._throttled,
+                "retries": dict(self._retries),
+                "retries_exhausted": self._exhausted,
+                "deadline_exceeded": self._deadline_exceeded,
+            }
+
+    def _enqueue(self, spreadsheet_id: str, lane: str) -> Tuple[_Bucket, Tuple[int, int]]:
+        bucket = self._bucket((get_composio_user_id(), spreadsheet_id))
+        entry = (LANES.get(lane, 0), next(self._sequence))
+        heapq.heappush(bucket.waiters, entry)
+        self._waiting[lane] = self._waiting.get(lane, 0) + 1
+        self._max_waiting = max(self._max_waiting, sum(self._waiting.values()))
+        return bucket, entry
+
+    def _dequeue(self, bucket: _Bucket, entry: Tuple[int, int]) -> None:
+        if entry in bucket.waiters:
+            bucket.waiters.remove(entry)
+            heapq.heapify(bucket.waiters)
+
+    def _take(self, bucket: _Bucket, entry: Tuple[int, int], rate: float) -> bool:
+        self._refill(bucket, rate)
+        if bucket.waiters[0] == entry and bucket.tokens >= 1:
+            bucket.tokens -= 1
+            heapq.heappop(bucket.waiters)
+            return True
+        return False
+
+    @staticmethod
+    def _wait_time(bucket: _Bucket, entry: Tuple[int, int], rate: float) -> Optional[float]:
+        # The head waits for its token; everyone else waits to become the head
+        return (1 - bucket.tokens) / rate if bucket.waiters[0] == entry else None
+
+    def _wake(self, bucket: _Bucket) -> None:
+        self._cond.notify_all()
+        waiter = self._async_waiters.get(bucket.waiters[0]) if bucket.waiters else None
+        if waiter is not None:
+            loop, wakeup = waiter
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # The waiter's loop is closed
+
+    def _waited(self, start: float, lane: str) -> float:
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            self._throttled += 1
+        QUEUE_WAIT.observe(waited, lane=lane)
+        return waited
+
+    def _bucket(self, key: Tuple[str, str]) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._prune()
+            bucket = self._buckets[key] = _Bucket(float(self.burst))
+        return bucket
+
+    def _refill(self, bucket: _Bucket, rate: float) -> None:
+        now = time.monotonic()
+        bucket.tokens = min(float(self.burst), bucket.tokens + (now - bucket.updated) * rate)
+        bucket.updated = now
+
+    def _prune(self) -> None:
+        rate = self.rate_per_minute / 60
+        for key, bucket in list(self._buckets.items()):
+            self._refill(bucket, rate)
+            if not bucket.waiters and bucket.tokens >= self.burst:
+                del self._buckets[key]
+
+
+_scheduler: Optional[SheetsScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_sheets_scheduler() -> SheetsScheduler:
+    """Return the process-wide sheets scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = SheetsScheduler()
+    return _scheduler
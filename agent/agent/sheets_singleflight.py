@@ -0,0 +1,113 @@
+"""
+Sheets Singleflight
+
+This module coalesces concurrent identical Google Sheets reads. While a
+spreadsheet-info lookup or a values read for a (user, spreadsheet, range)
+is in flight, other callers asking for the same key wait for it and share
+its result (or exception) instead of making their own remote call. They
+wait no longer than their own deadline, and an interactive caller does not
+wait behind a background call but makes its own. Nothing is kept once the
+call returns; caching is left to the metadata and snapshot stores.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from .config import get_composio_user_id
+from .instrumentation import METRICS
+from .sheets_scheduler import LANES, SheetsDeadlineExceeded, sheets_deadline, sheets_lane
+
+T = TypeVar("T")
+
+SAVED_CALLS = METRICS.counter("agent_sheets_singleflight_saved_total", "Google Sheets reads served by another caller's in-flight call.")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers", "lane")
+
+    def __init__(self, lane: str) -> None:
+        self.lane = lane
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Per-key deduplication of concurrent blocking calls."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Tuple[str, Hashable], _Call] = {}
+        self._lock = threading.Lock()
+        self._calls_made: Dict[str, int] = {}
+        self._saved: Dict[str, int] = {}
+        self._deadline_exceeded = 0
+
+    def do(self, kind: str, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Run ``fn`` unless an identical call is in flight, then share its outcome.
+
+        ``kind`` names the operation (e.g. ``info``, ``values``) for the
+        counters; the key is scoped to the current Composio user.
+
+        Raises:
+            SheetsDeadlineExceeded: If the caller's deadline passes while it
+                waits for another caller's call
+        """
+        full_key = (kind, (get_composio_user_id(), key))
+        lane = sheets_lane.get()
+        with self._lock:
+            call = self._calls.get(full_key)
+            if call is None or LANES.get(lane, 0) < LANES.get(call.lane, 0):
+                # A more urgent caller leads its own call; later callers share that one
+                call = self._calls[full_key] = _Call(lane)
+                self._calls_made[kind] = self._calls_made.get(kind, 0) + 1
+                leader = True
+            else:
+                call.followers += 1
+                self._saved[kind] = self._saved.get(kind, 0) + 1
+                leader = False
+
+        if not leader:
+            SAVED_CALLS.inc(kind=kind)
+            deadline = sheets_deadline.get()
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self._deadline_exceeded += 1
+                raise SheetsDeadlineExceeded(f"Deadline passed waiting for a shared {kind} read")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(full_key) is call:
+                    del self._calls[full_key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return remote calls made and saved per kind, and the calls in flight."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "calls": dict(self._calls_made),
+                "saved": dict(self._saved),
+                "saved_total": sum(self._saved.values()),
+                "deadline_exceeded": self._deadline_exceeded,
+            }
+
+
+_singleflight = SingleFlight()
+
+
+def get_sheets_singleflight() -> SingleFlight:
+    """Return the process-wide singleflight group for sheet reads."""
+    return _singleflight
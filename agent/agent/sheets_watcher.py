@@ -0,0 +1,238 @@
+"""
+Sheets Watcher
+
+This module detects changes made to watched Google Sheets tabs outside
+the canvas. Each watched tab is polled on an adaptive interval: after a
+change (or sync activity) it is polled every ``SHEETS_WATCH_MIN_INTERVAL``
+seconds, and each unchanged poll stretches the interval by
+``SHEETS_WATCH_BACKOFF`` up to ``SHEETS_WATCH_MAX_INTERVAL``. A poll asks
+the backend for the spreadsheet's revision first and only reads values
+when it moved. Backends without revisions (Composio) cannot tell which
+rows changed, so every poll reads the whole tab, in one metadata call and
+one batch read; that is why idle tabs back off. Values are hashed per row
+window, so a change is reported with the ranges it affected. A change
+that leaves the tab holding exactly the rows the canvas last synced to
+it is our own write; any other change drops those last-synced rows, so
+the next canvas-to-sheet sync does not diff against rows that are no
+longer there, and subscribers are sent a ``sheet_changed`` event.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import (
+    get_sheets_watch_backoff,
+    get_sheets_watch_max_interval,
+    get_sheets_watch_min_interval,
+)
+from .instrumentation import METRICS
+from .sheets_backend import get_sheets_backend
+from .sheets_executor import run_sheets_call
+from .sheets_integration import fingerprint_matches_rows, get_sheet_fingerprint
+from .sync_diff import get_sync_snapshot_store
+
+WatchKey = Tuple[str, str]
+
+POLLS = METRICS.counter("agent_sheets_watch_polls_total", "Watched sheet polls by outcome.")
+
+
+class _Watch:
+    __slots__ = ("sheet_id", "sheet_name", "subscribers", "interval", "due", "revision", "fingerprint", "writes", "write_seq")
+
+    def __init__(self, sheet_id: str, sheet_name: str, interval: float):
+        self.sheet_id = sheet_id
+        self.sheet_name = sheet_name
+        self.subscribers: List[asyncio.Queue] = []
+        self.interval = interval
+        self.due = time.monotonic()
+        self.revision: Optional[str] = None
+        self.fingerprint: Optional[Dict[str, Any]] = None
+        # Writes of ours in flight, and a counter bumped as each starts and ends
+        self.writes = 0
+        self.write_seq = 0
+
+
+def changed_ranges(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Return the row windows whose content differs between two tab fingerprints."""
+    before, after = previous["windows"], current["windows"]
+    return [r for r, digest in after.items() if before.get(r) != digest] + [r for r in before if r not in after]
+
+
+class SheetWatcher:
+    """Adaptive poller of the tabs clients are subscribed to."""
+
+    def __init__(
+        self,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        backoff: Optional[float] = None,
+    ):
+        self.min_interval = min_interval or get_sheets_watch_min_interval()
+        self.max_interval = max(self.min_interval, max_interval or get_sheets_watch_max_interval())
+        self.backoff = backoff or get_sheets_watch_backoff()
+        self._watches: Dict[WatchKey, _Watch] = {}
+        self._polling: Dict[WatchKey, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._outcomes = {"unchanged": 0, "changed": 0, "own_write": 0, "writing": 0, "error": 0}
+        self.reads_skipped = 0
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Stop polling and end every subscription."""
+        tasks = [t for t in [self._task, *self._polling.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        for watch in self._watches.values():
+            for updates in watch.subscribers:
+                updates.put_nowait(None)
+        self._watches.clear()
+
+    def watch(self, sheet_id: str, sheet_name: Optional[str] = None) -> asyncio.Queue:
+        """Subscribe to a tab (the first tab when ``sheet_name`` is None); events arrive on the returned queue, None ends it."""
+        key = (sheet_id, sheet_name or "")
+        watch = self._watches.get(key)
+        if watch is None:
+            watch = self._watches[key] = _Watch(sheet_id, sheet_name or "", self.min_interval)
+            self._wake()
+        updates: asyncio.Queue = asyncio.Queue()
+        watch.subscribers.append(updates)
+        return updates
+
+    def unwatch(self, sheet_id: str, sheet_name: Optional[str], updates: asyncio.Queue) -> None:
+        """Drop a subscription; the tab stops being polled with its last subscriber."""
+        key = (sheet_id, sheet_name or "")
+        watch = self._watches.get(key)
+        if watch is None:
+            return
+        if updates in watch.subscribers:
+            watch.subscribers.remove(updates)
+        if not watch.subscribers:
+            del self._watches[key]
+
+    def touch(self, sheet_id: str, sheet_name: Optional[str] = None) -> None:
+        """Mark a spreadsheet's watched tabs (or one tab) active, so they are polled at the fastest rate."""
+        now = time.monotonic()
+        for watch in self._matching(sheet_id, sheet_name):
+            watch.interval = self.min_interval
+            watch.due = min(watch.due, now + self.min_interval)
+        self._wake()
+
+    @contextmanager
+    def writing(self, sheet_id: str, sheet_name: Optional[str] = None) -> Iterator[None]:
+        """Hold off polls of a tab while we write to it; the tab is polled again soon after."""
+        watches = self._matching(sheet_id, sheet_name)
+        for watch in watches:
+            watch.writes += 1
+            watch.write_seq += 1
+        try:
+            yield
+        finally:
+            for watch in watches:
+                watch.writes -= 1
+                watch.write_seq += 1
+            self.touch(sheet_id, sheet_name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return watched tabs, subscribers, poll outcomes and the current poll intervals."""
+        intervals = [w.interval for w in self._watches.values()]
+        return {
+            "watched": len(self._watches),
+            "subscribers": sum(len(w.subscribers) for w in self._watches.values()),
+            "polling": len(self._polling),
+            "min_interval_seconds": min(intervals, default=0.0),
+            "max_interval_seconds": max(intervals, default=0.0),
+            "reads_skipped": self.reads_skipped,
+            "polls": dict(self._outcomes),
+        }
+
+    def _matching(self, sheet_id: str, sheet_name: Optional[str]) -> List[_Watch]:
+        # A write to the first tab may be addressed by name or by default, so a name also matches ""
+        return [
+            w for w in self._watches.values()
+            if w.sheet_id == sheet_id and (not sheet_name or w.sheet_name in ("", sheet_name))
+        ]
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            for key, watch in list(self._watches.items()):
+                if watch.due <= now and key not in self._polling:
+                    self._polling[key] = asyncio.create_task(self._poll(key, watch))
+            waiting = [w.due for k, w in self._watches.items() if k not in self._polling]
+            timeout = max(0.0, min(waiting) - time.monotonic()) if waiting else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, key: WatchKey, watch: _Watch) -> None:
+        try:
+            outcome = await self._check(watch)
+        except Exception as e:
+            print(f"[WATCH] Polling {watch.sheet_id} failed: {e}")
+            outcome = "error"
+        finally:
+            self._polling.pop(key, None)
+        self._outcomes[outcome] += 1
+        POLLS.inc(outcome=outcome)
+        if outcome in ("changed", "own_write", "writing"):
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(self.max_interval, watch.interval * self.backoff)
+        watch.due = time.monotonic() + watch.interval
+        self._wake()
+
+    async def _check(self, watch: _Watch) -> str:
+        if watch.writes:
+            return "writing"
+        write_seq = watch.write_seq
+        revision = await run_sheets_call("watch", get_sheets_backend().revision, watch.sheet_id)
+        if revision is not None and revision == watch.revision and watch.fingerprint is not None:
+            self.reads_skipped += 1
+            return "unchanged"
+
+        fingerprint = await run_sheets_call(
+            "watch", get_sheet_fingerprint, watch.sheet_id, watch.sheet_name or None, spreadsheet_id=watch.sheet_id
+        )
+        if fingerprint is None:
+            return "error"
+        if watch.write_seq != write_seq:
+            # A write of ours overlapped the read, which may have caught it half done
+            return "writing"
+        previous = watch.fingerprint
+        watch.fingerprint, watch.revision = fingerprint, revision
+        ranges = changed_ranges(previous, fingerprint) if previous is not None else []
+        if not ranges:
+            return "unchanged"
+
+        snapshots = get_sync_snapshot_store()
+        synced_rows = snapshots.get(watch.sheet_id, fingerprint["sheet_name"])
+        if synced_rows is not None and fingerprint_matches_rows(fingerprint, synced_rows):
+            return "own_write"
+
+        snapshots.invalidate(watch.sheet_id, fingerprint["sheet_name"])
+        event = {
+            "type": "sheet_changed",
+            "sheet_id": watch.sheet_id,
+            "sheet_name": fingerprint["sheet_name"],
+            "ranges": ranges,
+            "grid_changed": previous["grid"] != fingerprint["grid"],
+            "detected_at": time.time(),
+        }
+        for updates in watch.subscribers:
+            updates.put_nowait(event)
+        return "changed"
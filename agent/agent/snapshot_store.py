@@ -0,0 +1,111 @@
+"""
+Canvas Snapshot Store
+
+This module persists converted canvas states in a local SQLite database,
+keyed by spreadsheet ID and tab, together with a content hash of the raw
+sheet rows they were converted from. Re-imports of unchanged sheets can
+then skip conversion entirely, including across agent restarts.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import get_snapshot_db_path
+from .sqlite_store import SQLiteStore
+
+# Bump when sheet-to-canvas conversion changes, so stored conversions are not reused
+CONVERTER_VERSION = 2
+
+
+def hash_sheet_rows(rows: List[List[Any]], title: str = "") -> str:
+    """Return a stable content hash of raw sheet rows (and the spreadsheet title)."""
+    payload = json.dumps([CONVERTER_VERSION, title, rows], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CanvasSnapshotStore(SQLiteStore):
+    """SQLite-backed store of converted canvas states per (sheet_id, sheet_name)."""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS canvas_snapshots ("
+        "sheet_id TEXT NOT NULL, "
+        "sheet_name TEXT NOT NULL, "
+        "content_hash TEXT NOT NULL, "
+        "canvas_state TEXT NOT NULL, "
+        "updated_at REAL NOT NULL, "
+        "PRIMARY KEY (sheet_id, sheet_name))",
+    )
+
+    def __init__(self, path: Optional[str] = None):
+        path = get_snapshot_db_path() if path is None else path
+        super().__init__(path)
+        # An empty path turns the store off rather than keeping it in memory
+        self.enabled = bool(path)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sheet_id: str, sheet_name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return ``(content_hash, canvas_state)`` for a tab, or None if not stored."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT content_hash, canvas_state FROM canvas_snapshots WHERE sheet_id = ? AND sheet_name = ?",
+                (sheet_id, sheet_name),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def lookup(self, sheet_id: str, sheet_name: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the stored canvas state if it was converted from rows with ``content_hash``."""
+        if not self.enabled:
+            return None
+        stored = self.get(sheet_id, sheet_name)
+        if stored is not None and stored[0] == content_hash:
+            self.hits += 1
+            return stored[1]
+        self.misses += 1
+        return None
+
+    def put(self, sheet_id: str, sheet_name: str, content_hash: str, canvas_state: Dict[str, Any]) -> None:
+        """Store the converted canvas state for a tab, replacing any previous one."""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO canvas_snapshots (sheet_id, sheet_name, content_hash, canvas_state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sheet_id, sheet_name, content_hash, json.dumps(canvas_state), time.time()),
+            )
+            conn.commit()
+
+    def invalidate(self, sheet_id: str, sheet_name: Optional[str] = None) -> None:
+        """Delete stored snapshots for one tab, or for every tab of the spreadsheet."""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            if sheet_name is None:
+                conn.execute("DELETE FROM canvas_snapshots WHERE sheet_id = ?", (sheet_id,))
+            else:
+                conn.execute(
+                    "DELETE FROM canvas_snapshots WHERE sheet_id = ? AND sheet_name = ?",
+                    (sheet_id, sheet_name),
+                )
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters."""
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses}
+
+
+_snapshot_store = CanvasSnapshotStore()
+
+
+def get_snapshot_store() -> CanvasSnapshotStore:
+    """Return the process-wide canvas snapshot store."""
+    return _snapshot_store
@@ -0,0 +1,54 @@
+"""
+SQLite Store
+
+This module holds the connection handling shared by the agent's local
+SQLite stores (canvas snapshots, sync jobs, the sync outbox): a single
+connection, opened lazily in WAL mode and guarded by a lock so the
+stores can be used from worker threads, with the store's schema created
+on first use.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+
+class SQLiteStore:
+    """
+    Base class of a store kept in one SQLite database file.
+
+    Subclasses list their ``CREATE`` statements (and any extra pragmas) in
+    ``SCHEMA`` and run their queries on ``self._connect()`` while holding
+    ``self._lock``. An empty path keeps the database in memory.
+    """
+
+    SCHEMA: Tuple[str, ...] = ()
+
+    def __init__(self, path: Optional[str]):
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def persistent(self) -> bool:
+        return self.path != ":memory:"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.persistent:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
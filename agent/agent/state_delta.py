@@ -0,0 +1,16 @@
+"""
+State Deltas
+
+This module computes RFC 6902 JSON Patch deltas between canvas states, so
+agent state updates and sheet re-imports send only what changed instead
+of the whole board.
+"""
+
+from typing import Any, Dict, List
+
+import jsonpatch
+
+
+def make_state_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the JSON Patch operations that turn ``previous`` into ``current``."""
+    return jsonpatch.make_patch(previous, current).patch
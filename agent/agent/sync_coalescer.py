@@ -0,0 +1,121 @@
+"""
+Sync Coalescer
+
+This module debounces canvas-to-sheet syncs per (sheet_id, sheet_name).
+Requests that arrive within the coalescing window collapse into a single
+write of the latest canvas state; every caller receives the result of the
+flush that covered its request, and superseded states are never written.
+"""
+
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .config import get_sync_coalesce_window
+
+SyncKey = Tuple[str, str]
+FlushFn = Callable[[str, Dict[str, Any], Optional[str], Optional[bool]], Awaitable[Dict[str, Any]]]
+
+
+class _PendingSync:
+    __slots__ = ("canvas_state", "incremental", "waiters", "task")
+
+    def __init__(self) -> None:
+        self.canvas_state: Dict[str, Any] = {}
+        self.incremental: Optional[bool] = None
+        self.waiters: List[asyncio.Future] = []
+        self.task: Optional[asyncio.Task] = None
+
+
+class SyncCoalescer:
+    """Per-sheet debouncer for canvas-to-sheet syncs.
+
+    Flushes for the same sheet never overlap: requests that arrive while a
+    flush is running are collected into the next batch.
+    """
+
+    def __init__(self, flush: FlushFn, window: Optional[float] = None):
+        self._flush = flush
+        self.window = window if window is not None else get_sync_coalesce_window()
+        self._pending: Dict[SyncKey, _PendingSync] = {}
+        self._locks: Dict[SyncKey, asyncio.Lock] = {}
+        # Flush tasks per sheet, scheduled or running; a sheet's lock is dropped with its last one
+        self._tasks: Dict[SyncKey, Set[asyncio.Task]] = {}
+        self.requests = 0
+        self.flushes = 0
+        self.superseded = 0
+
+    async def submit(
+        self,
+        sheet_id: str,
+        canvas_state: Dict[str, Any],
+        sheet_name: Optional[str] = None,
+        incremental: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Queue a sync and wait for the flush that writes it (or a newer state)."""
+        key = (sheet_id, sheet_name or "")
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = _PendingSync()
+            self._pending[key] = pending
+        elif pending.waiters:
+            self.superseded += 1
+
+        pending.canvas_state = canvas_state
+        pending.incremental = incremental
+        waiter = asyncio.get_running_loop().create_future()
+        pending.waiters.append(waiter)
+        self.requests += 1
+
+        if pending.task is None:
+            pending.task = asyncio.create_task(self._flush_after_window(key, pending))
+            self._tasks.setdefault(key, set()).add(pending.task)
+            pending.task.add_done_callback(functools.partial(self._flush_done, key))
+        return await waiter
+
+    async def aclose(self) -> None:
+        """Wait for all scheduled and running flushes to finish."""
+        tasks = [task for tasks in self._tasks.values() for task in tasks]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _flush_done(self, key: SyncKey, task: asyncio.Task) -> None:
+        tasks = self._tasks.get(key)
+        if tasks is None:
+            return
+        tasks.discard(task)
+        if not tasks:
+            del self._tasks[key]
+            self._locks.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request/flush counters and the number of pending sheets."""
+        return {
+            "requests": self.requests,
+            "flushes": self.flushes,
+            "superseded": self.superseded,
+            "pending": len(self._pending),
+        }
+
+    async def _flush_after_window(self, key: SyncKey, pending: _PendingSync) -> None:
+        if self.window:
+            await asyncio.sleep(self.window)
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Stop collecting into this batch; later requests start a new one
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+            self.flushes += 1
+            try:
+                result = await self._flush(key[0], pending.canvas_state, key[1] or None, pending.incremental)
+            except Exception as e:
+                for waiter in pending.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                return
+
+        coalesced = len(pending.waiters)
+        for waiter in pending.waiters:
+            if not waiter.done():
+                waiter.set_result({**result, "coalesced_requests": coalesced})
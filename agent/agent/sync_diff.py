@@ -0,0 +1,219 @@
+"""
+Incremental Sync Support
+
+This module keeps the last rows written to each (sheet_id, sheet_name)
+and computes row-level diffs keyed on the ``id`` column, so canvas changes
+can be written as a few targeted ranges instead of a full-sheet rewrite.
+It also owns the canvas export layout: rows written by
+sync_canvas_to_sheet carry a versioned header and decode back into the
+exact canvas items without type inference.
+"""
+
+import copy
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import CANVAS_FIELD_SPEC, DEFAULT_ITEM_DATA, get_sync_snapshot_ttl
+
+# Column layout written by sync_canvas_to_sheet; the last header cell marks the format version
+CANVAS_EXPORT_VERSION = 1
+CANVAS_EXPORT_MARKER = f"canvas-export:v{CANVAS_EXPORT_VERSION}"
+EXPORT_COLUMNS = ["id", "type", "name", "subtitle", "data"]
+SYNC_HEADERS = EXPORT_COLUMNS + [CANVAS_EXPORT_MARKER]
+
+_MARKER = re.compile(r"canvas-export:v(\d+)")
+
+
+def canvas_item_to_row(item: Dict[str, Any]) -> List[str]:
+    """Serialize one canvas item into a sheet row."""
+    return [
+        str(item.get("id", "")),
+        str(item.get("type", "")),
+        str(item.get("name", "")),
+        str(item.get("subtitle", "")),
+        json.dumps(item.get("data", {})),
+    ]
+
+
+def canvas_to_rows(items: List[Dict[str, Any]]) -> List[List[str]]:
+    """Serialize canvas items into sheet rows, header first."""
+    return [list(SYNC_HEADERS)] + [canvas_item_to_row(item) for item in items]
+
+
+def canvas_export_version(header: List[Any]) -> Optional[int]:
+    """
+    Return the export format version of a sheet's header row.
+
+    Returns 0 for the unmarked layout written before the marker existed,
+    and None when the row is not a canvas export header or comes from a
+    newer, unknown version.
+    """
+    cells = [str(cell).strip() for cell in header]
+    if [cell.lower() for cell in cells[:len(EXPORT_COLUMNS)]] != EXPORT_COLUMNS:
+        return None
+    extra = [cell for cell in cells[len(EXPORT_COLUMNS):] if cell]
+    if not extra:
+        return 0
+    match = _MARKER.fullmatch(extra[0])
+    if match is None or int(match.group(1)) > CANVAS_EXPORT_VERSION:
+        return None
+    return int(match.group(1))
+
+
+def _decode_data(item_type: str, text: str) -> Tuple[Dict[str, Any], bool]:
+    try:
+        data = json.loads(text) if text else None
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        return data, True
+    return copy.deepcopy(DEFAULT_ITEM_DATA[item_type]), False
+
+
+def decode_canvas_rows(rows: List[List[Any]], first_index: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Decode data rows of a canvas export back into canvas items.
+
+    The ``data`` column of the whole chunk is parsed in one JSON document;
+    if any cell is invalid (e.g. edited by hand), cells are parsed one by
+    one and bad ones get the type's default data. Numeric ids shortened by
+    Sheets (``0001`` entered as ``1``) are zero-padded again, and rows
+    without an id are numbered by position like heuristic imports.
+
+    Returns:
+        ``(items, repaired)``: the items and how many rows needed defaults
+    """
+    width = len(EXPORT_COLUMNS)
+    cells = []
+    for row in rows:
+        row = [cell if isinstance(cell, str) else str(cell) for cell in row[:width]]
+        if any(cell.strip() for cell in row):
+            cells.append(row + [""] * (width - len(row)))
+    texts = [row[4].strip() for row in cells]
+    try:
+        bulk = json.loads("[" + ",".join(texts) + "]") if all(texts) else None
+    except ValueError:
+        bulk = None
+    if not isinstance(bulk, list) or len(bulk) != len(texts):
+        # A cell like ``1,2`` parses as two values, shifting every later row
+        bulk = None
+
+    items: List[Dict[str, Any]] = []
+    repaired = 0
+    for i, (item_id, item_type, name, subtitle, _) in enumerate(cells):
+        item_id = item_id.strip()
+        if not item_id:
+            item_id = str(first_index + i + 1).zfill(4)
+        elif item_id.isdigit():
+            item_id = item_id.zfill(4)
+        item_type = item_type.strip()
+        data = bulk[i] if bulk is not None else None
+        if item_type not in CANVAS_FIELD_SPEC:
+            item_type, data = "note", None
+            repaired += 1
+        elif not isinstance(data, dict):
+            data, ok = _decode_data(item_type, texts[i])
+            repaired += not ok
+        if data is None:
+            data = copy.deepcopy(DEFAULT_ITEM_DATA[item_type])
+        items.append({"id": item_id, "type": item_type, "name": name, "subtitle": subtitle, "data": data})
+    return items, repaired
+
+
+def compute_row_diff(previous: List[List[str]], current: List[List[str]]) -> Optional[Dict[str, Any]]:
+    """
+    Compute a row-level diff between two synced row lists (header included).
+
+    Rows are matched on their ``id`` column. Deleted rows are removed,
+    surviving rows must keep their relative order, and new rows may only
+    be appended after them.
+
+    Returns:
+        Dictionary with ``deleted`` (0-based data-row indices into
+        ``previous``), ``updated`` (0-based data-row indices into
+        ``current``) and ``appended`` (number of trailing new rows), or
+        None when the change cannot be expressed incrementally (header
+        change, reordering, insertion in the middle or duplicate ids).
+    """
+    if not previous or not current or previous[0] != current[0]:
+        return None
+
+    previous_ids = [row[0] if row else "" for row in previous[1:]]
+    current_ids = [row[0] if row else "" for row in current[1:]]
+    if len(set(previous_ids)) != len(previous_ids) or len(set(current_ids)) != len(current_ids):
+        return None
+    if "" in previous_ids or "" in current_ids:
+        return None
+
+    current_set = set(current_ids)
+    deleted = [i for i, item_id in enumerate(previous_ids) if item_id not in current_set]
+    surviving = [item_id for item_id in previous_ids if item_id in current_set]
+    if current_ids[:len(surviving)] != surviving:
+        return None
+
+    previous_by_id = {row[0]: row for row in previous[1:]}
+    updated = [
+        i for i, item_id in enumerate(surviving)
+        if previous_by_id[item_id] != current[i + 1]
+    ]
+
+    return {
+        "deleted": deleted,
+        "updated": updated,
+        "appended": len(current_ids) - len(surviving),
+    }
+
+
+def group_runs(indices: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted indices into contiguous ``(start, end)`` runs, end exclusive."""
+    runs: List[Tuple[int, int]] = []
+    for index in indices:
+        if runs and runs[-1][1] == index:
+            runs[-1] = (runs[-1][0], index + 1)
+        else:
+            runs.append((index, index + 1))
+    return runs
+
+
+class SyncSnapshotStore:
+    """Last-synced rows per (sheet_id, sheet_name), trusted for a limited time."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else get_sync_snapshot_ttl()
+        self._snapshots: Dict[Tuple[str, str], Tuple[float, List[List[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sheet_id: str, sheet_name: str) -> Optional[List[List[str]]]:
+        """Return the last rows written to the sheet, or None if unknown or stale."""
+        with self._lock:
+            entry = self._snapshots.get((sheet_id, sheet_name))
+            if entry is None:
+                return None
+            stored_at, rows = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._snapshots[(sheet_id, sheet_name)]
+                return None
+            return rows
+
+    def set(self, sheet_id: str, sheet_name: str, rows: List[List[str]]) -> None:
+        """Record the rows that are now in the sheet."""
+        with self._lock:
+            self._snapshots[(sheet_id, sheet_name)] = (time.monotonic(), rows)
+
+    def invalidate(self, sheet_id: str, sheet_name: Optional[str] = None) -> None:
+        """Forget snapshots for one tab, or for every tab of the spreadsheet."""
+        with self._lock:
+            for key in list(self._snapshots):
+                if key[0] == sheet_id and (sheet_name is None or key[1] == sheet_name):
+                    del self._snapshots[key]
+
+
+_snapshot_store = SyncSnapshotStore()
+
+
+def get_sync_snapshot_store() -> SyncSnapshotStore:
+    """Return the process-wide last-synced snapshot store."""
+    return _snapshot_store
@@ -0,0 +1,333 @@
+"""
+Sync Jobs
+
+This module runs sheet imports and canvas-to-sheet syncs as background
+jobs. Submitting a job returns its ID at once; a bounded set of workers
+runs queued jobs, reporting progress that clients can poll or subscribe
+to, and jobs can be cancelled. Jobs are persisted in a local SQLite
+database, so queued jobs, and jobs interrupted by a restart, run again
+when the server comes back.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+from .config import (
+    get_sync_job_max_attempts,
+    get_sync_job_max_queued,
+    get_sync_job_retention,
+    get_sync_job_workers,
+    get_sync_jobs_db_path,
+)
+from .sqlite_store import SQLiteStore
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+Progress = Callable[[Dict[str, Any]], None]
+JobRunner = Callable[[Dict[str, Any], Progress], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are already queued."""
+
+
+class SyncJobStore(SQLiteStore):
+    """SQLite-backed record of sync jobs, their payloads, progress and results."""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS sync_jobs ("
+        "id TEXT PRIMARY KEY, "
+        "kind TEXT NOT NULL, "
+        "status TEXT NOT NULL, "
+        "payload TEXT NOT NULL, "
+        "progress TEXT NOT NULL, "
+        "result TEXT, "
+        "error TEXT, "
+        "attempts INTEGER NOT NULL, "
+        "created_at REAL NOT NULL, "
+        "updated_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS sync_jobs_status ON sync_jobs (status, created_at)",
+    )
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(get_sync_jobs_db_path() if path is None else path)
+
+    def create(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a new queued job and return it."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO sync_jobs (id, kind, status, payload, progress, attempts, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, '{}', 0, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now),
+            )
+            conn.commit()
+        return self.get(job_id)
+
+    def get(self, job_id: str, with_payload: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a job, or None if unknown; the payload is only included on request."""
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM sync_jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else _job_from_row(row, with_payload)
+
+    def update(self, job_id: str, **fields: Any) -> bool:
+        """
+        Set columns of an unfinished job; dict values (progress, result) are stored as JSON.
+
+        Returns False, changing nothing, if the job is unknown or already
+        finished, so a finished job's status and result are final.
+        """
+        fields["updated_at"] = time.time()
+        values = [json.dumps(v) if isinstance(v, dict) else v for v in fields.values()]
+        with self._lock:
+            conn = self._connect()
+            updated = conn.execute(
+                f"UPDATE sync_jobs SET {', '.join(f'{name} = ?' for name in fields)} "
+                f"WHERE id = ? AND status NOT IN ({', '.join('?' * len(FINISHED))})",
+                (*values, job_id, *FINISHED),
+            ).rowcount
+            conn.commit()
+        return updated == 1
+
+    def recover(self) -> List[str]:
+        """Requeue jobs left running by a previous process; return queued job IDs, oldest first."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE sync_jobs SET status = 'queued' WHERE status = 'running'")
+            conn.commit()
+            rows = conn.execute("SELECT id FROM sync_jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self, older_than: float) -> int:
+        """Delete finished jobs last updated before ``older_than`` (a timestamp)."""
+        with self._lock:
+            conn = self._connect()
+            deleted = conn.execute(
+                f"DELETE FROM sync_jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND updated_at < ?",
+                (*FINISHED, older_than),
+            ).rowcount
+            conn.commit()
+        return deleted
+
+
+def _job_from_row(row: sqlite3.Row, with_payload: bool) -> Dict[str, Any]:
+    job = {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "progress": json.loads(row["progress"]),
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "attempts": row["attempts"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+    if with_payload:
+        job["payload"] = json.loads(row["payload"])
+    return job
+
+
+class SyncJobQueue:
+    """
+    Bounded pool of asyncio workers running persisted sync jobs.
+
+    ``runners`` maps a job kind to a coroutine function called with the
+    job (payload included) and a progress callback; what it returns is
+    stored as the job's result, and what it raises fails the job.
+    """
+
+    def __init__(
+        self,
+        runners: Dict[str, JobRunner],
+        store: Optional[SyncJobStore] = None,
+        workers: Optional[int] = None,
+        max_queued: Optional[int] = None,
+    ):
+        self.runners = runners
+        self.store = store or SyncJobStore()
+        self.workers = workers or get_sync_job_workers()
+        self.max_queued = max_queued or get_sync_job_max_queued()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # None while a job is starting, before its runner task exists
+        self._running: Dict[str, Optional[asyncio.Task]] = {}
+        self._cancelled: Set[str] = set()
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._progress_writes: Dict[str, asyncio.Task] = {}
+        self._counts = {status: 0 for status in FINISHED}
+        self.resumed = 0
+
+    async def start(self) -> None:
+        """Prune old jobs, requeue unfinished ones and start the workers."""
+        self._queue = asyncio.Queue()
+        await asyncio.to_thread(self.store.prune, time.time() - get_sync_job_retention())
+        for job_id in await asyncio.to_thread(self.store.recover):
+            self._queue.put_nowait(job_id)
+            self.resumed += 1
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def aclose(self) -> None:
+        """Stop the workers; jobs they were running stay persisted and resume on the next start."""
+        tasks = self._tasks + list(self._progress_writes.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.store.close)
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Persist and enqueue a job; return it (status ``queued``).
+
+        Raises:
+            JobQueueFullError: If ``max_queued`` jobs are already waiting
+        """
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("Sync job queue is not started")
+        if self._queue.qsize() >= self.max_queued:
+            raise JobQueueFullError(f"{self._queue.qsize()} sync jobs are already queued")
+        job = await asyncio.to_thread(self.store.create, kind, payload)
+        self._queue.put_nowait(job["job_id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's status, progress and result, or None if unknown."""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job; finished jobs are returned unchanged.
+
+        A running job stops at its next await. A sheet write already sent
+        by a canvas-to-sheet sync may still complete.
+        """
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        task = self._running.get(job_id)
+        if task is None or task.cancel():
+            # A queued job is skipped by the worker that dequeues it
+            self._cancelled.add(job_id)
+            await self._finish(job_id, "cancelled")
+        return await self.get(job_id)
+
+    async def subscribe(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the job now and after every change, until it finishes."""
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(updates)
+        try:
+            job = await self.get(job_id)
+            while job is not None:
+                yield job
+                if job["status"] in FINISHED:
+                    break
+                job = await updates.get()
+        finally:
+            listeners = self._subscribers.get(job_id, [])
+            if updates in listeners:
+                listeners.remove(updates)
+            if not listeners:
+                self._subscribers.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, running jobs and finished-job counters."""
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "resumed": self.resumed,
+            "persistent": self.store.persistent,
+            **self._counts,
+        }
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error running sync job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id, with_payload=True)
+        if job is None or job["status"] != "queued" or job_id in self._cancelled:
+            self._cancelled.discard(job_id)
+            return
+        # Claim the job before the next await; until its task exists, cancel() records it as cancelled
+        self._running[job_id] = None
+        try:
+            if job["attempts"] >= get_sync_job_max_attempts():
+                await self._finish(job_id, "failed", error=f"Abandoned after {job['attempts']} interrupted attempts")
+                return
+
+            started = await asyncio.to_thread(
+                self.store.update, job_id, status="running", attempts=job["attempts"] + 1
+            )
+            if not started or job_id in self._cancelled:
+                # Cancelled while starting: cancel() has recorded it, so the runner never starts
+                return
+            await self._publish(job_id)
+
+            def progress(update: Dict[str, Any]) -> None:
+                # Runners report progress synchronously; the write happens in the background
+                job["progress"] = {**job["progress"], **update}
+                if job_id not in self._progress_writes:
+                    self._progress_writes[job_id] = asyncio.create_task(self._save_progress(job_id, job))
+
+            task = asyncio.create_task(self.runners[job["kind"]](job, progress))
+            self._running[job_id] = task
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                if job_id not in self._cancelled:
+                    # Shutting down: leave the job running so the next start resumes it
+                    task.cancel()
+                    raise
+                # cancel() has already recorded the job as cancelled
+            except Exception as e:
+                # HTTPException-style errors carry their message in ``detail``
+                await self._finish(job_id, "failed", error=str(getattr(e, "detail", None) or e) or type(e).__name__)
+            else:
+                await self._finish(job_id, "succeeded", result=result)
+        finally:
+            self._running.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    async def _save_progress(self, job_id: str, job: Dict[str, Any]) -> None:
+        # Write the latest progress until no newer update arrived meanwhile
+        try:
+            saved = None
+            while saved is not job["progress"]:
+                saved = job["progress"]
+                await asyncio.to_thread(self.store.update, job_id, progress=saved)
+                await self._publish(job_id)
+        finally:
+            self._progress_writes.pop(job_id, None)
+
+    async def _finish(self, job_id: str, status: str, **fields: Any) -> None:
+        pending = self._progress_writes.get(job_id)
+        if pending is not None:
+            await asyncio.gather(pending, return_exceptions=True)
+        if await asyncio.to_thread(self.store.update, job_id, status=status, **fields):
+            self._counts[status] += 1
+            await self._publish(job_id)
+
+    async def _publish(self, job_id: str) -> None:
+        listeners = self._subscribers.get(job_id)
+        if listeners:
+            job = await self.get(job_id)
+            for updates in listeners:
+                updates.put_nowait(job)
@@ -0,0 +1,356 @@
+"""
+Sync Outbox
+
+This module makes canvas-to-sheet syncs write-behind. Each sync request
+is appended to a local SQLite (WAL) outbox and acknowledged as soon as
+it is committed there; a background flusher then replays the outbox to
+Google Sheets per (sheet_id, sheet_name), in order. Every entry holds a
+full canvas state, so a flush writes the newest pending state of a sheet
+and marks the older ones superseded, as does a direct sync of the sheet
+that succeeds. Failed flushes stay pending and are retried with backoff,
+including after a restart.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import (
+    get_outbox_db_path,
+    get_outbox_retention,
+    get_outbox_retry_delay,
+    get_outbox_retry_max_delay,
+)
+from .instrumentation import METRICS
+from .sqlite_store import SQLiteStore
+
+SheetKey = Tuple[str, str]
+FlushFn = Callable[[str, Dict[str, Any], Optional[str], Optional[bool]], Awaitable[Dict[str, Any]]]
+
+FLUSH_LAG = METRICS.histogram("agent_sheets_outbox_lag_seconds", "Time from recording a canvas sync in the outbox to writing it to the sheet.")
+
+
+class OutboxStore(SQLiteStore):
+    """SQLite-backed, append-only log of canvas syncs keyed by idempotency key."""
+
+    SCHEMA = (
+        # WAL commits survive a process crash; only an OS crash can lose the last ones
+        "PRAGMA synchronous=NORMAL",
+        "CREATE TABLE IF NOT EXISTS outbox ("
+        "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "idempotency_key TEXT NOT NULL UNIQUE, "
+        "sheet_id TEXT NOT NULL, "
+        "sheet_name TEXT NOT NULL, "
+        "canvas_state TEXT NOT NULL, "
+        "incremental INTEGER, "
+        "status TEXT NOT NULL, "
+        "attempts INTEGER NOT NULL, "
+        "error TEXT, "
+        "message TEXT, "
+        "created_at REAL NOT NULL, "
+        "flushed_at REAL)",
+        "CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, sheet_id, sheet_name, seq)",
+    )
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(get_outbox_db_path() if path is None else path)
+
+    def append(
+        self,
+        idempotency_key: str,
+        sheet_id: str,
+        sheet_name: str,
+        canvas_state: Dict[str, Any],
+        incremental: Optional[bool],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Record a sync; return ``(entry, created)``, where an existing key is returned unchanged."""
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO outbox "
+                "(idempotency_key, sheet_id, sheet_name, canvas_state, incremental, status, attempts, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', 0, ?)",
+                (idempotency_key, sheet_id, sheet_name, json.dumps(canvas_state), incremental, time.time()),
+            )
+            conn.commit()
+            created = cursor.rowcount == 1
+        return self.get(idempotency_key), created
+
+    def get(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """Return an entry's status (without its canvas state), or None if unknown."""
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {_ENTRY_COLUMNS} FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        return None if row is None else dict(row)
+
+    def pending_sheets(self) -> List[SheetKey]:
+        """Return the sheets with pending entries, the one waiting longest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT sheet_id, sheet_name FROM outbox WHERE status = 'pending' "
+                "GROUP BY sheet_id, sheet_name ORDER BY MIN(seq)"
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def latest_pending(self, key: SheetKey) -> Optional[Dict[str, Any]]:
+        """Return the newest pending entry of a sheet, canvas state included."""
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {_ENTRY_COLUMNS}, canvas_state FROM outbox "
+                "WHERE status = 'pending' AND sheet_id = ? AND sheet_name = ? ORDER BY seq DESC LIMIT 1",
+                key,
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["canvas_state"] = json.loads(entry["canvas_state"])
+        return entry
+
+    def mark_flushed(self, key: SheetKey, seq: int, message: str) -> List[float]:
+        """Mark a sheet's pending entries up to ``seq`` written; return their creation times."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            created = [
+                row[0] for row in conn.execute(
+                    "SELECT created_at FROM outbox WHERE status = 'pending' AND sheet_id = ? AND sheet_name = ? AND seq <= ?",
+                    (*key, seq),
+                )
+            ]
+            # Older states were never written as such; drop their payloads
+            conn.execute(
+                "UPDATE outbox SET status = 'superseded', canvas_state = '{}', flushed_at = ?, error = NULL "
+                "WHERE status = 'pending' AND sheet_id = ? AND sheet_name = ? AND seq < ?",
+                (now, *key, seq),
+            )
+            conn.execute(
+                "UPDATE outbox SET status = 'flushed', flushed_at = ?, message = ?, error = NULL WHERE seq = ?",
+                (now, message, seq),
+            )
+            conn.commit()
+        return created
+
+    def supersede(self, key: SheetKey, up_to_seq: int) -> int:
+        """Mark a sheet's pending entries up to ``up_to_seq`` superseded; return how many."""
+        with self._lock:
+            conn = self._connect()
+            superseded = conn.execute(
+                "UPDATE outbox SET status = 'superseded', canvas_state = '{}', flushed_at = ?, error = NULL "
+                "WHERE status = 'pending' AND sheet_id = ? AND sheet_name = ? AND seq <= ?",
+                (time.time(), *key, up_to_seq),
+            ).rowcount
+            conn.commit()
+        return superseded
+
+    def mark_failed(self, seq: int, error: str) -> None:
+        """Record a failed flush attempt; the entry stays pending."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE outbox SET attempts = attempts + 1, error = ? WHERE seq = ?", (error, seq))
+            conn.commit()
+
+    def counts(self) -> Tuple[Dict[str, int], Optional[float]]:
+        """Return entry counts per status and when the oldest pending entry was recorded."""
+        with self._lock:
+            conn = self._connect()
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            oldest = conn.execute("SELECT MIN(created_at) FROM outbox WHERE status = 'pending'").fetchone()[0]
+        return counts, oldest
+
+    def last_seq(self) -> int:
+        """Return the sequence number of the newest entry, or 0 if there is none."""
+        with self._lock:
+            return self._connect().execute("SELECT COALESCE(MAX(seq), 0) FROM outbox").fetchone()[0]
+
+    def prune(self, older_than: float) -> int:
+        """Delete written and superseded entries flushed before ``older_than`` (a timestamp)."""
+        with self._lock:
+            conn = self._connect()
+            deleted = conn.execute(
+                "DELETE FROM outbox WHERE status != 'pending' AND flushed_at < ?", (older_than,)
+            ).rowcount
+            conn.commit()
+        return deleted
+
+
+_ENTRY_COLUMNS = (
+    "seq, idempotency_key, sheet_id, sheet_name, incremental, status, attempts, error, message, created_at, flushed_at"
+)
+
+
+class SheetsOutbox:
+    """
+    Write-behind front of canvas-to-sheet syncs.
+
+    ``flush`` writes one canvas state to a sheet and returns the usual
+    ``success``/``error`` result dict. Sheets are flushed concurrently,
+    but at most one flush per sheet runs at a time.
+    """
+
+    def __init__(
+        self,
+        flush: FlushFn,
+        store: Optional[OutboxStore] = None,
+        retry_delay: Optional[float] = None,
+        retry_max_delay: Optional[float] = None,
+    ):
+        self._flush = flush
+        self.store = store or OutboxStore()
+        self.retry_delay = retry_delay if retry_delay is not None else get_outbox_retry_delay()
+        self.retry_max_delay = retry_max_delay if retry_max_delay is not None else get_outbox_retry_max_delay()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Dict[SheetKey, asyncio.Task] = {}
+        self._retry_at: Dict[SheetKey, Tuple[int, float]] = {}
+        self.recorded = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.failures = 0
+        self.superseded = 0
+        # Newest entry recorded so far; entries are numbered in the order they are recorded
+        self.last_seq = 0
+        # Store counts as of the flusher's last pass, so stats() never queries SQLite on the event loop
+        self._entries: Dict[str, int] = {}
+        self._oldest_pending_at: Optional[float] = None
+
+    async def start(self) -> None:
+        """Prune old entries and start flushing, beginning with entries left by a previous run."""
+        await asyncio.to_thread(self.store.prune, time.time() - get_outbox_retention())
+        self.last_seq = max(self.last_seq, await asyncio.to_thread(self.store.last_seq))
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Stop flushing; pending entries stay in the outbox for the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._flushing.values()):
+            task.cancel()
+        await asyncio.gather(*self._flushing.values(), return_exceptions=True)
+        self.store.close()
+
+    async def enqueue(
+        self,
+        sheet_id: str,
+        canvas_state: Dict[str, Any],
+        sheet_name: Optional[str] = None,
+        incremental: Optional[bool] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Durably record a sync and schedule its flush; return the outbox entry.
+
+        Retrying with the same ``idempotency_key`` returns the original
+        entry (with ``duplicate`` set) instead of recording the sync again.
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        entry, created = await asyncio.to_thread(
+            self.store.append, key, sheet_id, sheet_name or "", canvas_state, incremental
+        )
+        if created:
+            self.recorded += 1
+            self.last_seq = max(self.last_seq, entry["seq"])
+            if self._wakeup is not None:
+                self._wakeup.set()
+        else:
+            self.duplicates += 1
+        return {**entry, "duplicate": not created}
+
+    async def supersede(self, sheet_id: str, sheet_name: Optional[str], up_to_seq: int) -> int:
+        """
+        Drop a sheet's pending entries numbered up to ``up_to_seq``.
+
+        Called once a canvas state newer than those entries has been
+        written to the sheet some other way (``up_to_seq`` being
+        ``last_seq`` when that sync started), so the outbox does not later
+        overwrite it with an older state.
+        """
+        key = (sheet_id, sheet_name or "")
+        superseded = await asyncio.to_thread(self.store.supersede, key, up_to_seq)
+        if superseded:
+            self.superseded += superseded
+            if key not in self._flushing:
+                # Any newer entries are flushed on the next pass instead of waiting out a retry delay
+                self._retry_at.pop(key, None)
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return superseded
+
+    def get(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """Return an outbox entry's status, or None if unknown (or pruned)."""
+        return self.store.get(idempotency_key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return outbox counters, entries per status and the flush backlog."""
+        return {
+            "persistent": self.store.persistent,
+            "recorded": self.recorded,
+            "duplicates": self.duplicates,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "superseded": self.superseded,
+            "flushing": len(self._flushing),
+            "retrying": len(self._retry_at),
+            "entries": dict(self._entries),
+            "oldest_pending_seconds": (
+                round(time.time() - self._oldest_pending_at, 3) if self._oldest_pending_at else 0.0
+            ),
+        }
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self._entries, self._oldest_pending_at = await asyncio.to_thread(self.store.counts)
+            now = time.monotonic()
+            for key in await asyncio.to_thread(self.store.pending_sheets):
+                retry = self._retry_at.get(key)
+                if key in self._flushing or (retry is not None and retry[1] > now):
+                    continue
+                self._flushing[key] = asyncio.create_task(self._flush_sheet(key))
+            if self._retry_at and not self._wakeup.is_set():
+                # Sleep until the earliest retry is due, or until new work arrives
+                delay = max(0.0, min(at for _, at in self._retry_at.values()) - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    self._wakeup.set()
+
+    async def _flush_sheet(self, key: SheetKey) -> None:
+        try:
+            entry = await asyncio.to_thread(self.store.latest_pending, key)
+            if entry is None:
+                return
+            incremental = None if entry["incremental"] is None else bool(entry["incremental"])
+            try:
+                result = await self._flush(key[0], entry["canvas_state"], key[1] or None, incremental)
+                error = None if result.get("success") else result.get("error", "Failed to sync canvas to sheets")
+            except Exception as e:
+                result, error = {}, str(e) or type(e).__name__
+
+            if error is None:
+                created = await asyncio.to_thread(self.store.mark_flushed, key, entry["seq"], result.get("message", ""))
+                now = time.time()
+                for created_at in created:
+                    FLUSH_LAG.observe(now - created_at)
+                self.flushes += 1
+                self._retry_at.pop(key, None)
+            else:
+                print(f"[OUTBOX] Flush of {key[0]} failed, will retry: {error}")
+                await asyncio.to_thread(self.store.mark_failed, entry["seq"], error)
+                self.failures += 1
+                failures = self._retry_at.get(key, (0, 0.0))[0] + 1
+                delay = min(self.retry_max_delay, self.retry_delay * (2 ** (failures - 1)))
+                self._retry_at[key] = (failures, time.monotonic() + delay)
+        finally:
+            self._flushing.pop(key, None)
+            if self._wakeup is not None:
+                # Entries recorded during the flush are picked up on the next pass
+                self._wakeup.set()
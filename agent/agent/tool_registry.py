@@ -0,0 +1,186 @@
+"""
+Composio Tool Registry
+
+This module caches the resolved Composio tool schemas for
+``COMPOSIO_TOOL_IDS`` in a JSON file, keyed by a hash of the requested
+tool IDs and the Composio SDK version. Process start and scale-out reuse
+the cached schemas instead of fetching them remotely, stale entries are
+refreshed in the background, and a Composio outage falls back to the last
+known schemas instead of leaving the agent without backend tools.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import get_tool_cache_path, get_tool_cache_ttl
+
+CACHE_FORMAT_VERSION = 1
+
+
+def registry_key(tool_ids: List[str]) -> str:
+    """Return the cache key for a set of tool IDs under the installed SDK version."""
+    try:
+        from composio import __version__ as sdk_version  # type: ignore
+    except Exception:
+        sdk_version = "unknown"
+    payload = json.dumps({"sdk": sdk_version, "tools": sorted(tool_ids)}, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolSchemaRegistry:
+    """Disk-backed cache of Composio tool schemas with background refresh."""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None):
+        self.path = get_tool_cache_path() if path is None else path
+        self.ttl = ttl if ttl is not None else get_tool_cache_ttl()
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.source: Optional[str] = None
+        self.hits = 0
+        self.fetches = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def get_schemas(self, tool_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Return raw tool schemas for ``tool_ids``.
+
+        Uses the disk cache when its key matches, fetching from Composio
+        otherwise. If the fetch fails, falls back to whatever schemas for
+        these tools the cache still holds.
+        """
+        key = registry_key(tool_ids)
+        entry = self._read()
+
+        if entry is not None and entry.get("key") == key:
+            self.hits += 1
+            self.source = "cache"
+            if time.time() - entry.get("fetched_at", 0) > self.ttl:
+                self._refresh_in_background(tool_ids)
+            return self._select(entry, tool_ids)
+
+        try:
+            schemas = self._fetch(tool_ids)
+            self.fetches += 1
+            self.source = "remote"
+            self._write(key, schemas)
+            return schemas
+        except Exception as e:
+            self.failures += 1
+            fallback = self._select(entry, tool_ids) if entry is not None else []
+            print(f"Failed to fetch Composio tool schemas: {e}; using {len(fallback)} cached schemas")
+            self.source = "stale" if fallback else None
+            return fallback
+
+    def load_tools(self, tool_ids: List[str], user_id: str) -> List[Any]:
+        """
+        Return LlamaIndex tools for ``tool_ids``, built from cached or fetched schemas.
+
+        Tools are built by the SDK's public ``tools.get`` (schema processing,
+        schema registration for execution and provider wrapping all follow
+        the SDK version pinned in uv.lock); only its remote schema lookup is
+        answered from the registry.
+        """
+        schemas = self.get_schemas(tool_ids)
+        if not schemas:
+            return []
+
+        from composio import Composio  # type: ignore
+        from composio.types import Tool  # type: ignore
+        from composio_llamaindex import LlamaIndexProvider  # type: ignore
+
+        composio = Composio(provider=LlamaIndexProvider())
+        cached = [Tool.model_validate(copy.deepcopy(schema)) for schema in schemas]
+
+        def cached_raw_tools(tools: Optional[List[str]] = None, **_: Any) -> List[Any]:
+            return [tool for tool in cached if tools is None or tool.slug in tools]
+
+        composio.tools.get_raw_composio_tools = cached_raw_tools
+        return list(composio.tools.get(user_id=user_id, tools=[tool.slug for tool in cached]))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache hit, fetch, refresh and failure counters."""
+        return {
+            "enabled": bool(self.path),
+            "source": self.source,
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+    def _fetch(self, tool_ids: List[str]) -> List[Dict[str, Any]]:
+        from composio import Composio  # type: ignore
+
+        tools = Composio().tools.get_raw_composio_tools(tools=tool_ids)
+        return [tool.model_dump(mode="json") for tool in tools]
+
+    def _refresh_in_background(self, tool_ids: List[str]) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh() -> None:
+            try:
+                schemas = self._fetch(tool_ids)
+                self._write(registry_key(tool_ids), schemas)
+                self.refreshes += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"Background refresh of Composio tool schemas failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, name="tool-registry-refresh", daemon=True).start()
+
+    @staticmethod
+    def _select(entry: Dict[str, Any], tool_ids: List[str]) -> List[Dict[str, Any]]:
+        schemas = entry.get("tools", {})
+        return [schemas[slug] for slug in tool_ids if slug in schemas]
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable tool schema cache {self.path}: {e}")
+            return None
+        if entry.get("format") != CACHE_FORMAT_VERSION:
+            return None
+        return entry
+
+    def _write(self, key: str, schemas: List[Dict[str, Any]]) -> None:
+        if not self.path:
+            return
+        entry = {
+            "format": CACHE_FORMAT_VERSION,
+            "key": key,
+            "fetched_at": time.time(),
+            "tools": {schema["slug"]: schema for schema in schemas},
+        }
+        # Write-then-rename so concurrent workers never read a partial file
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to write tool schema cache {self.path}: {e}")
+
+
+_registry = ToolSchemaRegistry()
+
+
+def get_tool_registry() -> ToolSchemaRegistry:
+    """Return the process-wide Composio tool schema registry."""
+    return _registry
@@ -0,0 +1,120 @@
+"""
+Agent Workflow
+
+This module extends the AG-UI chat workflow for the canvas:
+
+- State changes made by tools reach the UI as RFC 6902 state deltas. The
+  stock workflow sends a full state snapshot after every tool call; the
+  run's event stream passes the initial snapshot on and turns later ones
+  into deltas, dropping those of tools that did not touch the state.
+- The canvas state is rendered into the prompt with the compact context
+  encoder instead of the repr of the nested state dict.
+- The system prompt is always the first message, ahead of any system text
+  sent by the client, so tool schemas plus the system prompt form a stable
+  prefix that provider-side prompt caching can reuse.
+"""
+
+import copy
+import functools
+import json
+from typing import Any, AsyncIterator, Callable, List, Optional, Union
+
+from ag_ui.core import SystemMessage
+from llama_index.core.workflow import Context, Event, StopEvent, step
+from llama_index.core.workflow.handler import WorkflowHandler
+from llama_index.protocols.ag_ui.agent import AGUIChatWorkflow, InputEvent, LoopEvent, ToolCallEvent
+from llama_index.protocols.ag_ui.events import StateDeltaWorkflowEvent, StateSnapshotWorkflowEvent
+
+from .config import get_context_format
+from .context_encoder import encode_canvas_state
+from .prompt_cache import SYSTEM_MESSAGE_ID
+from .state_delta import make_state_delta
+
+
+class CanvasContextState(dict):
+    """Canvas state that renders with the compact encoder when formatted into the prompt."""
+
+    def __init__(self, state: dict, focus_text: str = ""):
+        super().__init__(state)
+        self.focus_text = focus_text
+
+    def __str__(self) -> str:
+        if get_context_format() == "json":
+            return json.dumps(self, ensure_ascii=False, separators=(",", ":"))
+        return encode_canvas_state(self, focus_text=self.focus_text)
+
+
+def _latest_user_text(messages: List[Any]) -> str:
+    for message in reversed(messages or []):
+        if getattr(message, "role", None) != "user":
+            continue
+        content = getattr(message, "content", "")
+        if isinstance(content, str):
+            return content
+        return " ".join(getattr(part, "text", "") or "" for part in content or [])
+    return ""
+
+
+def _with_static_system_prompt(messages: List[Any], system_prompt: str) -> List[Any]:
+    """Put the system prompt first and drop copies of it echoed back by the client."""
+    rest = []
+    for message in messages or []:
+        if getattr(message, "id", None) == SYSTEM_MESSAGE_ID:
+            continue
+        content = getattr(message, "content", None)
+        if getattr(message, "role", None) in ("system", "developer") and isinstance(content, str) and system_prompt in content:
+            content = content.replace(system_prompt, "").strip()
+            if not content:
+                continue
+            message = message.model_copy(update={"content": content})
+        rest.append(message)
+    return [SystemMessage(id=SYSTEM_MESSAGE_ID, role="system", content=system_prompt), *rest]
+
+
+async def _with_state_deltas(stream_events: Callable[..., AsyncIterator[Event]], *args: Any, **kwargs: Any) -> AsyncIterator[Event]:
+    """
+    Stream a run's events with state snapshots after the first turned into
+    deltas against the last state sent, and dropped when nothing changed.
+    """
+    emitted: Optional[dict] = None
+    async for ev in stream_events(*args, **kwargs):
+        if isinstance(ev, StateSnapshotWorkflowEvent):
+            previous, emitted = emitted, copy.deepcopy(ev.snapshot)
+            if previous is not None:
+                delta = make_state_delta(previous, emitted)
+                if not delta:
+                    continue
+                ev = StateDeltaWorkflowEvent(delta=delta)
+        yield ev
+
+
+class CanvasChatWorkflow(AGUIChatWorkflow):
+    """AG-UI chat workflow with compact state context and state deltas."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Placed by chat() itself; the stock workflow appends it after client system text
+        self.static_system_prompt = self.system_prompt
+        self.system_prompt = None
+
+    def run(self, *args: Any, **kwargs: Any) -> WorkflowHandler:
+        handler = super().run(*args, **kwargs)
+        # The stock steps send a full snapshot after every tool call; the UI gets them as deltas
+        handler.stream_events = functools.partial(_with_state_deltas, handler.stream_events)
+        return handler
+
+    @step
+    async def chat(
+        self, ctx: Context, ev: Union[InputEvent, LoopEvent]
+    ) -> Optional[Union[StopEvent, ToolCallEvent]]:
+        if isinstance(ev, InputEvent):
+            if self.static_system_prompt:
+                ev.input_data.messages = _with_static_system_prompt(ev.input_data.messages, self.static_system_prompt)
+            state = ev.input_data.state
+            if isinstance(state, str):
+                state = json.loads(state)
+            if isinstance(state, dict):
+                # Items the user mentions are always rendered in full
+                focus_text = _latest_user_text(ev.input_data.messages)
+                ev.input_data.state = CanvasContextState(state, focus_text=focus_text)
+        return await super().chat(ctx, ev)
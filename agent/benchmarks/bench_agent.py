@@ -0,0 +1,234 @@
+"""
+Agent End-to-End Benchmark
+
+Drives the FastAPI server's AG-UI ``/run`` endpoint in-process with the
+offline stand-ins (scripted LLM from ``fakes.py``, local sheets backend), so
+it needs no network or API keys. Reports, per scenario, time to the first
+streamed byte and to the end of the run; the per-call overhead of backend
+tool dispatch; and throughput and latency under concurrent sessions.
+
+Usage (from the ``agent/`` directory):
+
+    python benchmarks/bench_agent.py [--runs 20] [--concurrency 1,8,32]
+        [--ttft-ms 0] [--chunk-ms 0] [--sheets-ms 0] [--sheet-rows 200]
+        [--max-dispatch-ms 50]
+
+With zero simulated latencies the numbers are the agent's own overhead.
+With ``--max-dispatch-ms`` the script exits non-zero when the median tool
+dispatch overhead exceeds the threshold, so it can guard against regressions.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List
+
+AGENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(AGENT_DIR))
+
+# Offline and side-effect free: no Composio tools, no on-disk caches, build the agent at startup
+os.environ.update(
+    COMPOSIO_TOOL_IDS="",
+    COMPOSIO_TOOL_CACHE="",
+    CANVAS_SNAPSHOT_DB="",
+    SYNC_JOBS_DB="",
+    SHEETS_OUTBOX_DB="",
+    AGENT_STARTUP_MODE="eager",
+    SHEETS_RATE_LIMIT="0",
+)
+
+from fakes import MockLLM, sample_sheet  # noqa: E402
+
+TOOL_TURNS = 3
+SHEET_ID = "bench-sheet"
+
+SCENARIOS: Dict[str, List[Any]] = {
+    "chat": ["The canvas has no items yet. Ask me to create a project, entity, note or chart."],
+    "tools": [
+        [("apply_canvas_operations", {"operations": [{"op": "create", "type": "note", "name": f"Note {i}"}]})]
+        for i in range(TOOL_TURNS)
+    ] + ["Created three notes."],
+    "import": [[("import_sheet_to_canvas", {"sheet_id": SHEET_ID})], "Imported the sheet."],
+    "frontend": [[("createItem", {"type": "note", "name": "From the UI"})]],
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_body(scenario: str) -> bytes:
+    return json.dumps({
+        "threadId": str(uuid.uuid4()),
+        "runId": str(uuid.uuid4()),
+        "state": {},
+        "messages": [{"id": str(uuid.uuid4()), "role": "user", "content": f"#{scenario} please"}],
+        "tools": [],
+        "context": [],
+        "forwardedProps": {},
+    }).encode()
+
+
+async def post_run(app: Any, body: bytes) -> Dict[str, Any]:
+    """POST to ``/run`` through the raw ASGI interface, timing the first and last body bytes."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/run",
+        "raw_path": b"/run",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"accept", b"text/event-stream")],
+        "client": ("bench", 0),
+        "server": ("bench", 80),
+    }
+    sent = False
+    finished = asyncio.Event()
+    chunks: List[bytes] = []
+    result: Dict[str, Any] = {"status": None, "first_byte": None}
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            if message.get("body"):
+                if result["first_byte"] is None:
+                    result["first_byte"] = time.perf_counter() - start
+                chunks.append(message["body"])
+            if not message.get("more_body"):
+                finished.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    result["total"] = time.perf_counter() - start
+    finished.set()
+
+    text = b"".join(chunks).decode()
+    events = [json.loads(line[5:]) for line in text.splitlines() if line.startswith("data:")]
+    types = [e.get("type") for e in events]
+    result["events"] = len(events)
+    result["bytes"] = len(text)
+    result["ok"] = result["status"] == 200 and "RUN_FINISHED" in types and "RUN_ERROR" not in types
+    return result
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    totals = [s["total"] * 1000 for s in samples]
+    first = [s["first_byte"] * 1000 for s in samples if s["first_byte"] is not None]
+    return {
+        "runs": len(samples),
+        "failed": sum(not s["ok"] for s in samples),
+        "first_byte_p50_ms": round(statistics.median(first), 2) if first else None,
+        "total_p50_ms": round(statistics.median(totals), 2),
+        "total_p95_ms": round(percentile(totals, 95), 2),
+        "events": samples[-1]["events"],
+        "bytes": samples[-1]["bytes"],
+    }
+
+
+async def bench_scenarios(app: Any, runs: int) -> Dict[str, Any]:
+    results = {}
+    for scenario in SCENARIOS:
+        await post_run(app, run_body(scenario))  # warm-up
+        results[scenario] = summarize([await post_run(app, run_body(scenario)) for _ in range(runs)])
+    return results
+
+
+async def bench_throughput(app: Any, concurrency: int, runs_per_session: int) -> Dict[str, Any]:
+    async def session() -> List[Dict[str, Any]]:
+        return [await post_run(app, run_body("tools" if i % 2 else "chat")) for i in range(runs_per_session)]
+
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*(session() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    samples = [s for runs in sessions for s in runs]
+    totals = [s["total"] * 1000 for s in samples]
+    return {
+        "concurrency": concurrency,
+        "runs": len(samples),
+        "failed": sum(not s["ok"] for s in samples),
+        "runs_per_s": round(len(samples) / elapsed, 1),
+        "latency_p50_ms": round(statistics.median(totals), 2),
+        "latency_p95_ms": round(percentile(totals, 95), 2),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from agent import server
+    from agent.agent import create_agent
+    from agent.sheets_backend import LocalSheetsBackend, set_sheets_backend
+    from agent.sheets_singleflight import get_sheets_singleflight
+    from agent.prompt_cache import get_prompt_cache_stats
+
+    sheets = LocalSheetsBackend(":memory:", latency_seconds=args.sheets_ms / 1000, rate_limit=0)
+    sheets.put_sheet(SHEET_ID, "Sheet1", sample_sheet(args.sheet_rows), title="Benchmark")
+    set_sheets_backend(sheets)
+    llm = MockLLM(SCENARIOS, ttft_seconds=args.ttft_ms / 1000, chunk_seconds=args.chunk_ms / 1000)
+    server.agent_runtime.router_factory = lambda: create_agent(llm=llm)
+
+    summary: Dict[str, Any] = {}
+    async with server.app.router.lifespan_context(server.app):
+        if server.agent_runtime.status != "ready":
+            raise RuntimeError(f"Agent failed to initialize: {server.agent_runtime.error}")
+        summary["scenarios"] = await bench_scenarios(server.app, args.runs)
+        base = summary["scenarios"]["chat"]["total_p50_ms"]
+        tools = summary["scenarios"]["tools"]["total_p50_ms"]
+        # Each tool turn adds a dispatch plus one more LLM request; a tool-call reply
+        # streams no text chunks, so only its time to first token is simulated latency
+        summary["tool_dispatch_overhead_ms"] = round(
+            (tools - base) / TOOL_TURNS - args.ttft_ms, 2
+        )
+        summary["throughput"] = [
+            await bench_throughput(server.app, c, args.runs_per_session) for c in args.concurrency
+        ]
+    summary["prompt_cache"] = {k: v for k, v in get_prompt_cache_stats().items() if k != "last_turn"}
+    summary["sheets_calls"] = sum(sheets.stats()["calls"].values())
+    summary["sheets_calls_saved"] = get_sheets_singleflight().stats()["saved_total"]
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per scenario")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32])
+    parser.add_argument("--runs-per-session", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=0.0, help="simulated LLM time to first token")
+    parser.add_argument("--chunk-ms", type=float, default=0.0, help="simulated delay between streamed chunks")
+    parser.add_argument("--sheets-ms", type=float, default=0.0, help="simulated Google Sheets call latency")
+    parser.add_argument("--sheet-rows", type=int, default=200)
+    parser.add_argument("--max-dispatch-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    print(json.dumps(summary, indent=2))
+
+    failed = sum(s["failed"] for s in summary["scenarios"].values()) + sum(t["failed"] for t in summary["throughput"])
+    if failed:
+        print(f"{failed} runs did not finish cleanly")
+        return 1
+    if args.max_dispatch_ms is not None and summary["tool_dispatch_overhead_ms"] > args.max_dispatch_ms:
+        print(f"Tool dispatch overhead {summary['tool_dispatch_overhead_ms']}ms exceeds {args.max_dispatch_ms}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Cold Start Benchmark
+
+Measures, in fresh interpreter processes, how long it takes to import the
+agent server and to bring the FastAPI app up to the point where the health
+check answers, plus how long the background agent build takes to become
+ready. Reports the median over several runs.
+
+Usage (from the ``agent/`` directory):
+
+    python benchmarks/bench_cold_start.py [--runs 5] [--max-import-seconds 1.5]
+
+With ``--max-import-seconds`` the script exits non-zero when the median
+import time exceeds the threshold, so it can guard against regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+AGENT_DIR = Path(__file__).resolve().parents[1]
+
+# Runs in a child process so every measurement starts from a cold interpreter
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import agent.server
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(agent.server.app) as client:
+    client.get("/health").raise_for_status()
+    healthy = time.perf_counter()
+    ready = None
+    if "--wait-ready" in sys.argv:
+        while client.get("/ready").status_code != 200:
+            if agent.server.agent_runtime.status == "failed":
+                break
+            time.sleep(0.05)
+        ready = time.perf_counter() - start
+print(json.dumps({
+    "import": imported - start,
+    "health": healthy - start,
+    "ready": ready,
+}))
+"""
+
+
+def run_probe(mode: str, wait_ready: bool) -> dict:
+    env = dict(os.environ, AGENT_STARTUP_MODE=mode, CANVAS_SNAPSHOT_DB="")
+    args = [sys.executable, "-c", _PROBE] + (["--wait-ready"] if wait_ready else [])
+    output = subprocess.run(args, cwd=AGENT_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", default="background", choices=["eager", "background", "on_demand"])
+    parser.add_argument("--wait-ready", action="store_true", help="also time until /ready returns 200")
+    parser.add_argument("--max-import-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    results = [run_probe(args.mode, args.wait_ready) for _ in range(args.runs)]
+    summary = {"mode": args.mode, "runs": args.runs}
+    for key in ("import", "health", "ready"):
+        values = [r[key] for r in results if r[key] is not None]
+        if values:
+            summary[f"{key}_median_s"] = round(statistics.median(values), 3)
+            summary[f"{key}_max_s"] = round(max(values), 3)
+    print(json.dumps(summary, indent=2))
+
+    if args.max_import_seconds is not None and summary["import_median_s"] > args.max_import_seconds:
+        print(f"Median import time {summary['import_median_s']}s exceeds {args.max_import_seconds}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+Sheets Throughput Benchmark
+
+Measures sheet import and canvas-to-sheet export throughput against the
+local sheets backend (SQLite stand-in for Google Sheets), so sync
+regressions can be tracked without a Google account. For each sheet
+size it times:
+
+- import: reading the tab through ``get_sheet_data`` plus converting the
+  rows to canvas items
+- export_full: rewriting a fresh tab from the canvas state
+- export_incremental: syncing again after editing and deleting 1% of
+  the items each
+- reimport: importing the exported tab again (canvas-export fast path)
+
+and checks that the tab read back, and the items re-imported from it,
+match the exported canvas.
+
+Usage (from the ``agent/`` directory):
+
+    python benchmarks/bench_sheets.py [--sizes 1000,10000,100000]
+        [--latency-ms 0] [--rate-limit 0] [--min-rows-per-s 5000]
+
+``--latency-ms`` and ``--rate-limit`` (requests per minute) are applied to
+every backend call; set ``SHEETS_RATE_LIMIT`` to also pace calls with the
+sheets scheduler (off by default here). With ``--min-rows-per-s`` the script exits non-zero
+when any import or full export is slower than that.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+AGENT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(AGENT_DIR))
+
+# No on-disk snapshot caches, so every import converts and every export writes;
+# quota is simulated by the backend, so the scheduler does not throttle unless asked to
+os.environ.update(CANVAS_SNAPSHOT_DB="", SHEETS_BACKEND="local")
+os.environ.setdefault("SHEETS_RATE_LIMIT", "0")
+
+from fakes import sample_sheet  # noqa: E402
+
+from agent.sheets_backend import LocalSheetsBackend, set_sheets_backend, user_entered_value  # noqa: E402
+from agent.sheets_cache import get_metadata_cache  # noqa: E402
+from agent.sheets_integration import (  # noqa: E402
+    convert_sheet_to_canvas_items,
+    get_sheet_data,
+    sync_canvas_to_sheet,
+)
+from agent.sync_diff import canvas_to_rows  # noqa: E402
+
+
+def timed(fn, *args: Any, **kwargs: Any):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _trimmed(rows):
+    """Rows as Google returns them: converted strings, without trailing empty cells."""
+    out = []
+    for row in rows:
+        cells = [user_entered_value(c) for c in row]
+        while cells and cells[-1] == "":
+            cells.pop()
+        out.append(cells)
+    return out
+
+
+def bench_size(backend: LocalSheetsBackend, rows: int) -> Dict[str, Any]:
+    source_id, target_id = f"import-{rows}", f"export-{rows}"
+    backend.put_sheet(source_id, "Sheet1", sample_sheet(rows), title=f"Bench {rows}")
+    backend.put_sheet(target_id, "Sheet1", [], title=f"Bench {rows} export")
+    get_metadata_cache().invalidate()
+
+    sheet_data, read_s = timed(get_sheet_data, source_id)
+    if sheet_data is None:
+        raise RuntimeError(f"Import of {source_id} failed")
+    canvas, convert_s = timed(convert_sheet_to_canvas_items, sheet_data, source_id)
+    items = canvas["items"]
+
+    full, full_s = timed(sync_canvas_to_sheet, target_id, canvas, "Sheet1", incremental=False)
+    if not full.get("success"):
+        raise RuntimeError(f"Full export failed: {full}")
+
+    for item in items[::100]:
+        item["name"] = f"{item['name']} (edited)"
+    del items[50::100]
+    incremental, incremental_s = timed(sync_canvas_to_sheet, target_id, canvas, "Sheet1", incremental=True)
+    if not incremental.get("success"):
+        raise RuntimeError(f"Incremental export failed: {incremental}")
+
+    matches = _trimmed(backend.read_sheet(target_id, "Sheet1")) == _trimmed(canvas_to_rows(items))
+
+    exported, reread_s = timed(get_sheet_data, target_id)
+    reimported, reconvert_s = timed(convert_sheet_to_canvas_items, exported, target_id)
+    matches = matches and reimported["items"] == items
+
+    import_s = read_s + convert_s
+    return {
+        "rows": rows,
+        "import_s": round(import_s, 3),
+        "import_read_s": round(read_s, 3),
+        "import_convert_s": round(convert_s, 3),
+        "import_rows_per_s": round(rows / import_s),
+        "export_full_s": round(full_s, 3),
+        "export_full_rows_per_s": round(rows / full_s),
+        "export_incremental_s": round(incremental_s, 3),
+        "reimport_s": round(reread_s + reconvert_s, 3),
+        "reimport_convert_s": round(reconvert_s, 3),
+        "roundtrip_matches": matches,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=[1000, 10000, 100000])
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="backend requests per minute (0 = unlimited)")
+    parser.add_argument("--db", default=":memory:", help="SQLite path of the local sheets backend")
+    parser.add_argument("--min-rows-per-s", type=float, default=None)
+    args = parser.parse_args()
+
+    backend = LocalSheetsBackend(args.db, latency_seconds=args.latency_ms / 1000, rate_limit=args.rate_limit)
+    set_sheets_backend(backend)
+    results = [bench_size(backend, rows) for rows in args.sizes]
+    print(json.dumps({"results": results, "backend": backend.stats()}, indent=2))
+
+    if not all(r["roundtrip_matches"] for r in results):
+        print("Exported tab does not match the canvas")
+        return 1
+    if args.min_rows_per_s is not None:
+        slow = [r["rows"] for r in results if min(r["import_rows_per_s"], r["export_full_rows_per_s"]) < args.min_rows_per_s]
+        if slow:
+            print(f"Throughput below {args.min_rows_per_s} rows/s for sizes {slow}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
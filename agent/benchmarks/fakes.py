@@ -0,0 +1,149 @@
+"""
+Offline Stand-ins
+
+Deterministic replacements for OpenAI and Google Sheets data so the agent
+can be benchmarked without network access:
+
+- ``MockLLM`` replays scripted scenarios (tool calls, then a text reply)
+  through the regular OpenAI code path, with configurable time to first
+  token and per-chunk latency. It reports usage with a simulated provider
+  prompt cache (cached tokens = shared prefix with earlier requests).
+- ``sample_sheet`` builds project-style rows to seed the local sheets
+  backend (``agent.sheets_backend.LocalSheetsBackend``).
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, MessageRole
+from llama_index.llms.openai import OpenAI
+from llama_index.llms.openai.utils import to_openai_message_dicts
+from openai.types.chat import ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+# Roughly four characters per token, and providers cache in 128-token blocks
+CHARS_PER_TOKEN = 4
+CACHE_BLOCK_TOKENS = 128
+CACHE_MIN_TOKENS = 1024
+
+
+class MockLLM(OpenAI):
+    """
+    Scripted stand-in for the OpenAI chat model.
+
+    Each scenario lists the assistant turns of one run; an entry is either
+    a text reply or a list of ``(tool_name, kwargs)`` calls. A run replays
+    the scenario whose ``#name`` appears in the latest user message (else
+    ``default``), at the turn given by how many assistant messages follow
+    that message, so concurrent sessions replay independently.
+    """
+
+    def __init__(
+        self,
+        scenarios: Dict[str, Sequence[Any]],
+        default: Optional[str] = None,
+        ttft_seconds: float = 0.0,
+        chunk_seconds: float = 0.0,
+        chunk_chars: int = 16,
+        **kwargs: Any,
+    ):
+        super().__init__(model="gpt-4.1", api_key="sk-offline", **kwargs)
+        object.__setattr__(self, "_scenarios", {name: list(turns) for name, turns in scenarios.items()})
+        object.__setattr__(self, "_default", default or next(iter(scenarios)))
+        object.__setattr__(self, "_timing", (ttft_seconds, chunk_seconds, max(1, chunk_chars)))
+        object.__setattr__(self, "_prompts", [])
+        object.__setattr__(self, "_prompts_lock", threading.Lock())
+
+    def _turn(self, messages: Sequence[ChatMessage]) -> Any:
+        replies = 0
+        text = ""
+        for message in reversed(messages):
+            if message.role == MessageRole.USER:
+                text = message.content or ""
+                break
+            if message.role == MessageRole.ASSISTANT:
+                replies += 1
+        name = next((n for n in self._scenarios if f"#{n}" in text), self._default)
+        scenario = self._scenarios[name]
+        return scenario[replies] if replies < len(scenario) else "Done."
+
+    def _usage(self, prompt: str) -> Dict[str, Any]:
+        with self._prompts_lock:
+            shared = max((_common_prefix(prompt, p) for p in self._prompts), default=0)
+            self._prompts.append(prompt)
+            del self._prompts[:-32]
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+        cached = (shared // CHARS_PER_TOKEN) // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 0,
+            "total_tokens": prompt_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached if cached >= CACHE_MIN_TOKENS else 0},
+        }
+
+    async def _astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        turn = self._turn(messages)
+        ttft, chunk_seconds, chunk_chars = self._timing
+        # Tools are sent ahead of the messages, as in the OpenAI request
+        prompt = json.dumps(
+            {"tools": kwargs.get("tools") or [], "messages": to_openai_message_dicts(messages, model=self.model)},
+            separators=(",", ":"),
+            default=str,
+        )
+        usage = self._usage(prompt)
+        available = {t["function"]["name"] for t in kwargs.get("tools") or []}
+
+        async def gen():
+            if ttft:
+                await asyncio.sleep(ttft)
+            if isinstance(turn, str):
+                content = ""
+                for i in range(0, len(turn), chunk_chars):
+                    delta = turn[i : i + chunk_chars]
+                    content += delta
+                    yield ChatResponse(message=ChatMessage(role="assistant", content=content), delta=delta)
+                    if chunk_seconds:
+                        await asyncio.sleep(chunk_seconds)
+                usage["completion_tokens"] = len(turn) // CHARS_PER_TOKEN
+                message = ChatMessage(role="assistant", content=content)
+            else:
+                missing = [name for name, _ in turn if name not in available]
+                if missing:
+                    raise ValueError(f"Scenario calls unknown tools: {missing}")
+                tool_calls = [
+                    ChatCompletionMessageToolCall(
+                        id=f"call_{i}", type="function", function=Function(name=name, arguments=json.dumps(args))
+                    )
+                    for i, (name, args) in enumerate(turn)
+                ]
+                usage["completion_tokens"] = sum(len(c.function.arguments) for c in tool_calls) // CHARS_PER_TOKEN
+                message = ChatMessage(role="assistant", content="", additional_kwargs={"tool_calls": tool_calls})
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            # The final chunk carries usage, as with stream_options.include_usage
+            yield ChatResponse(message=message, delta="", raw={"usage": usage})
+
+        return gen()
+
+
+def _common_prefix(a: str, b: str) -> int:
+    # Binary search on slice equality keeps the comparison in C
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def sample_sheet(rows: int) -> List[List[str]]:
+    """Return a header row plus ``rows`` project-style rows."""
+    header = ["Name", "Owner", "Status", "Due", "Progress"]
+    statuses = ["Todo", "In Progress", "Done"]
+    return [header] + [
+        [f"Task {i}", f"Owner {i % 7}", statuses[i % 3], f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}", f"{i % 100}%"]
+        for i in range(rows)
+    ]
@@ -3,7 +3,7 @@ import { NextRequest, NextResponse } from "next/server";
 export async function POST(request: NextRequest) {
   try {
     const body = await request.json();
-    const { sheet_id, sheet_name } = body;
+    const { sheet_id, sheet_name, base_version } = body;
 
     if (!sheet_id) {
       return NextResponse.json(
@@ -22,6 +22,7 @@ export async function POST(request: NextRequest) {
       body: JSON.stringify({
         sheet_id: sheet_id,
         sheet_name: sheet_name,
+        base_version: base_version,
       }),
     });
 